@@ -0,0 +1,75 @@
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filter_engine import ListingFilter, parse_query  # noqa: E402
+from listing import Listing  # noqa: E402
+
+WORDS = ["access", "backup", "core", "daily", "event", "export", "image", "report", "session", "trace"]
+EXTENSIONS = [".log", ".gz", ".json", ".csv", ".jpg", ".dat"]
+
+
+def _rows(count, seed=3):
+    rng = random.Random(seed)
+    now = int(time.time())
+    rows = Listing("/data")
+    for idx in range(count):
+        name = f"{rng.choice(WORDS)}-{idx:07d}{rng.choice(EXTENSIONS)}"
+        if idx % 50 == 0:
+            name = "." + name
+        rows.append(name, 0o100644, rng.randrange(1 << 24), now - rng.randrange(90 * 86400))
+    return rows
+
+
+def _baseline(rows, text):
+    # What _apply_filter used to do on every key release, over a list of
+    # row objects.
+    query = text.strip().lower()
+    rows = [r for r in rows if not r.name.startswith(".")]
+    return [r for r in rows if query in r.name.lower()]
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def _run(count):
+    rows = _rows(count)
+    objects = [SimpleNamespace(name=name) for name in rows.names]
+    engine = ListingFilter(rows)
+    prepare, _ = _timed(engine.prepare)
+    print(f"{count} names  (prepare {prepare * 1000:.0f} ms, index {'on' if engine._blob is not None else 'off'})")
+
+    typed = "0012345"
+    baseline, _ = _timed(lambda: [_baseline(objects, typed[: n + 1]) for n in range(len(typed))])
+    engine_typing, _ = _timed(lambda: [engine.filter(parse_query(typed[: n + 1], show_hidden=False)) for n in range(len(typed))])
+    print(f"  typing '{typed}' ({len(typed)} passes)  baseline {baseline * 1000:8.1f} ms   engine {engine_typing * 1000:8.1f} ms")
+
+    for text in ("report-00999", "trace", "*.jpg", "re:^core-\\d+5\\.gz$", "size>8M mtime<7d"):
+        fresh = ListingFilter(rows)
+        fresh.prepare()
+        elapsed, result = _timed(lambda: fresh.filter(parse_query(text, show_hidden=False)))
+        line = f"  {text:<22} engine {elapsed * 1000:8.1f} ms  {len(result):>8} hits"
+        if " " not in text and not text.startswith(("*", "re:")):
+            scan, _ = _timed(lambda: _baseline(objects, text))
+            line += f"   baseline {scan * 1000:8.1f} ms"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Listing filter: lowercase scan per keystroke vs the filter engine.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+    for count in args.sizes:
+        _run(count)
+
+
+if __name__ == "__main__":
+    main()
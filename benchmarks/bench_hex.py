@@ -0,0 +1,95 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hex_view import HEX_ROW_BYTES, HEX_SEARCH_CHUNK, find_bytes, format_hex_rows, offset_width, read_hex_rows  # noqa: E402
+from sftp_client import SFTPClient  # noqa: E402
+from tests.sftp_server import LocalSFTPServer  # noqa: E402
+
+
+def _per_byte(data):
+    # The formatter the hex preview used before.
+    lines = []
+    for offset in range(0, len(data), 16):
+        chunk = data[offset : offset + 16]
+        hex_part = " ".join(f"{b:02x}" for b in chunk)
+        ascii_part = "".join(chr(b) if 32 <= b <= 126 else "." for b in chunk)
+        lines.append(f"{offset:08x}  {hex_part:<47}  {ascii_part}")
+    return "\n".join(lines)
+
+
+def _timed(func, rounds=1):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hex view: per-byte formatting vs bulk, and the cost of a screen anywhere in a large remote file.")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--rows", type=int, default=48, help="rows on screen")
+    parser.add_argument("--jumps", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    block = os.urandom(4 * 2**20)
+    old = _timed(lambda: _per_byte(block))
+    new = _timed(lambda: "\n".join(format_hex_rows(block, 0)))
+    print(f"format 4 MB      per-byte {old * 1000:8.0f} ms -> bulk {new * 1000:6.0f} ms ({old / new:.1f}x)")
+    screen = block[: args.rows * HEX_ROW_BYTES]
+    old = _timed(lambda: _per_byte(screen), 200)
+    new = _timed(lambda: format_hex_rows(screen, 0), 200)
+    print(f"format 1 screen  per-byte {old * 1e6:8.0f} us -> bulk {new * 1e6:6.0f} us")
+
+    size = args.size_mb * 2**20
+    with tempfile.TemporaryDirectory() as remote_dir:
+        marker = b"\xde\xad\xbe\xef-end"
+        with open(os.path.join(remote_dir, "dump.bin"), "wb") as handle:
+            for _ in range(size // len(block)):
+                handle.write(block)
+            handle.seek(size - 4096)
+            handle.write(marker)
+        with LocalSFTPServer(remote_dir, latency=args.latency_ms / 1000.0) as server:
+            client = SFTPClient()
+            client.connect(server.host, server.port, "bench", "bench")
+            try:
+                version = client.file_version("/dump.bin")
+                total_rows = size // HEX_ROW_BYTES
+                print(f"{args.size_mb} MB remote file ({total_rows:,} rows, {offset_width(size)}-digit offsets), {args.latency_ms:.0f} ms injected latency")
+
+                def read(offset, length):
+                    return client.read_range("/dump.bin", offset, length, version)
+
+                randomizer = random.Random(1)
+                targets = [randomizer.randrange(total_rows) for _ in range(args.jumps)]
+                jump = _timed(lambda: [read_hex_rows(read, size, row, args.rows) for row in targets]) / args.jumps
+                print(f"jump to a random offset       {jump * 1000:8.1f} ms per screen")
+                row = targets[0]
+                client.prefetch_range("/dump.bin", (row + args.rows) * HEX_ROW_BYTES, args.rows * HEX_ROW_BYTES * 4, version)
+                time.sleep(0.5)
+                page = _timed(lambda: read_hex_rows(read, size, row + args.rows, args.rows))
+                print(f"page down (prefetched)        {page * 1000:8.1f} ms per screen")
+
+                def search():
+                    chunks = client.stream_file("/dump.bin", HEX_SEARCH_CHUNK, 0, size)
+                    try:
+                        return find_bytes(chunks, marker)
+                    finally:
+                        chunks.close()
+
+                started = time.perf_counter()
+                hit = search()
+                elapsed = time.perf_counter() - started
+                print(f"find pattern at 0x{hit:x}  {elapsed:8.2f} s ({size / 2**20 / elapsed:.0f} MB/s)")
+            finally:
+                client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_pipeline import ImagePyramid, decode_image, draft_size  # noqa: E402
+
+
+def _photo(size):
+    # A gradient with noise so the JPEG is photo-like rather than flat.
+    width, height = size
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 40)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Image preview: full decode + LANCZOS per frame vs draft decode + pyramid.")
+    parser.add_argument("--width", type=int, default=7360)
+    parser.add_argument("--height", type=int, default=4912)
+    parser.add_argument("--canvas", type=int, nargs=2, default=[1200, 800])
+    parser.add_argument("--zoom-steps", type=int, default=10)
+    args = parser.parse_args()
+
+    data = _photo((args.width, args.height))
+    full = (args.width, args.height)
+    canvas = tuple(args.canvas)
+    fit = min(canvas[0] / full[0], canvas[1] / full[1])
+    sizes = [(int(full[0] * fit * 1.1**step), int(full[1] * fit * 1.1**step)) for step in range(args.zoom_steps)]
+    print(f"{full[0]}x{full[1]} JPEG ({len(data) / 2**20:.1f} MB), canvas {canvas[0]}x{canvas[1]}, {args.zoom_steps} zoom steps")
+
+    def legacy_open():
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    open_old, original = _timed(legacy_open)
+    steps_old, _ = _timed(lambda: [original.resize(size, Image.Resampling.LANCZOS) for size in sizes])
+
+    open_new, (image, _full) = _timed(lambda: decode_image(data, draft_size(full)))
+    pyramid = ImagePyramid(image, full)
+    first_new, _ = _timed(lambda: pyramid.render(sizes[0], quality=True))
+    steps_new, _ = _timed(lambda: [pyramid.render(size) for size in sizes])
+    idle_new, _ = _timed(lambda: pyramid.render(sizes[-1], quality=True))
+
+    print(f"open (decode + first frame)   {(open_old + steps_old / len(sizes)) * 1000:8.0f} ms -> {(open_new + first_new) * 1000:6.0f} ms")
+    print(f"per zoom step                 {steps_old / len(sizes) * 1000:8.0f} ms -> {steps_new / len(sizes) * 1000:6.1f} ms (+ one {idle_new * 1000:.0f} ms LANCZOS pass when idle)")
+    print(f"decoded pixels in memory      {original.width * original.height / 1e6:8.1f} MP -> {image.width * image.height / 1e6:6.1f} MP")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from line_index import LINE_INDEX_CHUNK, build_line_index, read_lines  # noqa: E402
+from sftp_client import SFTPClient  # noqa: E402
+from tests.sftp_server import LocalSFTPServer  # noqa: E402
+
+PAGE_LINES = 2000
+PAGE_BYTES = 256 * 1024
+
+
+def _scan_to_line(client, path, line, version):
+    # Jump without an index: read from the start counting newlines.
+    offset = 0
+    remaining = line
+    while remaining:
+        data = client.read_range(path, offset, PAGE_BYTES, version)
+        if not data:
+            break
+        count = data.count(b"\n")
+        if count < remaining:
+            remaining -= count
+            offset += len(data)
+            continue
+        position = -1
+        for _ in range(remaining):
+            position = data.find(b"\n", position + 1)
+        offset += position + 1
+        remaining = 0
+    return client.read_range(path, offset, PAGE_BYTES, version)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Line index build throughput and jump-to-line latency.")
+    parser.add_argument("--megabytes", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    line = b"2024-05-01 12:00:00 INFO worker-7 request served in 12 ms status=200\n"
+    with tempfile.TemporaryDirectory() as remote_dir:
+        with open(os.path.join(remote_dir, "app.log"), "wb") as handle:
+            handle.write(line * (args.megabytes * 1024 * 1024 // len(line)))
+
+        with LocalSFTPServer(remote_dir, latency=args.latency_ms / 1000.0) as server:
+            client = SFTPClient()
+            client.connect(server.host, server.port, "bench", "bench")
+            try:
+                version = client.file_version("/app.log")
+                mtime, size = version
+                started = time.perf_counter()
+                index = build_line_index(client.stream_file("/app.log", LINE_INDEX_CHUNK), size, mtime)
+                elapsed = time.perf_counter() - started
+                print(f"indexed {size / 2**20:.0f} MB, {index.total_lines:,} lines in {elapsed:.2f} s ({size / 2**20 / elapsed:.0f} MB/s), index {len(index.to_bytes()) / 1024:.0f} KB")
+
+                target = index.total_lines * 3 // 4
+
+                def read(offset, length):
+                    return client.read_range("/app.log", offset, length, version)
+
+                client.blocks.clear()
+                started = time.perf_counter()
+                _scan_to_line(client, "/app.log", target, version)
+                scan = time.perf_counter() - started
+                client.blocks.clear()
+                started = time.perf_counter()
+                read_lines(read, index, target, PAGE_LINES, PAGE_BYTES)
+                jump = time.perf_counter() - started
+                print(f"jump to line {target:,}: scan from start {scan * 1000:.0f} ms -> indexed {jump * 1000:.0f} ms")
+            finally:
+                client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import gc
+import os
+import random
+import stat
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+
+import paramiko
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from listing import Listing, human_size  # noqa: E402
+from sftp_client import SFTPClient  # noqa: E402
+
+
+@dataclass
+class LegacyEntry:
+    # The RemoteEntry dataclass listings used to be built from.
+    name: str
+    file_type: str
+    size_human: str
+    modified: str
+    full_path: str
+    is_dir: bool
+    st_mode: int
+    st_size: int
+    st_mtime: int = 0
+
+
+def _legacy_rows(path, entries):
+    rows = []
+    for entry in entries:
+        is_dir = stat.S_ISDIR(entry.st_mode)
+        rows.append(
+            LegacyEntry(
+                name=entry.filename,
+                file_type="DIR" if is_dir else "FILE",
+                size_human="-" if is_dir else human_size(entry.st_size),
+                modified=datetime.fromtimestamp(entry.st_mtime).strftime("%Y-%m-%d %H:%M"),
+                full_path=SFTPClient.join_remote(path, entry.filename),
+                is_dir=is_dir,
+                st_mode=entry.st_mode,
+                st_size=entry.st_size,
+                st_mtime=entry.st_mtime or 0,
+            )
+        )
+    rows.sort(key=lambda row: (not row.is_dir, row.name.lower()))
+    return rows
+
+
+def _compact_rows(path, entries):
+    return Listing.from_attrs(path, entries).sort()
+
+
+def _attrs(count, seed=5):
+    rng = random.Random(seed)
+    now = int(time.time())
+    entries = []
+    for idx in range(count):
+        attr = paramiko.SFTPAttributes()
+        attr.filename = f"capture-{rng.randrange(10**9):09d}-{idx}.pcap"
+        attr.st_mode = (stat.S_IFDIR | 0o755) if idx % 100 == 0 else (stat.S_IFREG | 0o644)
+        attr.st_size = rng.randrange(1 << 30)
+        attr.st_mtime = now - rng.randrange(365 * 86400)
+        entries.append(attr)
+    return entries
+
+
+def _build(label, build, path, entries):
+    # Both representations reference the filename strings already held by the
+    # SFTPAttributes, so memory is what each adds on top of the raw reply.
+    gc.collect()
+    started = time.perf_counter()
+    rows = build(path, entries)
+    elapsed = time.perf_counter() - started
+    del rows
+    gc.collect()
+    tracemalloc.start()
+    rows = build(path, entries)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    started = time.perf_counter()
+    screen = [(row.name, row.file_type, row.size_human, row.modified) for row in rows[:40]]
+    shown = time.perf_counter() - started
+    print(f"{label:<22} build+sort {elapsed:6.2f} s   {human_size(memory):>10}   first screen {shown * 1000:6.2f} ms")
+    assert len(screen) == min(40, len(entries))
+    return elapsed, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Listing build time and memory: dataclass rows vs the columnar Listing.")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    entries = _attrs(args.entries)
+    print(f"{args.entries} entries")
+    legacy_time, legacy_memory = _build("dataclass list", _legacy_rows, "/var/capture", entries)
+    compact_time, compact_memory = _build("columnar Listing", _compact_rows, "/var/capture", entries)
+    print(f"speedup {legacy_time / compact_time:.2f}x, memory {legacy_memory / compact_memory:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sftp_client import SFTPClient  # noqa: E402
+from tests.sftp_server import LocalSFTPServer  # noqa: E402
+
+
+def _sequential(client, path):
+    # What _navigate_worker used to do: normalize, then stat, then listdir_attr.
+    with client.lease() as sftp:
+        normalized = sftp.normalize(path)
+        sftp.stat(normalized)
+        return sftp.listdir_attr(normalized)
+
+
+def _first_rows(client, path):
+    stream = client.iter_listdir(path)
+    try:
+        for _path, rows in stream:
+            if rows:
+                return rows
+    finally:
+        stream.close()
+
+
+def _measure(label, rounds, rtt, func):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    median = statistics.median(samples)
+    print(f"{label:<32} median {median * 1000:8.1f} ms  ({median / rtt:4.1f} RTT)")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Navigation latency: sequential round trips vs one pipelined batch.")
+    parser.add_argument("--entries", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    rtt = args.latency_ms / 1000.0
+    with tempfile.TemporaryDirectory() as remote_dir:
+        folder = os.path.join(remote_dir, "spool")
+        os.makedirs(folder)
+        for idx in range(args.entries):
+            with open(os.path.join(folder, f"msg-{idx:06d}.eml"), "wb") as handle:
+                handle.write(b"x")
+
+        with LocalSFTPServer(remote_dir, latency=rtt) as server:
+            client = SFTPClient()
+            client.connect(server.host, server.port, "bench", "bench")
+            try:
+                print(f"{args.entries} entries over {args.latency_ms:.0f} ms injected latency")
+                sequential = _measure("normalize + stat + listdir_attr", args.rounds, rtt, lambda: _sequential(client, "/spool/."))
+                batched = _measure("pipelined browse", args.rounds, rtt, lambda: client.browse("/spool/."))
+                _measure("streamed, first rows", args.rounds, rtt, lambda: _first_rows(client, "/spool/."))
+                print(f"speedup: {sequential / batched:.2f}x")
+            finally:
+                client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
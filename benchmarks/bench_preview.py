@@ -0,0 +1,107 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sftp_client import SFTPClient  # noqa: E402
+from tests.sftp_server import LocalSFTPServer  # noqa: E402
+
+PAGE = 256 * 1024
+
+
+def _uncached_read(client, path, offset, size):
+    # What read_range did before the block cache: a fresh handle per call.
+    with client.lease() as sftp:
+        with sftp.open(path, "rb") as handle:
+            handle.seek(offset)
+            return handle.read(size)
+
+
+def _uncached_page(client, path, offset):
+    _uncached_read(client, path, 0, 4096)
+    return _uncached_read(client, path, offset, PAGE)
+
+
+def _cached_page(client, path, offset):
+    version = client.file_version(path)
+    client.read_head(path, 4096, version)
+    return client.read_range(path, offset, PAGE, version)
+
+
+def _session(client, path, page):
+    # Open the file, page forward twice, then back twice.
+    for offset in (0, PAGE, 2 * PAGE, PAGE, 0):
+        page(client, path, offset)
+
+
+def _page_latency(client, path, pages, dwell, cached):
+    # Median time for Next over `pages` pages, with `dwell` seconds of reading
+    # between clicks; prefetch runs during the dwell.
+    version = client.file_version(path) if cached else None
+    samples = []
+    for index in range(pages):
+        offset = index * PAGE
+        started = time.perf_counter()
+        if cached:
+            client.read_range(path, offset, PAGE, version)
+            client.prefetch_range(path, offset + PAGE, PAGE, version)
+        else:
+            _uncached_page(client, path, offset)
+        samples.append(time.perf_counter() - started)
+        time.sleep(dwell)
+    return statistics.median(samples)
+
+
+def _measure(label, rounds, func):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    median = statistics.median(samples)
+    print(f"{label:<36} median {median * 1000:8.1f} ms")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text preview paging with and without the block cache.")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--dwell-ms", type=float, default=500.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as remote_dir:
+        with open(os.path.join(remote_dir, "app.log"), "wb") as handle:
+            handle.write(b"2024-05-01 12:00:00 INFO request served in 12 ms\n" * 60_000)
+
+        with LocalSFTPServer(remote_dir, latency=args.latency_ms / 1000.0) as server:
+            client = SFTPClient()
+            client.connect(server.host, server.port, "bench", "bench")
+            try:
+                print(f"open + 2 pages forward + 2 back over {args.latency_ms:.0f} ms injected latency")
+                uncached = _measure("fresh handle per read", args.rounds, lambda: _session(client, "/app.log", _uncached_page))
+
+                def cold():
+                    client.blocks.clear()
+                    _session(client, "/app.log", _cached_page)
+
+                _measure("block cache, cold", args.rounds, cold)
+                warm = _measure("block cache, warm", args.rounds, lambda: _session(client, "/app.log", _cached_page))
+                print(f"warm speedup: {uncached / warm:.1f}x")
+
+                client.blocks.clear()
+                dwell = args.dwell_ms / 1000.0
+                before = _page_latency(client, "/app.log", args.pages, dwell, cached=False)
+                after = _page_latency(client, "/app.log", args.pages, dwell, cached=True)
+                print(f"Next, {args.pages} pages, {args.dwell_ms:.0f} ms reading each: {before * 1000:.1f} ms -> {after * 1000:.1f} ms per click")
+            finally:
+                client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from listing import human_size  # noqa: E402
+from transfers import STATUS_RUNNING, TransferScheduler, format_eta  # noqa: E402
+
+BLOCK = 32 * 1024
+
+
+def _job(size):
+    def run(callback):
+        for done in range(BLOCK, size + BLOCK, BLOCK):
+            callback(min(done, size), size)
+
+    return run
+
+
+class _EventLoop:
+    # Stands in for Tk's after(0, ...) queue: one thread runs callbacks in
+    # order, each costing `row_cost` seconds like a Treeview item() rewrite.
+    def __init__(self, row_cost):
+        self.row_cost = row_cost
+        self.calls = queue.SimpleQueue()
+        self.rows = {}
+        self.executed = 0
+        self.backlog = 0
+        self.busy = 0.0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def after(self, callback):
+        self.calls.put(callback)
+
+    def update_row(self, job_id, values):
+        self.rows[job_id] = values
+        deadline = time.perf_counter() + self.row_cost
+        while time.perf_counter() < deadline:
+            pass
+
+    def _run(self):
+        while True:
+            callback = self.calls.get()
+            if callback is None:
+                return
+            self.backlog = max(self.backlog, self.calls.qsize())
+            started = time.perf_counter()
+            callback()
+            self.busy += time.perf_counter() - started
+            self.executed += 1
+
+    def close(self):
+        self.calls.put(None)
+        self.thread.join()
+
+
+def _per_callback(jobs, size, loop):
+    # Before: every block's callback queued one row rewrite.
+    def on_update(job):
+        values = (job.direction, job.label, f"{job.percent}%", job.status)
+        loop.after(lambda: loop.update_row(job.job_id, values))
+
+    scheduler = TransferScheduler(workers=4, direction_limits={}, on_update=on_update)
+    # The old scheduler notified on every callback; replay that here.
+    scheduler._progress_callback = _notifying(scheduler._progress_callback, on_update)
+    for index in range(jobs):
+        scheduler.submit("Download", f"file-{index}", _job(size))
+    scheduler.wait()
+    scheduler.shutdown()
+
+
+def _notifying(make_callback, on_update):
+    def wrapped(job):
+        callback = make_callback(job)
+
+        def notify(transferred, total, detail=None):
+            callback(transferred, total, detail)
+            on_update(job)
+
+        return notify
+
+    return wrapped
+
+
+def _polled(jobs, size, loop, frame):
+    # After: state changes only, plus one poll per frame over the progress store.
+    scheduler = TransferScheduler(workers=4, direction_limits={}, on_update=lambda job: loop.after(lambda: loop.update_row(job.job_id, job.status)))
+    finished = threading.Event()
+
+    def poll():
+        for job_id, (transferred, total, _detail, rate, eta) in scheduler.progress.poll().items():
+            job = scheduler.get(job_id)
+            if job is not None and job.status == STATUS_RUNNING:
+                loop.update_row(job_id, (f"{int(transferred * 100 / total)}%", f"{human_size(int(rate))}/s", format_eta(eta)))
+
+    def timer():
+        while not finished.wait(frame):
+            loop.after(poll)
+
+    ticker = threading.Thread(target=timer, daemon=True)
+    ticker.start()
+    for index in range(jobs):
+        scheduler.submit("Download", f"file-{index}", _job(size))
+    scheduler.wait()
+    finished.set()
+    ticker.join()
+    scheduler.shutdown()
+
+
+def _run(label, func, row_cost):
+    loop = _EventLoop(row_cost)
+    started = time.perf_counter()
+    func(loop)
+    transfer = time.perf_counter() - started
+    # The UI is usable again once its queue has drained.
+    loop.close()
+    drained = time.perf_counter() - started
+    print(f"{label:<22} transfers {transfer:6.2f} s  UI idle after {drained:6.2f} s  {loop.executed:8,d} UI callbacks  max backlog {loop.backlog:8,d}")
+    return drained
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transfer progress: one Tk callback per 32 KB block vs a progress store polled per frame.")
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--size-mb", type=int, default=1024, help="per job; blocks are reported, not moved")
+    parser.add_argument("--row-cost-us", type=float, default=40.0, help="cost of one Treeview row rewrite")
+    parser.add_argument("--frame-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    size = args.size_mb * 2**20
+    row_cost = args.row_cost_us / 1e6
+    print(f"{args.jobs} x {args.size_mb} MB in {BLOCK // 1024} KB blocks ({args.jobs * size // BLOCK:,} callbacks), {args.row_cost_us:g} us per row rewrite")
+    before = _run("callback per block", lambda loop: _per_callback(args.jobs, size, loop), row_cost)
+    after = _run(f"poll every {args.frame_ms:g} ms", lambda loop: _polled(args.jobs, size, loop, args.frame_ms / 1000), row_cost)
+    print(f"speedup: {before / after:.1f}x until the UI is responsive")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sftp_client import human_size  # noqa: E402
+from transfers import TransferScheduler  # noqa: E402
+
+
+def _synthetic_job(size, block, block_delay):
+    def run(callback):
+        done = 0
+        while done < size:
+            done = min(size, done + block)
+            time.sleep(block_delay)
+            callback(done, size)
+
+    return run
+
+
+def _thread_per_transfer(jobs):
+    threads = [threading.Thread(target=job, args=(lambda *_: None,), daemon=True) for job in jobs]
+    peak = threading.active_count()
+    for thread in threads:
+        thread.start()
+        peak = max(peak, threading.active_count())
+    for thread in threads:
+        thread.join()
+    return peak
+
+
+def _scheduled(jobs, workers, rate_limit):
+    scheduler = TransferScheduler(workers=workers, direction_limits={}, rate_limit=rate_limit)
+    peak = threading.active_count()
+    for idx, job in enumerate(jobs):
+        scheduler.submit("Download", f"job-{idx}", job)
+    scheduler.wait()
+    scheduler.shutdown()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless transfer scheduler benchmark.")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rate-mb", type=float, default=0.0, help="Global limit in MB/s (0 = unlimited).")
+    args = parser.parse_args()
+
+    size = args.size_kb * 1024
+    block = 32 * 1024
+    total = size * args.jobs
+
+    def make_jobs():
+        return [_synthetic_job(size, block, 0.001) for _ in range(args.jobs)]
+
+    started = time.perf_counter()
+    peak = _thread_per_transfer(make_jobs())
+    elapsed = time.perf_counter() - started
+    print(f"thread per transfer   {elapsed:7.2f} s  peak threads {peak:4d}  {human_size(int(total / elapsed))}/s")
+
+    rate = args.rate_mb * 1024 * 1024 or None
+    started = time.perf_counter()
+    peak = _scheduled(make_jobs(), args.workers, rate)
+    elapsed = time.perf_counter() - started
+    print(f"scheduler ({args.workers} workers) {elapsed:7.2f} s  peak threads {peak:4d}  {human_size(int(total / elapsed))}/s")
+
+
+if __name__ == "__main__":
+    main()
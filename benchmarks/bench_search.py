@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_search import ContentSearch, compile_search  # noqa: E402
+from sftp_client import SFTPClient  # noqa: E402
+from tests.sftp_server import LocalSFTPServer  # noqa: E402
+
+
+def _download_and_search(client, paths, local_dir, query):
+    # The workflow before content search: download every file, then search.
+    pattern = compile_search(query)
+    hits = 0
+    for path in paths:
+        local = os.path.join(local_dir, os.path.basename(path))
+        client.get(path, local)
+        with open(local, "rb") as handle:
+            hits += sum(1 for line in handle if pattern.search(line))
+    return hits
+
+
+def _timed(label, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed:6.2f} s  ({result} matches)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content search over a folder of logs: download-then-search vs streaming workers.")
+    parser.add_argument("--files", type=int, default=24)
+    parser.add_argument("--size-mb", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    line = b"2024-05-01 12:00:00 INFO worker-7 request served in 12 ms\n"
+    with tempfile.TemporaryDirectory() as remote_dir, tempfile.TemporaryDirectory() as local_dir:
+        for index in range(args.files):
+            with open(os.path.join(remote_dir, f"app-{index}.log"), "wb") as handle:
+                body = line * (args.size_mb * 1024 * 1024 // len(line))
+                middle = len(body) // 2
+                handle.write(body[:middle] + b"ERROR upstream timeout\n" + body[middle:])
+        paths = [f"/app-{index}.log" for index in range(args.files)]
+
+        with LocalSFTPServer(remote_dir, latency=args.latency_ms / 1000.0) as server:
+            client = SFTPClient()
+            client.connect(server.host, server.port, "bench", "bench")
+            try:
+                print(f"{args.files} files x {args.size_mb} MB over {args.latency_ms:.0f} ms injected latency")
+                before = _timed("download, then search", lambda: _download_and_search(client, paths, local_dir, "upstream timeout"))
+                _timed("stream, 1 worker", lambda: len(ContentSearch(client, "upstream timeout", workers=1, use_grep=False).run(paths)))
+                after = _timed("stream, 4 workers", lambda: len(ContentSearch(client, "upstream timeout", use_grep=False).run(paths)))
+                print(f"speedup: {before / after:.1f}x")
+            finally:
+                client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
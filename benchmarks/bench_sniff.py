@@ -0,0 +1,88 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preview import decode_bytes, looks_like_text  # noqa: E402
+
+PAGE = 256 * 1024
+SAMPLE = 4096
+
+
+def _legacy_looks_like_text(sample):
+    # looks_like_text before the lookup-table version.
+    if not sample:
+        return True
+    if b"\x00" in sample:
+        even_null = sum(1 for i in range(0, len(sample), 2) if sample[i] == 0)
+        odd_null = sum(1 for i in range(1, len(sample), 2) if sample[i] == 0)
+        if max(even_null, odd_null) < len(sample) * 0.15:
+            return False
+    printable = 0
+    for b in sample:
+        if b in (9, 10, 13) or 32 <= b <= 126:
+            printable += 1
+    return (printable / len(sample)) >= 0.70
+
+
+def _legacy_decode_bytes(data):
+    if data.startswith(b"\xff\xfe") or data.startswith(b"\xfe\xff"):
+        try:
+            return data.decode("utf-16"), "utf-16"
+        except UnicodeDecodeError:
+            pass
+    for enc in ("utf-8", "utf-16"):
+        try:
+            text = data.decode(enc)
+            if enc == "utf-16" and "\x00" in text:
+                continue
+            return text, enc
+        except UnicodeDecodeError:
+            continue
+    return data.decode("latin-1", errors="replace"), "latin-1"
+
+
+def _corpora(seed=3):
+    rng = random.Random(seed)
+    log = b"".join(b"2024-05-01 12:00:%02d INFO request %d served in %d ms\n" % (i % 60, i, rng.randrange(500)) for i in range(6000))
+    accented = "".join(f"ligne {i}: café, naïve, déjà vu — ok\n" for i in range(8000)).encode("utf-8")
+    return {
+        "ascii log": log[:PAGE],
+        "utf-8 accented": accented[:PAGE],
+        "utf-16 log": log.decode("ascii").encode("utf-16")[:PAGE],
+        "latin-1 text": accented.decode("utf-8").encode("latin-1", errors="replace")[:PAGE],
+        "binary": rng.randbytes(PAGE),
+    }
+
+
+def _per_call(func, data, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func(data)
+    return (time.perf_counter() - started) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text/binary sniffing and page decoding: legacy loops vs lookup tables.")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'corpus':<16} {'sniff 4 KB (old -> new)':>28} {'decode 256 KB page (old -> new)':>36}")
+    for label, page in _corpora().items():
+        sample = page[:SAMPLE]
+        assert looks_like_text(sample) == _legacy_looks_like_text(sample) or label == "utf-16 log"
+        sniff_old = _per_call(_legacy_looks_like_text, sample, args.rounds)
+        sniff_new = _per_call(looks_like_text, sample, args.rounds)
+        decode_old = _per_call(_legacy_decode_bytes, page, max(1, args.rounds // 10))
+        decode_new = _per_call(decode_bytes, page, max(1, args.rounds // 10))
+        print(
+            f"{label:<16} {sniff_old * 1e6:9.1f} -> {sniff_new * 1e6:6.1f} us ({sniff_old / sniff_new:5.0f}x)"
+            f" {decode_old * 1e3:9.2f} -> {decode_new * 1e3:6.2f} ms ({decode_old / decode_new:4.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import random
+import stat
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from listing import Listing  # noqa: E402
+
+SPECS = [
+    ("largest first", (("size", True),)),
+    ("newest first", (("modified", True),)),
+    ("natural name", (("name", False),)),
+    ("type, newest, name", (("type", False), ("modified", True), ("name", False))),
+]
+
+
+def _listing(count, seed=11):
+    rng = random.Random(seed)
+    now = int(time.time())
+    listing = Listing("/var/spool")
+    for idx in range(count):
+        mode = (stat.S_IFDIR | 0o755) if idx % 200 == 0 else (stat.S_IFREG | 0o644)
+        listing.append(f"frame-{rng.randrange(10**6)}-{idx}.raw", mode, rng.randrange(1 << 32), now - rng.randrange(10**7))
+    return listing
+
+
+def _timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Column sorts: cold vs cached keys, and heap top-N for the first screen.")
+    parser.add_argument("--entries", type=int, nargs="+", default=[200_000, 1_000_000])
+    parser.add_argument("--first-screen", type=int, default=200)
+    args = parser.parse_args()
+
+    for count in args.entries:
+        print(f"{count} entries")
+        for label, spec in SPECS:
+            listing = _listing(count)
+            cold = _timed(lambda: listing.sorted_by(spec, natural=True))
+            warm = _timed(lambda: listing.sorted_by(spec, natural=True))
+            top = _timed(lambda: listing.top(args.first_screen, spec, natural=True))
+            print(f"  {label:<20} full sort {cold * 1000:7.0f} ms  cached keys {warm * 1000:7.0f} ms  top {args.first_screen} {top * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
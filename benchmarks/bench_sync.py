@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sftp_client import SFTPClient, human_size  # noqa: E402
+from sync import SyncDownloader, local_block_hashes  # noqa: E402
+from tests.sftp_server import LocalSFTPServer  # noqa: E402
+
+
+def _make_tree(root, dirs, files_per_dir, size, large_mb):
+    for d in range(dirs):
+        folder = os.path.join(root, "run", f"shard-{d:03d}")
+        os.makedirs(folder)
+        for f in range(files_per_dir):
+            with open(os.path.join(folder, f"part-{f:04d}.dat"), "wb") as handle:
+                handle.write(os.urandom(size))
+    with open(os.path.join(root, "run", "model.bin"), "wb") as handle:
+        handle.write(os.urandom(large_mb * 1024 * 1024))
+
+
+def _touch_remote(root, changed, large_edits):
+    # Rewrite a few small files and flip a few bytes inside the large one.
+    rng = random.Random(7)
+    shards = sorted(os.listdir(os.path.join(root, "run")))
+    for _ in range(changed):
+        folder = os.path.join(root, "run", rng.choice([s for s in shards if s.startswith("shard-")]))
+        path = os.path.join(folder, rng.choice(os.listdir(folder)))
+        with open(path, "r+b") as handle:
+            handle.write(os.urandom(16))
+        os.utime(path, (time.time() + 5, time.time() + 5))
+    path = os.path.join(root, "run", "model.bin")
+    size = os.path.getsize(path)
+    with open(path, "r+b") as handle:
+        for _ in range(large_edits):
+            handle.seek(rng.randrange(size))
+            handle.write(b"\xff")
+    os.utime(path, (time.time() + 5, time.time() + 5))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full tree download vs delta re-sync of a mostly unchanged tree.")
+    parser.add_argument("--dirs", type=int, default=10)
+    parser.add_argument("--files", type=int, default=30)
+    parser.add_argument("--size", type=int, default=16 * 1024)
+    parser.add_argument("--large-mb", type=int, default=32)
+    parser.add_argument("--changed", type=int, default=10)
+    parser.add_argument("--large-edits", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as remote_dir, tempfile.TemporaryDirectory() as local_dir:
+        _make_tree(remote_dir, args.dirs, args.files, args.size, args.large_mb)
+
+        def hasher(path, block_size):
+            # The local test server has no exec channel; hash its files directly
+            # the way the remote python one-liner would.
+            return local_block_hashes(os.path.join(remote_dir, path.lstrip("/")), block_size)
+
+        with LocalSFTPServer(remote_dir, latency=args.latency_ms / 1000.0) as server:
+            client = SFTPClient()
+            client.connect(server.host, server.port, "bench", "bench")
+            try:
+                target = os.path.join(local_dir, "mirror")
+                started = time.perf_counter()
+                full = SyncDownloader(client, hasher=hasher).sync("/run", target)
+                print(f"initial sync          {time.perf_counter() - started:7.2f} s  fetched {human_size(full)}")
+
+                _touch_remote(remote_dir, args.changed, args.large_edits)
+                engine = SyncDownloader(client, hasher=hasher)
+                started = time.perf_counter()
+                plan = engine.plan("/run", target)
+                planned = time.perf_counter() - started
+                print(f"dry-run plan          {planned:7.2f} s")
+                print("  " + plan.summary().replace("\n", "\n  "))
+                fetched = engine.execute(plan)
+                elapsed = time.perf_counter() - started
+                print(f"re-sync               {elapsed:7.2f} s  fetched {human_size(fetched)}")
+
+                started = time.perf_counter()
+                client.get_tree("/run", os.path.join(local_dir, "full"))
+                print(f"full tree download    {time.perf_counter() - started:7.2f} s  fetched {human_size(full)}")
+                print(f"bytes saved by re-sync: {human_size(full - fetched)} ({100 * (full - fetched) / full:.1f}%)")
+            finally:
+                client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import io
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sftp_client import SFTPClient  # noqa: E402
+from tests.sftp_server import LocalSFTPServer  # noqa: E402
+from thumbnails import THUMB_SIZE, THUMB_WORKERS, ThumbnailCache, Thumbnailer  # noqa: E402
+from tiled_image import TileLoader  # noqa: E402
+
+
+def _photo(size, with_exif_thumb):
+    image = Image.effect_noise(size, 40).convert("RGB")
+    exif = b""
+    if with_exif_thumb:
+        # Camera-style EXIF block with a 160x120 preview in IFD1.
+        buffer = io.BytesIO()
+        image.resize((160, 120)).save(buffer, "JPEG")
+        thumb = buffer.getvalue()
+        exif = b"Exif\0\0II*\0" + struct.pack("<IHIH", 8, 0, 14, 2) + struct.pack("<HHII", 0x201, 4, 1, 44) + struct.pack("<HHII", 0x202, 4, 1, len(thumb)) + struct.pack("<I", 0) + thumb
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90, exif=exif)
+    return buffer.getvalue()
+
+
+def _one_by_one(client, paths):
+    # Opening each file in turn: whole read through the preview path, full
+    # decode, then a thumbnail.
+    for path in paths:
+        image = Image.open(io.BytesIO(client.read_head(path, 64 * 1024 * 1024)))
+        image.load()
+        image.thumbnail((THUMB_SIZE, THUMB_SIZE))
+
+
+def _pooled(client, thumbs, paths, sizes):
+    finished = threading.Event()
+    remaining = [len(paths)]
+    lock = threading.Lock()
+
+    def done(_key, _image):
+        with lock:
+            remaining[0] -= 1
+            if not remaining[0]:
+                finished.set()
+
+    loader = TileLoader(lambda key: thumbs.load(*key), done, workers=THUMB_WORKERS)
+    loader.request([(client.session, path, sizes[path], 1) for path in paths])
+    finished.wait()
+    loader.close()
+
+
+def _timed(label, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed:6.2f} s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thumbnails for a photo folder: open each file vs pooled draft/EXIF thumbnails vs the disk cache.")
+    parser.add_argument("--files", type=int, default=60)
+    parser.add_argument("--width", type=int, default=2400)
+    parser.add_argument("--height", type=int, default=1600)
+    parser.add_argument("--exif-share", type=float, default=0.5, help="fraction of photos carrying an EXIF thumbnail")
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as remote_dir, tempfile.TemporaryDirectory() as cache_dir:
+        sizes = {}
+        with_exif = int(args.files * args.exif_share)
+        for index in range(args.files):
+            data = _photo((args.width, args.height), index < with_exif)
+            with open(os.path.join(remote_dir, f"IMG_{index:04d}.jpg"), "wb") as handle:
+                handle.write(data)
+            sizes[f"/IMG_{index:04d}.jpg"] = len(data)
+        paths = list(sizes)
+        total = sum(sizes.values())
+
+        with LocalSFTPServer(remote_dir, latency=args.latency_ms / 1000.0) as server:
+            client = SFTPClient()
+            client.connect(server.host, server.port, "bench", "bench")
+            try:
+                print(f"{args.files} photos {args.width}x{args.height} ({total / 2**20:.0f} MB, {with_exif} with EXIF thumbnails), {args.latency_ms:.0f} ms injected latency")
+                fetched = [0]
+
+                def read(path, offset, size):
+                    data = b"".join(client.stream_file(path, size, offset, offset + size))
+                    fetched[0] += len(data)
+                    return data
+
+                thumbs = Thumbnailer(read, ThumbnailCache(cache_dir))
+                before = _timed("open each file, full decode", lambda: _one_by_one(client, paths))
+                after = _timed(f"{THUMB_WORKERS} workers, EXIF/draft decode", lambda: _pooled(client, thumbs, paths, sizes))
+                print(f"{'':<40} {fetched[0] / 2**20:6.1f} MB read of {total / 2**20:.0f} MB")
+                fetched[0] = 0
+                revisit = _timed("revisit (disk cache)", lambda: _pooled(client, Thumbnailer(read, ThumbnailCache(cache_dir)), paths, sizes))
+                print(f"{'':<40} {fetched[0]} bytes read")
+                print(f"speedup: {before / after:.1f}x first visit, {before / revisit:.0f}x revisit")
+            finally:
+                client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import io
+import os
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tiled_image import open_tiled  # noqa: E402
+
+
+def _scan(size):
+    # A gradient with noise, like a scanned map or microscope slide.
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 30)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    buffer = io.BytesIO()
+    image.save(buffer, "TIFF", compression="tiff_lzw")
+    return buffer.getvalue()
+
+
+class _Remote:
+    # read(offset, size) with a fixed round-trip per call.
+    def __init__(self, data, latency):
+        self.data = data
+        self.latency = latency
+        self.bytes_read = 0
+
+    def read(self, offset, size):
+        time.sleep(self.latency)
+        self.bytes_read += size
+        return self.data[offset : offset + size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Large image: download and decode the whole file vs range-read only the tiles on screen.")
+    parser.add_argument("--width", type=int, default=12000)
+    parser.add_argument("--height", type=int, default=9000)
+    parser.add_argument("--canvas", type=int, nargs=2, default=[1200, 800])
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--mb-per-s", type=float, default=50)
+    args = parser.parse_args()
+
+    # The whole-file baseline decodes more pixels than Pillow allows by default.
+    Image.MAX_IMAGE_PIXELS = None
+    data = _scan((args.width, args.height))
+    latency = args.latency_ms / 1000
+    transfer = len(data) / (args.mb_per_s * 2**20)
+    print(f"{args.width}x{args.height} LZW TIFF ({len(data) / 2**20:.1f} MB), canvas {args.canvas[0]}x{args.canvas[1]}, {args.latency_ms:g} ms RTT, {args.mb_per_s:g} MB/s")
+
+    started = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    whole = time.perf_counter() - started + latency + transfer
+    del image
+
+    remote = _Remote(data, latency)
+    started = time.perf_counter()
+    tiled = open_tiled(remote.read, len(data))
+    # A 1:1 viewport in the middle of the image, the view after zooming in.
+    left, top = args.width // 2, args.height // 2
+    for tx, ty in tiled.tiles_in(0, left, top, left + args.canvas[0], top + args.canvas[1]):
+        tiled.render(0, tx, ty)
+    viewport = time.perf_counter() - started + remote.bytes_read / (args.mb_per_s * 2**20)
+
+    print(f"1:1 viewport   whole file {whole * 1000:8.0f} ms ({len(data) / 2**20:.1f} MB) -> tiles {viewport * 1000:6.0f} ms ({remote.bytes_read / 2**20:.1f} MB read, {tiled.decoded} blocks decoded)")
+
+
+if __name__ == "__main__":
+    main()
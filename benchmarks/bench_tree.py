@@ -0,0 +1,70 @@
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sftp_client import SFTPClient  # noqa: E402
+from tests.sftp_server import LocalSFTPServer  # noqa: E402
+
+
+def _make_tree(root, dirs, files_per_dir, size):
+    for d in range(dirs):
+        folder = os.path.join(root, "run", f"shard-{d:03d}")
+        os.makedirs(folder)
+        for f in range(files_per_dir):
+            with open(os.path.join(folder, f"part-{f:04d}.dat"), "wb") as handle:
+                handle.write(os.urandom(size))
+
+
+def _naive_download(client, remote, local):
+    # What a per-file loop over listdir_attr + sftp.get costs.
+    with client.lease() as sftp:
+        stack = [(remote, local)]
+        while stack:
+            rdir, ldir = stack.pop()
+            os.makedirs(ldir, exist_ok=True)
+            for entry in sftp.listdir_attr(rdir):
+                rpath = SFTPClient.join_remote(rdir, entry.filename)
+                lpath = os.path.join(ldir, entry.filename)
+                if stat.S_ISDIR(entry.st_mode):
+                    stack.append((rpath, lpath))
+                else:
+                    sftp.get(rpath, lpath)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recursive download: naive per-file loop vs tree engine.")
+    parser.add_argument("--dirs", type=int, default=20)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as remote_dir, tempfile.TemporaryDirectory() as local_dir:
+        _make_tree(remote_dir, args.dirs, args.files, args.size)
+        count = args.dirs * args.files
+        with LocalSFTPServer(remote_dir, latency=args.latency_ms / 1000.0) as server:
+            client = SFTPClient()
+            client.connect(server.host, server.port, "bench", "bench")
+            try:
+                print(f"{count} files in {args.dirs} dirs over {args.latency_ms:.0f} ms injected latency")
+                started = time.perf_counter()
+                _naive_download(client, "/run", os.path.join(local_dir, "naive"))
+                naive = time.perf_counter() - started
+                print(f"naive listdir + get   {naive:7.2f} s  {count / naive:8.1f} files/s")
+
+                started = time.perf_counter()
+                client.get_tree("/run", os.path.join(local_dir, "tree"))
+                tree = time.perf_counter() - started
+                print(f"tree engine           {tree:7.2f} s  {count / tree:8.1f} files/s")
+                print(f"speedup: {naive / tree:.1f}x")
+            finally:
+                client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sftp_client import POOL_INTERACTIVE_RESERVE, SFTPClient, human_size  # noqa: E402
+from tests.sftp_server import LocalSFTPServer  # noqa: E402
+
+
+def _timed(label, size, func):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.2f} s  {human_size(int(size / elapsed))}/s")
+    return elapsed
+
+
+def _plain(client, method, *args):
+    with client.lease() as sftp:
+        getattr(sftp, method)(*args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare paramiko sftp.put with the parallel upload engine.")
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--channels", type=int, default=4)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    with tempfile.TemporaryDirectory() as remote_dir, tempfile.TemporaryDirectory() as local_dir:
+        local_path = os.path.join(local_dir, "payload.bin")
+        with open(local_path, "wb") as handle:
+            handle.write(os.urandom(size))
+
+        with LocalSFTPServer(remote_dir, latency=args.latency_ms / 1000.0) as server:
+            client = SFTPClient(pool_size=args.channels + POOL_INTERACTIVE_RESERVE, transfer_channels=args.channels)
+            client.connect(server.host, server.port, "bench", "bench")
+            try:
+                print(f"{human_size(size)} over {args.latency_ms:.0f} ms injected latency")
+                baseline = _timed("paramiko sftp.put", size, lambda: _plain(client, "put", local_path, "/a.bin"))
+                engine = _timed(
+                    f"parallel put ({args.channels} ch)",
+                    size,
+                    lambda: client.put(local_path, "/b.bin"),
+                )
+                print(f"speedup: {baseline / engine:.2f}x")
+            finally:
+                client.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import queue
+import re
+import shlex
+import threading
+from dataclasses import dataclass
+
+SEARCH_CHUNK = 4 * 1024 * 1024
+SEARCH_WORKERS = 4
+SEARCH_MAX_HITS = 1000
+SEARCH_MAX_FILE_HITS = 100
+SEARCH_MAX_LINE = 1024 * 1024
+SEARCH_SNIPPET = 200
+SEARCH_GREP_BATCH = 200
+SEARCH_GREP_TIMEOUT = 120.0
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    # One matching line: `offset` is the byte offset where the line starts and
+    # `line` is 1-based, as grep -b -n reports them.
+    path: str
+    offset: int
+    line: int
+    text: str
+
+
+def compile_search(query: str, ignore_case: bool = False) -> re.Pattern:
+    # Literal text, or a Python regex after "re:" like the filename filter.
+    flags = re.IGNORECASE if ignore_case else 0
+    if query.startswith("re:"):
+        return re.compile(query[3:].encode("utf-8"), flags)
+    return re.compile(re.escape(query.encode("utf-8")), flags)
+
+
+def _snippet(line: bytes) -> str:
+    return line[:SEARCH_SNIPPET].decode("utf-8", errors="replace").rstrip("\r")
+
+
+def scan_stream(chunks, pattern: re.Pattern, path: str, max_hits: int = SEARCH_MAX_FILE_HITS, cancel=None, max_line: int = SEARCH_MAX_LINE) -> list[SearchHit]:
+    # Matches line by line over a stream of chunks: the partial last line of
+    # each chunk is carried into the next, so a match split by a chunk
+    # boundary is still found. A line longer than `max_line` is searched in
+    # pieces. Binary files (a NUL in the first 4 KB, as grep -I) are skipped.
+    hits = []
+    carry = b""
+    base = 0
+    line_no = 1
+    first = True
+    for chunk in chunks:
+        if cancel is not None and cancel.is_set():
+            break
+        if first:
+            first = False
+            if b"\0" in chunk[:4096]:
+                return hits
+        block = carry + chunk
+        cut = block.rfind(b"\n") + 1
+        if not cut and len(block) > max_line:
+            cut = len(block)
+        line_no = _scan_block(block[:cut], base, line_no, pattern, path, hits, max_hits)
+        if len(hits) >= max_hits:
+            return hits
+        carry = block[cut:]
+        base += cut
+    if carry and not (cancel is not None and cancel.is_set()):
+        _scan_block(carry, base, line_no, pattern, path, hits, max_hits)
+    return hits
+
+
+def _scan_block(block, base, line_no, pattern, path, hits, max_hits):
+    # One hit per matching line; returns the line number after the block.
+    position = 0
+    counted = 0
+    while len(hits) < max_hits:
+        match = pattern.search(block, position)
+        if match is None:
+            break
+        start = block.rfind(b"\n", 0, match.start()) + 1
+        end = block.find(b"\n", match.end())
+        if end == -1:
+            end = len(block)
+        line_no += block.count(b"\n", counted, start)
+        counted = start
+        hits.append(SearchHit(path, base + start, line_no, _snippet(block[start:end])))
+        position = end + 1
+        if position > len(block):
+            break
+    return line_no + block.count(b"\n", counted)
+
+
+def remote_grep(ssh, paths, query: str, ignore_case: bool = False, max_hits: int = SEARCH_MAX_FILE_HITS, cancel=None) -> list[SearchHit] | None:
+    # Runs grep on the server over the session's SSH connection. Returns the
+    # hits, or None when the server cannot run grep over exec or the SFTP
+    # paths are not visible to the shell (chroot), so the caller streams
+    # instead.
+    if ssh is None:
+        return None
+    flags = "-FIsnbHZ" + ("i" if ignore_case else "")
+    command = f"LC_ALL=C grep {flags} -m {int(max_hits)} -e {shlex.quote(query)} -- " + " ".join(shlex.quote(path) for path in paths)
+    hits = []
+    try:
+        _stdin, stdout, _stderr = ssh.exec_command(command, timeout=SEARCH_GREP_TIMEOUT)
+        channel = stdout.channel
+        pending = b""
+        while True:
+            if cancel is not None and cancel.is_set():
+                channel.close()
+                return hits
+            data = channel.recv(65536)
+            if not data:
+                break
+            pending += data
+            lines = pending.split(b"\n")
+            pending = lines.pop()
+            hits.extend(filter(None, map(_parse_grep_line, lines)))
+        if pending:
+            hits.extend(filter(None, [_parse_grep_line(pending)]))
+        # 1 is "no match"; 2 is an error, possibly only for some files.
+        if channel.recv_exit_status() not in (0, 1):
+            return None
+    except Exception:
+        return None
+    return hits
+
+
+def _parse_grep_line(line: bytes) -> SearchHit | None:
+    # path NUL line ":" offset ":" text
+    path, sep, rest = line.partition(b"\0")
+    if not sep:
+        return None
+    parts = rest.split(b":", 2)
+    if len(parts) != 3 or not parts[0].isdigit() or not parts[1].isdigit():
+        return None
+    return SearchHit(path.decode("utf-8", errors="surrogateescape"), int(parts[1]), int(parts[0]), _snippet(parts[2]))
+
+
+class ContentSearch:
+    # Searches the contents of a set of remote files. Literal queries are
+    # pushed down to grep on the server when it can run it; otherwise (and for
+    # regex queries, whose syntax grep does not share) up to `workers` files
+    # are streamed at once through the client in SEARCH_CHUNK pieces.
+    def __init__(self, client, query: str, ignore_case: bool = False, workers: int = SEARCH_WORKERS, max_hits: int = SEARCH_MAX_HITS, use_grep: bool = True, grep=None):
+        self.client = client
+        self.query = query
+        self.ignore_case = ignore_case
+        self.pattern = compile_search(query, ignore_case)
+        self.workers = workers
+        self.max_hits = max_hits
+        self.use_grep = use_grep and not query.startswith("re:")
+        self.grep = grep or (lambda paths, cancel: remote_grep(client.ssh, paths, query, ignore_case, cancel=cancel))
+        self.method = None
+        self.errors: list[tuple[str, Exception]] = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def run(self, paths, on_hits=None, progress=None) -> list[SearchHit]:
+        # on_hits(hits) is called from worker threads as results arrive;
+        # progress(done, total) after each file (or grep batch).
+        paths = list(paths)
+        if self.use_grep:
+            hits = self._run_grep(paths, on_hits, progress)
+            if hits is not None:
+                self.method = "grep"
+                return hits
+        self.method = "stream"
+        return self._run_stream(paths, on_hits, progress)
+
+    def _run_grep(self, paths, on_hits, progress):
+        hits = []
+        for start in range(0, len(paths), SEARCH_GREP_BATCH):
+            if self.cancelled or len(hits) >= self.max_hits:
+                break
+            batch = self.grep(paths[start : start + SEARCH_GREP_BATCH], self._cancel)
+            if batch is None:
+                if hits:
+                    # Part of the files were searched; stream only the rest.
+                    return (hits + self._run_stream(paths[start:], on_hits, progress))[: self.max_hits]
+                return None
+            batch = batch[: self.max_hits - len(hits)]
+            hits.extend(batch)
+            if on_hits and batch:
+                on_hits(batch)
+            if progress:
+                progress(min(start + SEARCH_GREP_BATCH, len(paths)), len(paths))
+        return hits
+
+    def _run_stream(self, paths, on_hits, progress):
+        pending = queue.SimpleQueue()
+        for position, path in enumerate(paths):
+            pending.put((position, path))
+        found = {}
+        done = [0]
+
+        def worker():
+            while not self.cancelled:
+                with self._lock:
+                    if sum(map(len, found.values())) >= self.max_hits:
+                        return
+                try:
+                    position, path = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    hits = self._search_file(path)
+                except Exception as exc:
+                    hits = []
+                    with self._lock:
+                        self.errors.append((path, exc))
+                with self._lock:
+                    found[position] = hits
+                    done[0] += 1
+                    finished = done[0]
+                if on_hits and hits:
+                    on_hits(hits)
+                if progress:
+                    progress(finished, len(paths))
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(self.workers, len(paths)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Results in the order the files were given, whatever order they
+        # finished in.
+        hits = [hit for position in sorted(found) for hit in found[position]]
+        return hits[: self.max_hits]
+
+    def _search_file(self, path):
+        chunks = self.client.stream_file(path, SEARCH_CHUNK)
+        try:
+            return scan_stream(chunks, self.pattern, path, cancel=self._cancel)
+        finally:
+            chunks.close()
@@ -0,0 +1,227 @@
+import bisect
+import fnmatch
+import operator
+import re
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+
+FILTER_INDEX_MIN = 50_000
+FILTER_INDEX_GIVE_UP = 8
+
+SIZE_UNITS = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024**2, "mb": 1024**2, "g": 1024**3, "gb": 1024**3, "t": 1024**4, "tb": 1024**4}
+AGE_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "=": operator.eq}
+PREDICATE_COLUMNS = {"size": "size", "mtime": "mtime", "modified": "mtime"}
+
+# An age reads the other way round from a timestamp: mtime<7d is "less than
+# 7 days old", i.e. a timestamp after now - 7d.
+_AGE_OPERATORS = {"<": ">", ">": "<", "<=": ">=", ">=": "<=", "=": "="}
+_PREDICATE = re.compile(r"^(size|mtime|modified)(>=|<=|>|<|=)(.+)$", re.IGNORECASE)
+_SIZE = re.compile(r"^(\d+(?:\.\d+)?)\s*([a-z]*)$")
+_AGE = re.compile(r"^(\d+(?:\.\d+)?)([mhdw])$")
+
+
+@dataclass(frozen=True)
+class FilterQuery:
+    # Substring terms are casefolded and must all match. Patterns are
+    # ("glob", source) or ("regex", source) pairs; predicates are
+    # (column, operator, value) triples on the raw size/mtime columns.
+    # `predicate_keys` identify the predicates as typed: a relative age keys
+    # on its length ("age", seconds), not on the timestamp it resolved to at
+    # parse time, which moves with every keystroke.
+    terms: tuple[str, ...] = ()
+    patterns: tuple[tuple[str, str], ...] = ()
+    predicates: tuple[tuple[str, str, float], ...] = ()
+    show_hidden: bool = True
+    predicate_keys: tuple[tuple, ...] = ()
+
+    @property
+    def empty(self) -> bool:
+        return not (self.terms or self.patterns or self.predicates)
+
+    def narrows(self, previous: "FilterQuery") -> bool:
+        # True when every row matching self also matches `previous`, so the
+        # previous result set can be filtered instead of the whole listing.
+        # A kept age counts as the same predicate; its cutoff only moves by
+        # the seconds between keystrokes, and the refined result is as of
+        # when it was first typed.
+        return (
+            (previous.show_hidden or not self.show_hidden)
+            and set(previous.patterns) <= set(self.patterns)
+            and set(previous.predicate_keys) <= set(self.predicate_keys)
+            and all(any(old in new for new in self.terms) for old in previous.terms)
+        )
+
+
+def parse_size(text: str) -> int:
+    match = _SIZE.match(text.strip().lower())
+    if not match or match.group(2) not in SIZE_UNITS:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def parse_time(text: str, now: float | None = None) -> float:
+    # Absolute dates ("2024-05-01", "2024-05-01 13:30") or ages ("7d", "12h"),
+    # which mean that long before now.
+    text = text.strip().lower()
+    match = _AGE.match(text)
+    if match:
+        return (time.time() if now is None else now) - float(match.group(1)) * AGE_UNITS[match.group(2)]
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date or age: {text}")
+
+
+def parse_query(text: str, show_hidden: bool = True, now: float | None = None) -> FilterQuery:
+    # Whitespace separated tokens: `size>10M`, `mtime<7d` (changed within
+    # the last 7 days; `mtime>7d` is older, `mtime<2024-05-01` before that
+    # date), `re:^core\.\d+$`, globs such as `*.log`, and plain substrings.
+    # Raises ValueError for malformed predicates and regexes.
+    terms, patterns, predicates, keys = [], [], [], []
+    for token in text.split():
+        predicate = _PREDICATE.match(token)
+        if predicate:
+            column = PREDICATE_COLUMNS[predicate.group(1).lower()]
+            operator, operand = predicate.group(2), predicate.group(3)
+            if column == "size":
+                value = parse_size(operand)
+                key = (column, operator, value)
+            else:
+                value = parse_time(operand, now)
+                age = _AGE.match(operand.strip().lower())
+                if age:
+                    key = (column, operator, "age", float(age.group(1)) * AGE_UNITS[age.group(2)])
+                    operator = _AGE_OPERATORS[operator]
+                else:
+                    key = (column, operator, value)
+            predicates.append((column, operator, value))
+            keys.append(key)
+        elif token.startswith("re:") and len(token) > 3:
+            try:
+                compile_pattern("regex", token[3:])
+            except re.error as exc:
+                raise ValueError(f"Invalid regex {token[3:]}: {exc}") from None
+            patterns.append(("regex", token[3:]))
+        elif any(char in token for char in "*?["):
+            patterns.append(("glob", token))
+        else:
+            terms.append(token.casefold())
+    return FilterQuery(tuple(terms), tuple(patterns), tuple(predicates), show_hidden, tuple(keys))
+
+
+@lru_cache(maxsize=64)
+def compile_pattern(kind: str, source: str):
+    # Globs match the whole name, regexes anywhere in it; both ignore case.
+    if kind == "glob":
+        return re.compile(fnmatch.translate(source), re.IGNORECASE).match
+    return re.compile(source, re.IGNORECASE).search
+
+
+class ListingFilter:
+    # Filters one Listing into a new Listing. Derived data is prepared on first
+    # use, which the UI does off the Tk thread for large listings:
+    # - casefolded names and a hidden-file mask; size and mtime predicates read
+    #   the listing's own columns;
+    # - for listings of FILTER_INDEX_MIN rows or more, a name index: all names
+    #   joined into one string plus the start offset of each, so a selective
+    #   substring query is a few C-level str.find calls instead of a scan. A
+    #   trigram index would narrow further, but costs seconds to build at 1M
+    #   names while a full scan costs ~0.1 s.
+    # The last query and its result are kept; a query that narrows it (a
+    # longer term, an extra predicate) only re-checks the previous matches.
+    def __init__(self, rows, index_min: int = FILTER_INDEX_MIN):
+        self.rows = rows
+        self.index_min = index_min
+        self.names = None
+        self._lock = threading.Lock()
+        self._last = None
+
+    def prepare(self):
+        with self._lock:
+            self._prepare()
+
+    def _prepare(self):
+        if self.names is not None:
+            return
+        rows = self.rows
+        self.originals = rows.names
+        self.names = [name.casefold() for name in self.originals]
+        self.columns = {"size": rows.sizes, "mtime": rows.mtimes}
+        self.hidden = bytes(name.startswith(".") for name in self.originals)
+        self._blob = None
+        if len(rows) >= self.index_min:
+            self._blob = "\n".join(self.names)
+            starts = array("q")
+            offset = 0
+            for name in self.names:
+                starts.append(offset)
+                offset += len(name) + 1
+            self._starts = starts
+
+    def filter(self, query: FilterQuery):
+        with self._lock:
+            if query.empty and query.show_hidden:
+                self._last = None
+                return self.rows
+            self._prepare()
+            indices = self._match(query)
+            self._last = (query, indices)
+        return self.rows.select(indices)
+
+    def _match(self, query):
+        indices = None
+        terms = list(query.terms)
+        if self._last is not None and query.narrows(self._last[0]):
+            indices = self._last[1]
+        elif terms and self._blob is not None:
+            longest = max(terms, key=len)
+            indices = self._search_index(longest)
+            if indices is not None:
+                terms.remove(longest)
+        names = self.names
+        if not query.show_hidden:
+            hidden = self.hidden
+            indices = [i for i in self._all(indices) if not hidden[i]]
+        for term in terms:
+            if indices is None:
+                indices = [i for i, name in enumerate(names) if term in name]
+            else:
+                indices = [i for i in indices if term in names[i]]
+        for kind, source in query.patterns:
+            test = compile_pattern(kind, source)
+            originals = self.originals
+            indices = [i for i in self._all(indices) if test(originals[i])]
+        for column, op, value in query.predicates:
+            values = self.columns[column]
+            compare = OPERATORS[op]
+            indices = [i for i in self._all(indices) if compare(values[i], value)]
+        return list(self._all(indices))
+
+    def _all(self, indices):
+        return range(len(self.rows)) if indices is None else indices
+
+    def _search_index(self, term):
+        # Returns matching row indices, or None when the term is too common for
+        # the index to beat a scan.
+        if "\n" in term:
+            return []
+        blob, starts = self._blob, self._starts
+        limit = max(1, len(starts) // FILTER_INDEX_GIVE_UP)
+        found = []
+        position = blob.find(term)
+        while position != -1:
+            row = bisect.bisect_right(starts, position) - 1
+            found.append(row)
+            if len(found) > limit:
+                return None
+            if row + 1 >= len(starts):
+                break
+            position = blob.find(term, starts[row + 1])
+        return found
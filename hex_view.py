@@ -0,0 +1,83 @@
+import binascii
+import re
+
+HEX_ROW_BYTES = 16
+HEX_SEARCH_CHUNK = 4 * 1024 * 1024
+
+# Printable ASCII maps to itself, everything else to ".".
+_ASCII = bytes(byte if 32 <= byte <= 126 else 46 for byte in range(256))
+_HEX_PATTERN = re.compile(r"(?:0x)?((?:[0-9a-fA-F]{2}\s*)+)")
+
+
+def offset_width(size: int) -> int:
+    # Hex digits in the offset column: 8, or more for files past 4 GB.
+    return max(8, len(f"{max(size - 1, 0):x}"))
+
+
+def format_hex_rows(data: bytes, offset: int, width: int = 8) -> list[str]:
+    # "offset  hex bytes  ascii" rows of HEX_ROW_BYTES. The hex and ASCII
+    # columns are made for the whole block at once (hexlify with a separator,
+    # translate through a table) and only sliced per row.
+    step = HEX_ROW_BYTES
+    hex_all = binascii.hexlify(data, " ").decode("ascii")
+    ascii_all = data.translate(_ASCII).decode("ascii")
+    span = step * 3
+    pad = span - 1
+    return [
+        f"{offset + start:0{width}x}  {hex_all[start * 3 : start * 3 + pad]:<{pad}}  {ascii_all[start : start + step]}"
+        for start in range(0, len(data), step)
+    ]
+
+
+def read_hex_rows(read, size: int, first_row: int, count: int) -> list[str]:
+    # Rows first_row .. first_row + count of a file, with one read(offset,
+    # size) call.
+    start = first_row * HEX_ROW_BYTES
+    length = min(count * HEX_ROW_BYTES, max(0, size - start))
+    if length <= 0:
+        return []
+    return format_hex_rows(read(start, length), start, offset_width(size))
+
+
+def parse_offset(text: str) -> int:
+    # "0x1f40" or "1f40h" are hex, plain digits decimal.
+    text = text.strip().lower().replace("_", "")
+    if text.startswith("0x"):
+        return int(text[2:], 16)
+    if text.endswith("h"):
+        return int(text[:-1], 16)
+    return int(text)
+
+
+def parse_pattern(text: str) -> bytes:
+    # Hex bytes ("de ad be ef", "0xdeadbeef"), or text in quotes ("PK", 'IEND')
+    # searched as UTF-8. Anything else that is not hex is taken as text too.
+    stripped = text.strip()
+    if len(stripped) >= 2 and stripped[0] == stripped[-1] and stripped[0] in "'\"":
+        pattern = stripped[1:-1].encode("utf-8")
+    else:
+        match = _HEX_PATTERN.fullmatch(stripped)
+        pattern = binascii.unhexlify(re.sub(r"\s", "", match.group(1))) if match else stripped.encode("utf-8")
+    if not pattern:
+        raise ValueError("Empty search pattern.")
+    return pattern
+
+
+def find_bytes(chunks, pattern: bytes, start: int = 0, cancel=None) -> int | None:
+    # Offset of the first `pattern` in a stream of chunks that begins at file
+    # offset `start`. The last len(pattern) - 1 bytes of each chunk are kept
+    # for the next, so a match split by a chunk boundary is still found.
+    keep = len(pattern) - 1
+    tail = b""
+    base = start
+    for chunk in chunks:
+        if cancel is not None and cancel.is_set():
+            return None
+        block = tail + chunk
+        position = block.find(pattern)
+        if position != -1:
+            return base + position
+        cut = max(0, len(block) - keep)
+        tail = block[cut:]
+        base += cut
+    return None
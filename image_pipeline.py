@@ -0,0 +1,163 @@
+import collections
+import io
+import threading
+
+from PIL import Image
+
+IMAGE_HEADER_BYTES = 64 * 1024
+IMAGE_HEADER_MAX = 1024 * 1024
+IMAGE_DRAFT_SIZE = 2048
+IMAGE_PYRAMID_BYTES = 192 * 1024 * 1024
+IMAGE_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def probe_image(read, size: int) -> tuple[str, tuple[int, int]]:
+    # (format, (width, height)) from the first bytes of a file: Image.open
+    # only parses headers. JPEGs with large EXIF blocks put their size marker
+    # further in, so the read doubles up to IMAGE_HEADER_MAX.
+    length = IMAGE_HEADER_BYTES
+    while True:
+        head = read(0, min(length, size))
+        try:
+            with Image.open(io.BytesIO(head)) as image:
+                return image.format, image.size
+        except (OSError, SyntaxError):
+            if length >= min(size, IMAGE_HEADER_MAX):
+                raise
+            length *= 2
+
+
+def draft_size(full_size: tuple[int, int], limit: int = IMAGE_DRAFT_SIZE) -> tuple[int, int]:
+    # The full size scaled to fit a limit x limit box (never enlarged).
+    width, height = full_size
+    ratio = min(1.0, limit / max(width, height, 1))
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+
+def decode_image(data: bytes, target: tuple[int, int] | None = None) -> tuple[Image.Image, tuple[int, int]]:
+    # Returns (image, full size). With a target, JPEGs decode at the smallest
+    # 1/2, 1/4 or 1/8 scale that still covers it (Image.draft), which skips
+    # most of the IDCT work for photos far larger than the screen.
+    image = Image.open(io.BytesIO(data))
+    full_size = image.size
+    if target and image.format == "JPEG":
+        image.draft("RGB", target)
+    image.load()
+    if image.mode not in ("RGB", "RGBA", "L"):
+        transparent = "transparency" in image.info or image.mode in ("LA", "PA", "RGBa")
+        image = image.convert("RGBA" if transparent else "RGB")
+    return image, full_size
+
+
+def _nbytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+class ImagePyramid:
+    # Pre-scaled copies of a decoded image, each half the size of the one
+    # before, made on first use with Image.reduce. A render starts from the
+    # smallest level that still covers the requested size, so zooming out of
+    # a 40 MP photo resizes a screen-sized level instead of the original.
+    # Levels that would exceed `max_bytes` are used once and not kept.
+    def __init__(self, image: Image.Image, full_size: tuple[int, int], max_bytes: int = IMAGE_PYRAMID_BYTES):
+        self.full_size = full_size
+        self.max_bytes = max_bytes
+        self.levels = [image]
+        self._lock = threading.Lock()
+
+    @property
+    def base(self) -> Image.Image:
+        return self.levels[0]
+
+    @property
+    def complete(self) -> bool:
+        # False while the base is a reduced (draft) decode.
+        return self.base.size == self.full_size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(map(_nbytes, self.levels))
+
+    def level_for(self, size: tuple[int, int]) -> Image.Image:
+        with self._lock:
+            level = self.levels[0]
+            depth = 0
+            while level.width // 2 >= max(size[0], 1) and level.height // 2 >= max(size[1], 1):
+                depth += 1
+                if depth < len(self.levels):
+                    level = self.levels[depth]
+                    continue
+                level = level.reduce(2)
+                if self.nbytes + _nbytes(level) <= self.max_bytes:
+                    self.levels.append(level)
+            return level
+
+    def render(self, size: tuple[int, int], quality: bool = False) -> Image.Image:
+        # BILINEAR from a level at most 2x the target while interacting;
+        # LANCZOS for the final frame.
+        source = self.level_for(size)
+        if source.size == size:
+            return source
+        return source.resize(size, Image.Resampling.LANCZOS if quality else Image.Resampling.BILINEAR)
+
+
+class PyramidCache:
+    # Recently viewed pyramids, least recently used dropped first once their
+    # levels exceed `max_bytes`.
+    def __init__(self, max_bytes: int = IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key) -> ImagePyramid | None:
+        with self._lock:
+            pyramid = self._entries.get(key)
+            if pyramid is not None:
+                self._entries.move_to_end(key)
+            return pyramid
+
+    def put(self, key, pyramid: ImagePyramid):
+        with self._lock:
+            self._entries[key] = pyramid
+            self._entries.move_to_end(key)
+            while len(self._entries) > 1 and sum(entry.nbytes for entry in self._entries.values()) > self.max_bytes:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LatestRenderer:
+    # One background thread that runs only the most recent job: renders
+    # requested while one is running replace each other, so a burst of zoom
+    # steps costs at most two renders.
+    def __init__(self):
+        self._pending = None
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def submit(self, job, done):
+        # done(result) runs on the worker thread; result is None if job raised.
+        with self._condition:
+            self._pending = (job, done)
+            self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                job, done = self._pending
+                self._pending = None
+            try:
+                result = job()
+            except Exception:
+                result = None
+            done(result)
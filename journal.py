@@ -0,0 +1,136 @@
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+JOURNAL_DIR_NAME = "transfers"
+CHECKPOINT_BYTES = 8 * 1024 * 1024
+CHECKPOINT_SECONDS = 2.0
+
+
+def merge_range(ranges: list[list[int]], start: int, end: int):
+    # `ranges` is a sorted list of disjoint [start, end) pairs, updated in place.
+    idx = bisect.bisect_left(ranges, [start, start])
+    if idx and ranges[idx - 1][1] >= start:
+        idx -= 1
+    while idx < len(ranges) and ranges[idx][0] <= end:
+        start = min(start, ranges[idx][0])
+        end = max(end, ranges[idx][1])
+        del ranges[idx]
+    ranges.insert(idx, [start, end])
+
+
+def missing_ranges(ranges: list[list[int]], total: int) -> list[tuple[int, int]]:
+    gaps = []
+    cursor = 0
+    for start, end in ranges:
+        if start > cursor:
+            gaps.append((cursor, start - cursor))
+        cursor = max(cursor, end)
+    if cursor < total:
+        gaps.append((cursor, total - cursor))
+    return gaps
+
+
+class Checkpoint:
+    # Completed byte ranges for one transfer. Flushed to disk every few MB or
+    # seconds; the data itself relies on the OS page cache, which survives an
+    # application crash or a dropped link but not a power loss.
+    def __init__(self, path: Path, data: dict):
+        self.path = path
+        self.data = data
+        self._lock = threading.Lock()
+        self._unflushed = 0
+        self._flushed_at = time.monotonic()
+
+    @property
+    def size(self) -> int:
+        return self.data.get("size", -1)
+
+    @property
+    def completed(self) -> int:
+        return sum(end - start for start, end in self.data["ranges"])
+
+    def matches(self, size: int, mtime: float) -> bool:
+        return bool(self.data["ranges"]) and self.data.get("size") == size and self.data.get("mtime") == mtime
+
+    def reset(self, size: int, mtime: float):
+        with self._lock:
+            self.data.update(size=size, mtime=mtime, ranges=[], remote=None)
+        self.flush()
+
+    def set_remote(self, size: int | None, mtime: float | None = None):
+        # Remote size/mtime an upload left behind; None clears it.
+        with self._lock:
+            self.data["remote"] = None if size is None else [size, mtime]
+
+    def remote_matches(self, size: int, mtime: float) -> bool:
+        return self.data.get("remote") == [size, mtime]
+
+    def missing(self) -> list[tuple[int, int]]:
+        with self._lock:
+            return missing_ranges(self.data["ranges"], self.size)
+
+    def mark(self, offset: int, length: int):
+        with self._lock:
+            merge_range(self.data["ranges"], offset, offset + length)
+            self._unflushed += length
+            due = self._unflushed >= CHECKPOINT_BYTES or time.monotonic() - self._flushed_at >= CHECKPOINT_SECONDS
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            self.data["updated"] = time.time()
+            payload = json.dumps(self.data)
+            self._unflushed = 0
+            self._flushed_at = time.monotonic()
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def finish(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class TransferJournal:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(session: str, direction: str, remote_path: str, local_path: str) -> str:
+        raw = "\0".join((session, direction, remote_path, os.path.abspath(local_path)))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def open(self, session: str, direction: str, remote_path: str, local_path: str) -> Checkpoint:
+        path = self.directory / f"{self.key(session, direction, remote_path, local_path)}.json"
+        data = self._read(path) or {}
+        data.update(session=session, direction=direction, remote_path=remote_path, local_path=os.path.abspath(local_path))
+        data.setdefault("ranges", [])
+        return Checkpoint(path, data)
+
+    def pending(self, session: str | None = None) -> list[dict]:
+        entries = []
+        for path in sorted(self.directory.glob("*.json")):
+            data = self._read(path)
+            if data and (session is None or data.get("session") == session):
+                entries.append(data)
+        return entries
+
+    def discard(self, session: str, direction: str, remote_path: str, local_path: str):
+        self.open(session, direction, remote_path, local_path).finish()
+
+    @staticmethod
+    def _read(path: Path) -> dict | None:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        return data if isinstance(data, dict) else None
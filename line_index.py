@@ -0,0 +1,196 @@
+import hashlib
+import os
+import struct
+from array import array
+
+LINE_INDEX_DIR_NAME = "line-index"
+LINE_INDEX_EVERY = 1000
+LINE_INDEX_CHUNK = 4 * 1024 * 1024
+LINE_READ_STEP = 64 * 1024
+
+_HEADER = struct.Struct("<4sqqqqq")
+_MAGIC = b"LIX1"
+
+
+def codepoint_boundary(data: bytes) -> int:
+    # Length of the longest prefix of `data` that does not end inside a UTF-8
+    # sequence.
+    end = len(data)
+    for back in range(1, min(4, end) + 1):
+        byte = data[end - back]
+        if byte < 0x80:
+            return end
+        if byte >= 0xC0:
+            need = 2 if byte < 0xE0 else 3 if byte < 0xF0 else 4
+            return end if back >= need else end - back
+    return end
+
+
+def align_page(data: bytes, trim_head: bool, trim_tail: bool) -> tuple[bytes, int]:
+    # Trims a byte page to whole lines: the partial first line when the page
+    # starts mid-file, and the partial last line when it ends before EOF (or,
+    # for one huge line, the partial last character). Returns the page and
+    # how many bytes were dropped from its head.
+    skipped = 0
+    if trim_head:
+        newline = data.find(b"\n")
+        if newline != -1 and newline < len(data) - 1:
+            skipped = newline + 1
+            data = data[skipped:]
+    if trim_tail:
+        newline = data.rfind(b"\n")
+        data = data[: newline + 1] if newline != -1 else data[: codepoint_boundary(data)]
+    return data, skipped
+
+
+class LineIndex:
+    # Sparse line offsets for one version of a file: checkpoints[i] is the
+    # byte offset where line i * every starts, in an array("q"), so a 1 GB log
+    # of 80-byte lines needs ~100 KB. `lines` counts newlines seen so far.
+    def __init__(self, size: int, mtime: int, every: int = LINE_INDEX_EVERY):
+        self.size = size
+        self.mtime = mtime
+        self.every = every
+        self.checkpoints = array("q", [0])
+        self.lines = 0
+        self.scanned = 0
+        self.complete = False
+        self._open_line = False
+
+    @property
+    def total_lines(self) -> int:
+        # A last line without a trailing newline still counts.
+        return self.lines + (1 if self._open_line else 0)
+
+    def feed(self, data: bytes):
+        count = data.count(b"\n")
+        target = len(self.checkpoints) * self.every - self.lines
+        if target <= count:
+            position = -1
+            seen = 0
+            while target <= count:
+                while seen < target:
+                    position = data.find(b"\n", position + 1)
+                    seen += 1
+                self.checkpoints.append(self.scanned + position + 1)
+                target += self.every
+        self.lines += count
+        self.scanned += len(data)
+        if data:
+            self._open_line = not data.endswith(b"\n")
+
+    def finish(self):
+        self.complete = True
+
+    def seek(self, line: int) -> tuple[int, int]:
+        # (first line, byte offset) of the nearest checkpoint at or before
+        # `line`.
+        slot = max(0, min(line // self.every, len(self.checkpoints) - 1))
+        return slot * self.every, self.checkpoints[slot]
+
+    def to_bytes(self) -> bytes:
+        header = _HEADER.pack(_MAGIC, self.size, self.mtime, self.every, self.lines, int(self._open_line))
+        return header + self.checkpoints.tobytes()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "LineIndex":
+        magic, size, mtime, every, lines, open_line = _HEADER.unpack_from(payload)
+        if magic != _MAGIC:
+            raise ValueError("Not a line index")
+        index = cls(size, mtime, every)
+        index.checkpoints = array("q")
+        index.checkpoints.frombytes(payload[_HEADER.size :])
+        index.lines = lines
+        index.scanned = size
+        index._open_line = bool(open_line)
+        index.complete = True
+        return index
+
+
+def build_line_index(chunks, size: int, mtime: int, cancel=None, progress=None, every: int = LINE_INDEX_EVERY) -> LineIndex | None:
+    # Indexes a file streamed as byte chunks. Returns None when `cancel` (a
+    # threading.Event) is set; `progress` gets the scanned fraction.
+    index = LineIndex(size, mtime, every)
+    for data in chunks:
+        if cancel is not None and cancel.is_set():
+            return None
+        index.feed(data)
+        if progress:
+            progress(index.scanned / size if size else 1.0)
+    index.finish()
+    return index
+
+
+def read_lines(read, index: LineIndex, first_line: int, count: int, max_bytes: int) -> tuple[bytes, int, int]:
+    # Reads `count` lines starting at `first_line` with read(offset, size),
+    # starting from the nearest checkpoint. Returns (data, start, end) byte
+    # offsets; a page is cut at max_bytes (on a character boundary) when the
+    # lines are longer than that.
+    base_line, offset = index.seek(first_line)
+    skip = first_line - base_line
+    buffer = bytearray()
+    scan = 0
+    start = None
+    found = 0
+    eof = False
+    while True:
+        if start is None:
+            while skip:
+                newline = buffer.find(b"\n", scan)
+                if newline == -1:
+                    break
+                scan = newline + 1
+                skip -= 1
+            if not skip:
+                start = scan
+        if start is not None:
+            while found < count:
+                newline = buffer.find(b"\n", scan)
+                if newline == -1:
+                    break
+                scan = newline + 1
+                found += 1
+            if found >= count or len(buffer) - start >= max_bytes:
+                break
+        if eof:
+            break
+        chunk = read(offset + len(buffer), LINE_READ_STEP)
+        buffer += chunk
+        eof = len(chunk) < LINE_READ_STEP
+    if start is None:
+        return b"", offset + len(buffer), offset + len(buffer)
+    if found >= count:
+        end = scan
+    elif eof and len(buffer) - start < max_bytes:
+        end = len(buffer)
+    else:
+        end = start + max_bytes
+        end = start + codepoint_boundary(bytes(buffer[start:end]))
+    return bytes(buffer[start:end]), offset + start, offset + end
+
+
+class LineIndexStore:
+    # Completed indexes on disk, one file per (session, path, size, mtime),
+    # so reopening an unchanged file reuses its index.
+    def __init__(self, directory):
+        self.directory = os.fspath(directory)
+
+    def _path(self, session: str, path: str, size: int, mtime: int) -> str:
+        digest = hashlib.sha1(f"{session}\0{path}\0{size}\0{mtime}".encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.lix")
+
+    def load(self, session: str, path: str, size: int, mtime: int) -> LineIndex | None:
+        try:
+            with open(self._path(session, path, size, mtime), "rb") as handle:
+                index = LineIndex.from_bytes(handle.read())
+        except (OSError, ValueError, struct.error):
+            return None
+        return index if (index.size, index.mtime) == (size, mtime) else None
+
+    def save(self, session: str, path: str, index: LineIndex):
+        os.makedirs(self.directory, exist_ok=True)
+        target = self._path(session, path, index.size, index.mtime)
+        temp = target + ".tmp"
+        with open(temp, "wb") as handle:
+            handle.write(index.to_bytes())
+        os.replace(temp, target)
@@ -1,5 +1,8 @@
+import codecs
 from dataclasses import dataclass
 
+SNIFF_SAMPLE = 4096
+
 TEXT_EXTENSIONS = {
     ".txt",
     ".md",
@@ -34,7 +37,7 @@ TEXT_EXTENSIONS = {
     ".f90",
 }
 
-IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".tif", ".tiff"}
 
 
 @dataclass
@@ -43,22 +46,46 @@ class DecodedText:
     encoding: str
 
 
+# Tab, LF, CR and printable ASCII; bytes.translate(None, _PRINTABLE) deletes
+# them in C, so the printable count is the length difference.
+_PRINTABLE = bytes([9, 10, 13, *range(32, 127)])
+
+
 def looks_like_text(sample: bytes) -> bool:
     if not sample:
         return True
     if b"\x00" in sample:
-        # UTF-16 often has many nulls; allow it if pattern matches.
-        even_null = sum(1 for i in range(0, len(sample), 2) if sample[i] == 0)
-        odd_null = sum(1 for i in range(1, len(sample), 2) if sample[i] == 0)
+        # UTF-16 puts its nulls in one lane (every other byte); judge the
+        # other lane. Nulls scattered across both lanes mean binary.
+        even, odd = sample[0::2], sample[1::2]
+        even_null, odd_null = even.count(0), odd.count(0)
         if max(even_null, odd_null) < len(sample) * 0.15:
             return False
-    printable = 0
-    for b in sample:
-        if b in (9, 10, 13) or 32 <= b <= 126:
-            printable += 1
+        sample = odd if even_null > odd_null else even
+        if sample[:1] in (b"\xff", b"\xfe"):
+            sample = sample[1:]
+        if not sample:
+            return True
+    printable = len(sample) - len(sample.translate(None, _PRINTABLE))
     return (printable / len(sample)) >= 0.70
 
 
+def sniff_text(read, size: int, sample_size: int = SNIFF_SAMPLE) -> bool:
+    # Samples the head, then the middle and tail of larger files, with
+    # read(offset, size); a text header on a binary body is caught without
+    # reading it all. Stops at the first sample that looks binary.
+    if not looks_like_text(read(0, sample_size)):
+        return False
+    if size <= 3 * sample_size:
+        return True
+    for offset in (size // 2, size - sample_size):
+        # Even offsets keep UTF-16 lanes aligned.
+        offset -= offset % 2
+        if not looks_like_text(read(offset, sample_size)):
+            return False
+    return True
+
+
 def decode_bytes(data: bytes) -> DecodedText:
     if not data:
         return DecodedText("", "utf-8")
@@ -70,14 +97,22 @@ def decode_bytes(data: bytes) -> DecodedText:
         except UnicodeDecodeError:
             pass
 
-    for enc in ("utf-8", "utf-16"):
+    try:
+        # Stops at the first invalid byte; a character cut off by the end
+        # of a page is not an error.
+        return DecodedText(codecs.getincrementaldecoder("utf-8")().decode(data), "utf-8")
+    except UnicodeDecodeError:
+        pass
+
+    # BOM-less UTF-16 is only plausible with nulls in it; without this check
+    # any even-length Latin-1 page would "decode" as UTF-16.
+    if b"\x00" in data:
         try:
-            text = data.decode(enc)
-            if enc == "utf-16" and "\x00" in text:
-                continue
-            return DecodedText(text, enc)
+            text = data.decode("utf-16")
+            if "\x00" not in text:
+                return DecodedText(text, "utf-16")
         except UnicodeDecodeError:
-            continue
+            pass
 
     return DecodedText(data.decode("latin-1", errors="replace"), "latin-1")
 
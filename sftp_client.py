@@ -1,111 +1,1689 @@
+import collections
+import hashlib
+import mmap
 import os
+import posixpath
+import queue
 import stat
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
-from datetime import datetime
 
 import paramiko
+from paramiko.sftp import (
+    CMD_ATTRS,
+    CMD_CLOSE,
+    CMD_DATA,
+    CMD_HANDLE,
+    CMD_MKDIR,
+    CMD_NAME,
+    CMD_OPEN,
+    CMD_OPENDIR,
+    CMD_READ,
+    CMD_READDIR,
+    CMD_REALPATH,
+    CMD_STAT,
+    CMD_STATUS,
+    CMD_WRITE,
+    SFTP_FLAG_CREATE,
+    SFTP_FLAG_READ,
+    SFTP_FLAG_TRUNC,
+    SFTP_FLAG_WRITE,
+    SFTPError,
+    int64,
+)
+
+from listing import Listing, RemoteEntry, human_size, join_remote  # noqa: F401
+
+TRANSFER_BLOCK_SIZE = 32 * 1024
+TRANSFER_SEGMENT_SIZE = 8 * 1024 * 1024
+TRANSFER_MAX_REQUESTS = 64
+TRANSFER_MAX_INFLIGHT = 32 * 1024 * 1024
+TRANSFER_CHANNELS = 4
+POOL_CHANNELS = 6
+POOL_INTERACTIVE_RESERVE = 2
+POOL_HEALTH_INTERVAL = 30.0
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+SMALL_FILE_LIMIT = 256 * 1024
+SMALL_FILE_BATCH = 64
+WALK_MAX_INFLIGHT = 16
+TREE_WORKERS = 4
+LIST_READAHEAD = 4
+LIST_MAX_READAHEAD = 64
+LISTING_CACHE_ENTRIES = 128
+LISTING_CACHE_BYTES = 64 * 1024 * 1024
+LISTING_CACHE_TTL = 60.0
+LISTING_ROW_BYTES = 80
+PREVIEW_BLOCK_SIZE = 64 * 1024
+PREVIEW_CACHE_BYTES = 64 * 1024 * 1024
+PREVIEW_DISK_BYTES = 512 * 1024 * 1024
+PREVIEW_CACHE_DIR_NAME = "preview-cache"
+HANDLE_IDLE_TIMEOUT = 30.0
+HANDLE_MAX_OPEN = 8
+
+
+def split_ranges(total: int, part_size: int) -> list[tuple[int, int]]:
+    return [(offset, min(part_size, total - offset)) for offset in range(0, total, part_size)]
+
+
+def write_at(fd: int, data: bytes, offset: int, lock=None):
+    if hasattr(os, "pwrite"):
+        view = memoryview(data)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+        return
+    # No positional writes on Windows; serialize seek+write instead.
+    with lock or threading.Lock():
+        os.lseek(fd, offset, os.SEEK_SET)
+        os.write(fd, data)
+
+
+class TransferProgress:
+    def __init__(self, total: int, callback=None, transferred: int = 0):
+        self.total = total
+        self.transferred = transferred
+        self._callback = callback
+        self._lock = threading.Lock()
+
+    def add(self, count: int):
+        # The callback runs under the lock so channel workers report in
+        # order and the last report is the final count.
+        with self._lock:
+            self.transferred += count
+            if self._callback:
+                self._callback(self.transferred, self.total)
+
+
+class _ChannelTransfer:
+    # Shared plumbing for the parallel engines. A paramiko SFTP channel must
+    # only be read from one thread at a time, so every worker owns its channel
+    # for the whole transfer and pulls segments from a shared queue.
+    def __init__(
+        self,
+        checkout,
+        checkin=None,
+        channels: int = TRANSFER_CHANNELS,
+        segment_size: int = TRANSFER_SEGMENT_SIZE,
+        block_size: int = TRANSFER_BLOCK_SIZE,
+    ):
+        self.checkout = checkout
+        self.checkin = checkin or (lambda channel: channel.close())
+        self.channels = max(1, channels)
+        self.segment_size = max(block_size, segment_size)
+        self.block_size = block_size
+
+    def _release_channels(self, opened):
+        for channel in opened:
+            try:
+                self.checkin(channel)
+            except Exception:
+                pass
+
+    def _segments(self, ranges):
+        return [(offset + start, length) for offset, total in ranges for start, length in split_ranges(total, self.segment_size)]
+
+    def _run_workers(self, opened, segments, process):
+        pending = queue.SimpleQueue()
+        for segment in segments:
+            pending.put(segment)
+        failed = threading.Event()
+        errors = []
+
+        def next_segments():
+            while not failed.is_set():
+                try:
+                    yield pending.get_nowait()
+                except queue.Empty:
+                    return
+
+        def worker(channel=None):
+            try:
+                if channel is None:
+                    # Extra channels are checked out concurrently and without
+                    # blocking: a transfer never waits on channels held by another.
+                    channel = self.checkout(block=False)
+                    if channel is None:
+                        return
+                    opened.append(channel)
+                process(channel, next_segments(), failed)
+            except Exception as exc:
+                errors.append(exc)
+                failed.set()
+
+        workers = min(self.channels, len(segments))
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers - 1)]
+        for thread in threads:
+            thread.start()
+        worker(opened[0])
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+
+class ParallelDownloader(_ChannelTransfer):
+    # Keeps up to `max_requests` reads in flight per channel via readv, and
+    # writes blocks into a preallocated local file with positional writes.
+    def __init__(self, checkout, checkin=None, max_requests: int = TRANSFER_MAX_REQUESTS, **kwargs):
+        super().__init__(checkout, checkin, **kwargs)
+        self.max_requests = max_requests
+
+    def download(self, remote_path: str, local_path: str, callback=None, checkpoint=None, ranges=None) -> int:
+        # With a journal checkpoint, a partial file is resumed only when the
+        # remote size/mtime still match and the local file is still preallocated.
+        # Explicit `ranges` patch an existing local file in place (delta sync).
+        opened = [self.checkout()]
+        try:
+            attrs = opened[0].stat(remote_path)
+            size = attrs.st_size
+            patch = ranges is not None
+            if not patch:
+                ranges = [(0, size)]
+            resume = (
+                not patch
+                and checkpoint is not None
+                and checkpoint.matches(size, attrs.st_mtime)
+                and os.path.isfile(local_path)
+                and os.path.getsize(local_path) == size
+            )
+            if resume:
+                ranges = checkpoint.missing()
+            elif checkpoint is not None:
+                checkpoint.reset(size, attrs.st_mtime)
+            progress = TransferProgress(size, callback, transferred=size - sum(length for _offset, length in ranges))
+            write_lock = threading.Lock()
+            flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0) | (0 if resume or patch else os.O_TRUNC)
+            fd = os.open(local_path, flags, 0o644)
+
+            def process(channel, segments, failed):
+                with channel.open(remote_path, "rb") as handle:
+                    for start, length in segments:
+                        blocks = [(start + off, size) for off, size in split_ranges(length, self.block_size)]
+                        for (offset, size), data in zip(blocks, handle.readv(blocks, self.max_requests)):
+                            if len(data) != size:
+                                raise IOError(f"{remote_path} changed size during download.")
+                            write_at(fd, data, offset, write_lock)
+                            if checkpoint is not None:
+                                checkpoint.mark(offset, size)
+                            progress.add(size)
+                            if failed.is_set():
+                                return
+
+            try:
+                os.ftruncate(fd, size)
+                self._run_workers(opened, self._segments(ranges), process)
+            finally:
+                os.close(fd)
+                if checkpoint is not None:
+                    checkpoint.flush()
+            if checkpoint is not None:
+                checkpoint.finish()
+            return size
+        finally:
+            self._release_channels(opened)
+
+
+class ParallelUploader(_ChannelTransfer):
+    # Streams a memory-mapped local file as pipelined range writes. Each segment
+    # is written through its own remote handle, and closing it collects the
+    # write acknowledgements, so at most `max_inflight` bytes are unacknowledged.
+    def __init__(self, checkout, checkin=None, max_inflight: int = TRANSFER_MAX_INFLIGHT, **kwargs):
+        super().__init__(checkout, checkin, **kwargs)
+        self.max_inflight = max_inflight
+
+    def upload(self, local_path: str, remote_path: str, callback=None, checkpoint=None) -> paramiko.SFTPAttributes:
+        # With a journal checkpoint, a partial upload is resumed only when the
+        # local size/mtime still match and the remote file still has the
+        # size/mtime recorded when the last run stopped; anything else (a
+        # replaced remote file, or a crash before the record) uploads in full.
+        opened = [self.checkout()]
+        try:
+            with open(local_path, "rb") as local:
+                local_attrs = os.fstat(local.fileno())
+                size = local_attrs.st_size
+                ranges = [(0, size)]
+                resume = False
+                if checkpoint is not None and checkpoint.matches(size, local_attrs.st_mtime):
+                    remote_attrs = self._stat(opened[0], remote_path)
+                    resume = remote_attrs is not None and checkpoint.remote_matches(remote_attrs.st_size, remote_attrs.st_mtime)
+                if resume:
+                    ranges = checkpoint.missing()
+                else:
+                    if checkpoint is not None:
+                        checkpoint.reset(size, local_attrs.st_mtime)
+                    opened[0].open(remote_path, "wb").close()
+                progress = TransferProgress(size, callback, transferred=size - sum(length for _offset, length in ranges))
+                if size:
+                    if checkpoint is not None:
+                        # The remote file changes from here on; flushes during
+                        # the run must not vouch for it.
+                        checkpoint.set_remote(None)
+                    with mmap.mmap(local.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        try:
+                            self._upload_mapped(opened, memoryview(mapped), remote_path, ranges, progress, checkpoint)
+                        finally:
+                            if checkpoint is not None:
+                                self._record_remote(opened, remote_path, checkpoint)
+                                checkpoint.flush()
+            attrs = opened[0].stat(remote_path)
+            if attrs.st_size != size:
+                raise IOError(f"size mismatch in put! {attrs.st_size} != {size}")
+            if checkpoint is not None:
+                checkpoint.finish()
+            return attrs
+        finally:
+            self._release_channels(opened)
+
+    @staticmethod
+    def _stat(channel, remote_path) -> paramiko.SFTPAttributes | None:
+        try:
+            return channel.stat(remote_path)
+        except IOError:
+            return None
+
+    def _record_remote(self, opened, remote_path, checkpoint):
+        # The remote size/mtime as this run leaves it, for the next resume to
+        # check. After a dropped link the held channels are dead, so a fresh
+        # one is tried last; if none can stat, no record is kept.
+        for channel in opened:
+            try:
+                attrs = channel.stat(remote_path)
+            except Exception:
+                continue
+            checkpoint.set_remote(attrs.st_size, attrs.st_mtime)
+            return
+        try:
+            channel = self.checkout(block=False)
+        except Exception:
+            return
+        if channel is None:
+            return
+        try:
+            attrs = channel.stat(remote_path)
+            checkpoint.set_remote(attrs.st_size, attrs.st_mtime)
+        except Exception:
+            pass
+        finally:
+            self._release_channels([channel])
+
+    def _upload_mapped(self, opened, view, remote_path, ranges, progress, checkpoint):
+        slots = threading.BoundedSemaphore(max(1, self.max_inflight // self.segment_size))
+
+        def process(channel, segments, failed):
+            for start, length in segments:
+                with slots, channel.open(remote_path, "r+b") as handle:
+                    handle.set_pipelined(True)
+                    handle.seek(start)
+                    for offset, size in split_ranges(length, self.block_size):
+                        handle.write(bytes(view[start + offset : start + offset + size]))
+                        progress.add(size)
+                        if failed.is_set():
+                            return
+                # Closing the handle collected every write ack for this segment.
+                if checkpoint is not None:
+                    checkpoint.mark(start, length)
+
+        try:
+            self._run_workers(opened, self._segments(ranges), process)
+        finally:
+            view.release()
+
+
+class RequestMux:
+    # Keeps many SFTP requests in flight on one channel and dispatches every
+    # reply to its callback. Built on paramiko's async request machinery; only
+    # the thread that holds the channel lease may pump it.
+    def __init__(self, sftp: paramiko.SFTPClient):
+        self.sftp = sftp
+        self._callbacks = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._callbacks)
+
+    def request(self, callback, t, *args):
+        num = self.sftp._async_request(self, t, *args)
+        self._callbacks[num] = callback
+
+    def _async_response(self, t, msg, num):
+        callback = self._callbacks.pop(num, None)
+        if callback is not None:
+            callback(t, msg)
+
+    def pump(self):
+        self.sftp._read_response()
+
+    def drain(self):
+        while self._callbacks:
+            self.pump()
+
+    def send(self, t, *args):
+        # Fire and forget: the reply is dropped by whichever reader sees it.
+        self.sftp._async_request(type(None), t, *args)
+
+    def expect(self, t, msg, expected):
+        if t == CMD_STATUS:
+            self.sftp._convert_status(msg)
+        if t != expected:
+            raise SFTPError(f"Unexpected SFTP response type {t}")
+
+
+def name_entries(msg) -> list[paramiko.SFTPAttributes]:
+    entries = []
+    for _ in range(msg.get_int()):
+        filename = msg.get_text()
+        longname = msg.get_text()
+        attr = paramiko.SFTPAttributes._from_msg(msg, filename, longname)
+        if filename not in (".", ".."):
+            entries.append(attr)
+    return entries
+
+
+class DirectoryStream:
+    # Lists a remote directory one readdir reply at a time. Realpath, stat and
+    # opendir are sent back to back, then a window of readdir requests grows
+    # from `readahead` to `max_readahead` while batches keep coming; servers
+    # return anywhere from 16 to a few hundred names per reply. The close is
+    # not waited for, so a small listing costs two round trips plus transfer
+    # time instead of one round trip per request.
+    def __init__(self, sftp: paramiko.SFTPClient, path: str, readahead: int = LIST_READAHEAD, max_readahead: int = LIST_MAX_READAHEAD):
+        self.mux = RequestMux(sftp)
+        self.requested = path
+        self.path = None
+        self.attrs = None
+        self.readahead = max(1, readahead)
+        self.max_readahead = max(self.readahead, max_readahead)
+        self._batches = collections.deque()
+        self._errors = {}
+        self._opening = 0
+        self._outstanding = 0
+        self._done = False
+
+    @property
+    def finished(self) -> bool:
+        return self._done and not self._outstanding and not self._opening
+
+    def open(self):
+        if self._opening or self.attrs is not None:
+            return self
+        self._opening = 3
+        self.mux.request(self._on_realpath, CMD_REALPATH, self.requested)
+        self.mux.request(self._on_stat, CMD_STAT, self.requested)
+        self.mux.request(self._on_handle, CMD_OPENDIR, self.requested)
+        while self._opening:
+            self.mux.pump()
+        for step in ("realpath", "stat"):
+            if step in self._errors:
+                self.close()
+                raise self._errors[step]
+        if not stat.S_ISDIR(self.attrs.st_mode or 0):
+            self.close()
+            raise NotADirectoryError(f"{self.path} is not a directory.")
+        if "opendir" in self._errors:
+            raise self._errors["opendir"]
+        return self
+
+    def __iter__(self):
+        self.open()
+        while self._batches or not self.finished:
+            if not self._batches:
+                self.mux.pump()
+                continue
+            yield self._batches.popleft()
+        if "readdir" in self._errors:
+            raise self._errors["readdir"]
+
+    def close(self):
+        # Stops requesting more names and collects the replies still in flight,
+        # so the channel is clean when it goes back to the pool.
+        self._done = True
+        self.mux.drain()
+
+    def _on_realpath(self, t, msg):
+        self._opening -= 1
+        try:
+            self.mux.expect(t, msg, CMD_NAME)
+            msg.get_int()
+            self.path = msg.get_text()
+        except Exception as exc:
+            self._errors["realpath"] = exc
+
+    def _on_stat(self, t, msg):
+        self._opening -= 1
+        try:
+            self.mux.expect(t, msg, CMD_ATTRS)
+            self.attrs = paramiko.SFTPAttributes._from_msg(msg)
+        except Exception as exc:
+            self._errors["stat"] = exc
+
+    def _on_handle(self, t, msg):
+        self._opening -= 1
+        try:
+            self.mux.expect(t, msg, CMD_HANDLE)
+        except Exception as exc:
+            self._errors["opendir"] = exc
+            self._done = True
+            return
+        handle = msg.get_binary()
+        if self._done:
+            self.mux.send(CMD_CLOSE, handle)
+            return
+        for _ in range(self.readahead):
+            self._read_next(handle)
+
+    def _read_next(self, handle):
+        self._outstanding += 1
+        self.mux.request(lambda t, msg: self._on_names(handle, t, msg), CMD_READDIR, handle)
+
+    def _on_names(self, handle, t, msg):
+        self._outstanding -= 1
+        if t == CMD_NAME:
+            entries = name_entries(msg)
+            if entries:
+                self._batches.append(entries)
+            if not self._done:
+                self._read_next(handle)
+                if self._outstanding < self.max_readahead:
+                    self._read_next(handle)
+        else:
+            self._done = True
+            try:
+                self.mux.expect(t, msg, CMD_NAME)
+            except EOFError:
+                pass
+            except Exception as exc:
+                self._errors.setdefault("readdir", exc)
+        if self._done and not self._outstanding:
+            self.mux.send(CMD_CLOSE, handle)
+
+
+def list_directory(sftp: paramiko.SFTPClient, path: str, **kwargs):
+    # Returns (normalized path, directory attrs, entries).
+    stream = DirectoryStream(sftp, path, **kwargs)
+    entries = [entry for batch in stream for entry in batch]
+    return stream.path, stream.attrs, entries
+
+
+def walk_tree(sftp: paramiko.SFTPClient, root: str, max_inflight: int = WALK_MAX_INFLIGHT):
+    # Breadth-first remote walk with up to `max_inflight` directories being
+    # listed at once. Yields (path, entries, error) as each directory completes.
+    # Closing the generator early stops issuing requests and drains the ones
+    # in flight, so no callback outlives the walk on a pooled channel.
+    mux = RequestMux(sftp)
+    frontier = collections.deque([root])
+    ready = collections.deque()
+    active = [0]
+    closed = [False]
+
+    def finish(path, entries, error):
+        active[0] -= 1
+        ready.append((path, entries, error))
+
+    def open_dir(path):
+        entries = []
+
+        def on_names(handle):
+            def callback(t, msg):
+                if t == CMD_NAME and not closed[0]:
+                    entries.extend(name_entries(msg))
+                    mux.request(on_names(handle), CMD_READDIR, handle)
+                    return
+                mux.request(lambda *_: None, CMD_CLOSE, handle)
+                try:
+                    mux.expect(t, msg, CMD_NAME)
+                except EOFError:
+                    finish(path, entries, None)
+                except Exception as exc:
+                    finish(path, None, exc)
+
+            return callback
+
+        def on_handle(t, msg):
+            try:
+                mux.expect(t, msg, CMD_HANDLE)
+            except Exception as exc:
+                finish(path, None, exc)
+                return
+            handle = msg.get_binary()
+            if closed[0]:
+                mux.request(lambda *_: None, CMD_CLOSE, handle)
+                return
+            mux.request(on_names(handle), CMD_READDIR, handle)
+
+        active[0] += 1
+        mux.request(on_handle, CMD_OPENDIR, path)
+
+    try:
+        while frontier or active[0] or ready:
+            while frontier and active[0] < max_inflight:
+                open_dir(frontier.popleft())
+            if not ready:
+                mux.pump()
+                continue
+            path, entries, error = ready.popleft()
+            if entries:
+                for entry in entries:
+                    if stat.S_ISDIR(entry.st_mode or 0):
+                        frontier.append(SFTPClient.join_remote(path, entry.filename))
+            yield path, entries, error
+    finally:
+        closed[0] = True
+        mux.drain()
+
+
+def read_files(sftp: paramiko.SFTPClient, items) -> dict:
+    # Pipelines open, read and close for a batch of (path, size) small files so
+    # the whole batch costs a few round trips. Maps path -> bytes or exception.
+    mux = RequestMux(sftp)
+    results = {}
+
+    def fetch(path, size):
+        ranges = split_ranges(size, TRANSFER_BLOCK_SIZE)
+        chunks = {}
+        remaining = [len(ranges)]
+
+        def finish(handle):
+            mux.request(lambda *_: None, CMD_CLOSE, handle)
+            if path not in results:
+                data = b"".join(chunks[offset] for offset, _size in ranges)
+                results[path] = data if len(data) == size else IOError(f"{path} changed size during download.")
+
+        def on_data(handle, offset):
+            def callback(t, msg):
+                if t == CMD_DATA:
+                    chunks[offset] = msg.get_string()
+                else:
+                    try:
+                        mux.expect(t, msg, CMD_DATA)
+                    except EOFError:
+                        chunks[offset] = b""
+                    except Exception as exc:
+                        results[path] = exc
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    finish(handle)
+
+            return callback
+
+        def on_handle(t, msg):
+            try:
+                mux.expect(t, msg, CMD_HANDLE)
+            except Exception as exc:
+                results[path] = exc
+                return
+            handle = msg.get_binary()
+            if not ranges:
+                finish(handle)
+            for offset, length in ranges:
+                mux.request(on_data(handle, offset), CMD_READ, handle, int64(offset), int(length))
+
+        mux.request(on_handle, CMD_OPEN, path, SFTP_FLAG_READ, paramiko.SFTPAttributes())
+
+    for path, size in items:
+        fetch(path, size)
+    mux.drain()
+    return results
+
+
+def write_files(sftp: paramiko.SFTPClient, items) -> dict:
+    # Pipelined counterpart of read_files for (remote_path, data) pairs. Maps
+    # remote_path -> None on success or the exception that stopped it.
+    mux = RequestMux(sftp)
+    results = {}
+    flags = SFTP_FLAG_WRITE | SFTP_FLAG_CREATE | SFTP_FLAG_TRUNC
+
+    def store(path, data):
+        ranges = split_ranges(len(data), TRANSFER_BLOCK_SIZE)
+        remaining = [len(ranges)]
+
+        def on_status(handle):
+            def callback(t, msg):
+                try:
+                    mux.expect(t, msg, CMD_STATUS)
+                except Exception as exc:
+                    results[path] = exc
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    mux.request(on_close, CMD_CLOSE, handle)
+
+            return callback
+
+        def on_close(t, msg):
+            try:
+                mux.expect(t, msg, CMD_STATUS)
+            except Exception as exc:
+                results.setdefault(path, exc)
+            results.setdefault(path, None)
+
+        def on_handle(t, msg):
+            try:
+                mux.expect(t, msg, CMD_HANDLE)
+            except Exception as exc:
+                results[path] = exc
+                return
+            handle = msg.get_binary()
+            if not ranges:
+                mux.request(on_close, CMD_CLOSE, handle)
+            for offset, length in ranges:
+                mux.request(on_status(handle), CMD_WRITE, handle, int64(offset), data[offset : offset + length])
+
+        mux.request(on_handle, CMD_OPEN, path, flags, paramiko.SFTPAttributes())
+
+    for path, data in items:
+        store(path, data)
+    mux.drain()
+    return results
+
+
+def make_dirs(sftp: paramiko.SFTPClient, paths):
+    # One round trip for a batch of sibling directories; existing ones are fine.
+    mux = RequestMux(sftp)
+    for path in paths:
+        mux.request(lambda *_: None, CMD_MKDIR, path, paramiko.SFTPAttributes())
+    mux.drain()
+
+
+class ChannelPool:
+    # One authenticated transport per profile with up to `size` SFTP channels.
+    # Bulk transfers may never hold the last `interactive_reserve` channels, and
+    # queued interactive checkouts are served before queued bulk ones.
+    def __init__(
+        self,
+        connect,
+        size: int = POOL_CHANNELS,
+        interactive_reserve: int = POOL_INTERACTIVE_RESERVE,
+        health_interval: float = POOL_HEALTH_INTERVAL,
+    ):
+        self._connect = connect
+        self.size = max(1, size)
+        self.interactive_reserve = min(max(0, interactive_reserve), self.size - 1)
+        self.health_interval = health_interval
+        self.ssh = None
+        self._idle: list[tuple[paramiko.SFTPClient, float]] = []
+        self._owners: dict[paramiko.SFTPClient, int] = {}
+        self._leased = {PRIORITY_INTERACTIVE: 0, PRIORITY_BULK: 0}
+        self._waiting = {PRIORITY_INTERACTIVE: 0, PRIORITY_BULK: 0}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def open(self):
+        with self._cond:
+            self._ensure_transport()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle = [channel for channel, _since in self._idle]
+            self._idle = []
+            ssh, self.ssh = self.ssh, None
+            self._cond.notify_all()
+        for channel in idle:
+            self._close_quietly(channel)
+        if ssh:
+            self._close_quietly(ssh)
+
+    @property
+    def alive(self) -> bool:
+        transport = self.ssh.get_transport() if self.ssh else None
+        return transport is not None and transport.is_active()
+
+    def checkout(self, priority: int = PRIORITY_INTERACTIVE, block: bool = True, timeout: float | None = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while not self._can_take(priority):
+                    if self._closed:
+                        raise ConnectionError("Connection pool is closed.")
+                    if not block:
+                        return None
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Timed out waiting for an SFTP channel.")
+                    self._cond.wait(remaining)
+                self._leased[priority] += 1
+            finally:
+                self._waiting[priority] -= 1
+        try:
+            channel = self._acquire_channel()
+        except Exception:
+            with self._cond:
+                self._leased[priority] -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._owners[channel] = priority
+        return channel
+
+    def checkin(self, channel: paramiko.SFTPClient):
+        with self._cond:
+            priority = self._owners.pop(channel, None)
+            if priority is not None:
+                self._leased[priority] -= 1
+            reusable = (
+                priority is not None
+                and not self._closed
+                and not channel.get_channel().closed
+                and self.ssh is not None
+                and channel.get_channel().get_transport() is self.ssh.get_transport()
+            )
+            if reusable:
+                self._idle.append((channel, time.monotonic()))
+            self._cond.notify_all()
+        if not reusable:
+            self._close_quietly(channel)
+
+    def open_channel(self, block: bool = True) -> paramiko.SFTPClient | None:
+        # A dedicated channel outside the pool's accounting; the caller closes
+        # it. Opening one never waits, but with block=False it is declined
+        # (None, like checkout) while every pooled channel is leased, so a
+        # parallel transfer only adds channels to a session that has room.
+        with self._cond:
+            if not block and sum(self._leased.values()) >= self.size:
+                return None
+            self._ensure_transport()
+            transport = self.ssh.get_transport()
+        return paramiko.SFTPClient.from_transport(transport)
+
+    @contextmanager
+    def lease(self, priority: int = PRIORITY_INTERACTIVE):
+        channel = self.checkout(priority)
+        try:
+            yield channel
+        finally:
+            self.checkin(channel)
+
+    def _can_take(self, priority):
+        if self._closed or sum(self._leased.values()) >= self.size:
+            return False
+        if priority == PRIORITY_BULK:
+            if self._waiting[PRIORITY_INTERACTIVE]:
+                return False
+            return self._leased[PRIORITY_BULK] < self.size - self.interactive_reserve
+        return True
+
+    def _ensure_transport(self):
+        # Called with the lock held so concurrent workers share one reconnect.
+        if self._closed:
+            raise ConnectionError("Connection pool is closed.")
+        if self.alive:
+            return
+        stale = [channel for channel, _since in self._idle]
+        self._idle = []
+        for channel in stale:
+            self._close_quietly(channel)
+        if self.ssh:
+            self._close_quietly(self.ssh)
+        self.ssh = None
+        self.ssh = self._connect()
+
+    def _acquire_channel(self) -> paramiko.SFTPClient:
+        while True:
+            with self._cond:
+                self._ensure_transport()
+                transport = self.ssh.get_transport()
+                if not self._idle:
+                    break
+                channel, idle_since = self._idle.pop()
+            if self._healthy(channel, idle_since):
+                return channel
+            self._close_quietly(channel)
+        return paramiko.SFTPClient.from_transport(transport)
+
+    def _healthy(self, channel, idle_since) -> bool:
+        if channel.get_channel().closed:
+            return False
+        if time.monotonic() - idle_since < self.health_interval:
+            return True
+        try:
+            channel.normalize(".")
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(resource):
+        try:
+            resource.close()
+        except Exception:
+            pass
+
+
+class TreeProgress:
+    # Aggregate byte and file counters for a whole tree. Totals grow while the
+    # walk is still discovering files.
+    def __init__(self, callback=None):
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.files_done = 0
+        self.files_total = 0
+        self.walking = True
+        self.failed = threading.Event()
+        self._callback = callback
+        self._lock = threading.Lock()
+
+    def discover(self, size: int):
+        with self._lock:
+            self.files_total += 1
+            self.bytes_total += size
+
+    def advance(self, size: int = 0, files: int = 0):
+        with self._lock:
+            self.bytes_done += size
+            self.files_done += files
+        self.report()
+
+    def file_callback(self):
+        last = [0]
+        lock = threading.Lock()
+
+        def callback(transferred, _total):
+            with lock:
+                delta = max(0, transferred - last[0])
+                last[0] = max(last[0], transferred)
+            self.advance(delta)
+
+        return callback
+
+    def report(self):
+        if not self._callback:
+            return
+        with self._lock:
+            suffix = "+" if self.walking else ""
+            detail = f"{self.files_done}/{self.files_total}{suffix} files"
+            done, total = self.bytes_done, self.bytes_total
+        try:
+            self._callback(done, total, detail=detail)
+        except Exception:
+            # A raising callback (e.g. a cancelled job) stops the whole tree.
+            self.failed.set()
+            raise
+
+
+class _TreeTransfer:
+    # A producer thread discovers files and queues them while a fixed set of
+    # workers drains the queue. Small files are batched and pipelined on the
+    # worker's channel; large ones go through the parallel engines, which use
+    # the worker's channel first and only borrow extras without blocking.
+    def __init__(self, pool, workers: int = TREE_WORKERS, transfer_channels: int = TRANSFER_CHANNELS):
+        self.pool = pool
+        self.workers = max(1, workers)
+        self.transfer_channels = transfer_channels
+
+    def _run(self, produce, process_small, process_large, callback):
+        progress = TreeProgress(callback)
+        pending = queue.Queue()
+        errors = []
+        fatal = []
+
+        def producer():
+            try:
+                produce(progress, pending, errors)
+            except Exception as exc:
+                fatal.append(exc)
+                progress.failed.set()
+            finally:
+                progress.walking = False
+                for _ in range(self.workers):
+                    pending.put(None)
+
+        def next_batch(carry):
+            # An item that ends a batch is carried to this worker's next round;
+            # putting it back would queue it behind the end-of-work markers.
+            item = carry.pop() if carry else pending.get()
+            if item is None or item[2] > SMALL_FILE_LIMIT:
+                return item, []
+            batch = [item]
+            while len(batch) < SMALL_FILE_BATCH:
+                try:
+                    extra = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is None or extra[2] > SMALL_FILE_LIMIT:
+                    carry.append(extra)
+                    break
+                batch.append(extra)
+            return None, batch
+
+        def worker():
+            channel = None
+            carry = []
+            try:
+                while not progress.failed.is_set():
+                    large, batch = next_batch(carry)
+                    if large is None and not batch:
+                        return
+                    if channel is None:
+                        channel = self.pool.checkout(PRIORITY_BULK)
+                    try:
+                        if batch:
+                            process_small(channel, batch, progress, errors)
+                        else:
+                            process_large(channel, large, progress)
+                    except Exception as exc:
+                        if progress.failed.is_set():
+                            raise
+                        errors.append(exc)
+                        if batch:
+                            progress.advance(files=len(batch))
+                        else:
+                            progress.advance(files=1)
+            except Exception as exc:
+                fatal.append(exc)
+                progress.failed.set()
+            finally:
+                if channel is not None:
+                    self.pool.checkin(channel)
+
+        walker = threading.Thread(target=producer, daemon=True)
+        walker.start()
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        walker.join()
+        for thread in threads:
+            thread.join()
+        if fatal:
+            raise fatal[0]
+        if errors:
+            raise IOError(f"{len(errors)} of {progress.files_total} files failed. First error: {errors[0]}")
+        progress.report()
+        return progress.files_total
+
+    def _engine_channels(self, channel):
+        def checkout(block=True):
+            return channel if block else self.pool.checkout(PRIORITY_BULK, block=False)
+
+        def checkin(extra):
+            if extra is not channel:
+                self.pool.checkin(extra)
+
+        return checkout, checkin
+
+
+class TreeDownloader(_TreeTransfer):
+    def download(self, remote_root: str, local_root: str, callback=None) -> int:
+        def produce(progress, pending, errors):
+            channel = self.pool.checkout(PRIORITY_BULK)
+            try:
+                for path, entries, error in walk_tree(channel, remote_root):
+                    if progress.failed.is_set():
+                        return
+                    if error is not None:
+                        if path == remote_root:
+                            raise error
+                        errors.append(error)
+                        continue
+                    local_dir = os.path.join(local_root, *posixpath.relpath(path, remote_root).split("/"))
+                    os.makedirs(os.path.normpath(local_dir), exist_ok=True)
+                    for entry in entries:
+                        # Only regular files are copied; links and devices are skipped.
+                        if stat.S_ISREG(entry.st_mode or 0):
+                            progress.discover(entry.st_size)
+                            remote = SFTPClient.join_remote(path, entry.filename)
+                            pending.put((remote, os.path.join(os.path.normpath(local_dir), entry.filename), entry.st_size))
+            finally:
+                self.pool.checkin(channel)
+
+        def process_small(channel, batch, progress, errors):
+            results = read_files(channel, [(remote, size) for remote, _local, size in batch])
+            for remote, local, size in batch:
+                data = results.get(remote)
+                if isinstance(data, Exception):
+                    errors.append(data)
+                else:
+                    with open(local, "wb") as handle:
+                        handle.write(data)
+                progress.advance(size if not isinstance(data, Exception) else 0, files=1)
+
+        def process_large(channel, item, progress):
+            remote, local, _size = item
+            checkout, checkin = self._engine_channels(channel)
+            engine = ParallelDownloader(checkout, checkin, channels=self.transfer_channels)
+            engine.download(remote, local, callback=progress.file_callback())
+            progress.advance(files=1)
+
+        return self._run(produce, process_small, process_large, callback)
+
+
+class TreeUploader(_TreeTransfer):
+    def upload(self, local_root: str, remote_root: str, callback=None) -> int:
+        def produce(progress, pending, errors):
+            channel = self.pool.checkout(PRIORITY_BULK)
+            try:
+                make_dirs(channel, [remote_root])
+                for dirpath, dirnames, filenames in os.walk(local_root):
+                    if progress.failed.is_set():
+                        return
+                    rel = os.path.relpath(dirpath, local_root)
+                    remote_dir = remote_root if rel == "." else posixpath.join(remote_root, *rel.split(os.sep))
+                    if dirnames:
+                        make_dirs(channel, [posixpath.join(remote_dir, name) for name in dirnames])
+                    for name in filenames:
+                        local = os.path.join(dirpath, name)
+                        try:
+                            size = os.path.getsize(local)
+                        except OSError as exc:
+                            errors.append(exc)
+                            continue
+                        progress.discover(size)
+                        pending.put((local, posixpath.join(remote_dir, name), size))
+            finally:
+                self.pool.checkin(channel)
+
+        def process_small(channel, batch, progress, errors):
+            items = []
+            for local, remote, _size in batch:
+                with open(local, "rb") as handle:
+                    items.append((remote, handle.read()))
+            results = write_files(channel, items)
+            for (_local, remote, size), (_remote, data) in zip(batch, items):
+                error = results.get(remote)
+                if error is not None:
+                    errors.append(error)
+                progress.advance(len(data) if error is None else 0, files=1)
+
+        def process_large(channel, item, progress):
+            local, remote, _size = item
+            checkout, checkin = self._engine_channels(channel)
+            engine = ParallelUploader(checkout, checkin, channels=self.transfer_channels)
+            engine.upload(local, remote, callback=progress.file_callback())
+            progress.advance(files=1)
+
+        return self._run(produce, process_small, process_large, callback)
 
 
 @dataclass
-class RemoteEntry:
-    name: str
-    file_type: str
-    size_human: str
-    modified: str
-    full_path: str
-    is_dir: bool
-    st_mode: int
-    st_size: int
-
-
-def human_size(size: int) -> str:
-    units = ["B", "KB", "MB", "GB", "TB"]
-    value = float(size)
-    for unit in units:
-        if value < 1024 or unit == units[-1]:
-            return f"{value:.1f} {unit}" if unit != "B" else f"{int(value)} B"
-        value /= 1024
-    return f"{size} B"
+class CachedListing:
+    path: str
+    rows: Listing
+    mtime: int
+    fetched_at: float
+    size: int
+
+
+class ListingCache:
+    # LRU of directory listings keyed by normalized path, bounded by entry
+    # count and by an estimate of the memory the rows hold. Entries older than
+    # `ttl` are still served but must be re-listed rather than revalidated on
+    # the directory mtime alone, which misses in-place file changes.
+    def __init__(self, max_entries: int = LISTING_CACHE_ENTRIES, max_bytes: int = LISTING_CACHE_BYTES, ttl: float = LISTING_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
+        self._entries: collections.OrderedDict[str, CachedListing] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path: str) -> str:
+        return posixpath.normpath(path) if path else "/"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, path: str) -> CachedListing | None:
+        with self._lock:
+            entry = self._entries.get(self.key(path))
+            if entry is not None:
+                self._entries.move_to_end(entry.path)
+            return entry
+
+    def fresh(self, entry: CachedListing) -> bool:
+        return time.monotonic() - entry.fetched_at < self.ttl
+
+    def put(self, path: str, rows: Listing, mtime: int) -> CachedListing:
+        key = self.key(path)
+        size = len(rows) * LISTING_ROW_BYTES + sum(map(len, rows.names))
+        entry = CachedListing(key, rows, mtime, time.monotonic(), size)
+        with self._lock:
+            self._remove(key)
+            if size <= self.max_bytes:
+                self._entries[key] = entry
+                self.bytes += size
+                while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                    self.bytes -= self._entries.popitem(last=False)[1].size
+        return entry
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._remove(self.key(path))
+
+    def invalidate_tree(self, root: str):
+        root = self.key(root)
+        prefix = root.rstrip("/") + "/"
+        with self._lock:
+            for key in [key for key in self._entries if key == root or key.startswith(prefix)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+
+class BlockCache:
+    # Fixed-size blocks of remote files keyed by (session, path, mtime, size,
+    # block offset). Memory holds an LRU bounded by `max_bytes`; with a disk
+    # directory attached, blocks are also written under it, one folder per
+    # remote file, and the oldest files are deleted past `disk_bytes`. Seeing
+    # a new (mtime, size) for a path drops every block of older versions, so
+    # a changed file is never served from stale blocks.
+    def __init__(self, max_bytes: int = PREVIEW_CACHE_BYTES, block_size: int = PREVIEW_BLOCK_SIZE, disk_bytes: int = PREVIEW_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.disk_bytes = disk_bytes
+        self.disk_dir = None
+        self.bytes = 0
+        self._blocks: collections.OrderedDict[tuple, bytes] = collections.OrderedDict()
+        self._versions: dict[tuple[str, str], tuple[int, int]] = {}
+        self._disk_files: collections.OrderedDict[str, int] = collections.OrderedDict()
+        self._disk_used = 0
+        self._lock = threading.Lock()
+
+    def attach_disk(self, directory):
+        directory = os.fspath(directory)
+        os.makedirs(directory, exist_ok=True)
+        found = []
+        for folder in os.scandir(directory):
+            if folder.is_dir():
+                for entry in os.scandir(folder.path):
+                    if entry.name.endswith(".tmp"):
+                        # Left by a write that never finished.
+                        self._remove_quietly(entry.path)
+                        continue
+                    info = entry.stat()
+                    found.append((info.st_mtime, entry.path, info.st_size))
+        with self._lock:
+            self.disk_dir = directory
+            self._disk_files.clear()
+            self._disk_used = 0
+            for _mtime, path, size in sorted(found):
+                self._disk_files[path] = size
+                self._disk_used += size
+            self._trim_disk()
+
+    def validate(self, session: str, path: str, mtime: int, size: int):
+        # Records the current version of `path`, dropping older blocks.
+        with self._lock:
+            if self._versions.get((session, path)) != (mtime, size):
+                self._drop(session, path, keep=(mtime, size))
+                self._versions[(session, path)] = (mtime, size)
+
+    def get(self, session: str, path: str, mtime: int, size: int, offset: int) -> bytes | None:
+        key = (session, path, mtime, size, offset)
+        with self._lock:
+            data = self._blocks.get(key)
+            if data is not None:
+                self._blocks.move_to_end(key)
+                return data
+            disk_path = self._disk_path(session, path, mtime, size, offset)
+            if disk_path is None or disk_path not in self._disk_files:
+                return None
+            self._disk_files.move_to_end(disk_path)
+        try:
+            with open(disk_path, "rb") as handle:
+                data = handle.read()
+            os.utime(disk_path)
+        except OSError:
+            data = None
+        if data is None or len(data) != min(self.block_size, size - offset):
+            # Unreadable, or cut short before writes were made atomic.
+            with self._lock:
+                self._disk_used -= self._disk_files.pop(disk_path, 0)
+            self._remove_quietly(disk_path)
+            return None
+        with self._lock:
+            self._store(key, data)
+        return data
+
+    def put(self, session: str, path: str, mtime: int, size: int, offset: int, data: bytes):
+        key = (session, path, mtime, size, offset)
+        with self._lock:
+            self._store(key, data)
+            disk_path = self._disk_path(session, path, mtime, size, offset)
+        if disk_path is None:
+            return
+        # Written beside the block and renamed into place, so a crash or a
+        # full disk never leaves a short block under the final name.
+        tmp = f"{disk_path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            with open(tmp, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp, disk_path)
+        except OSError:
+            self._remove_quietly(tmp)
+            return
+        with self._lock:
+            self._disk_used += len(data) - self._disk_files.pop(disk_path, 0)
+            self._disk_files[disk_path] = len(data)
+            self._trim_disk()
+
+    def invalidate(self, session: str, path: str):
+        with self._lock:
+            self._versions.pop((session, path), None)
+            self._drop(session, path)
+
+    def invalidate_tree(self, session: str, root: str):
+        # Memory only: disk folders are named by hash, and a stale version on
+        # disk is never read because every read validates (mtime, size) first.
+        prefix = root.rstrip("/") + "/"
+        with self._lock:
+            for key in [key for key in self._blocks if key[0] == session and key[1].startswith(prefix)]:
+                self.bytes -= len(self._blocks.pop(key))
+            for key in [key for key in self._versions if key[0] == session and key[1].startswith(prefix)]:
+                del self._versions[key]
+
+    def clear(self):
+        # Forgets the memory tier; blocks on disk stay for the next session.
+        with self._lock:
+            self._blocks.clear()
+            self._versions.clear()
+            self.bytes = 0
+
+    def _store(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        previous = self._blocks.pop(key, None)
+        if previous is not None:
+            self.bytes -= len(previous)
+        self._blocks[key] = data
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes:
+            self.bytes -= len(self._blocks.popitem(last=False)[1])
+
+    def _drop(self, session, path, keep=None):
+        for key in [key for key in self._blocks if key[0] == session and key[1] == path and key[2:4] != keep]:
+            self.bytes -= len(self._blocks.pop(key))
+        folder = self._disk_folder(session, path)
+        if folder is None:
+            return
+        prefix = None if keep is None else f"{keep[0]}-{keep[1]}-"
+        for disk_path in [p for p in self._disk_files if os.path.dirname(p) == folder]:
+            if prefix is None or not os.path.basename(disk_path).startswith(prefix):
+                self._remove_disk(disk_path)
+
+    def _disk_folder(self, session, path):
+        if self.disk_dir is None:
+            return None
+        digest = hashlib.sha1(f"{session}\0{path}".encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.disk_dir, digest)
+
+    def _disk_path(self, session, path, mtime, size, offset):
+        folder = self._disk_folder(session, path)
+        return None if folder is None else os.path.join(folder, f"{mtime}-{size}-{offset}")
+
+    def _remove_disk(self, disk_path):
+        self._disk_used -= self._disk_files.pop(disk_path, 0)
+        self._remove_quietly(disk_path)
+
+    @staticmethod
+    def _remove_quietly(disk_path):
+        try:
+            os.remove(disk_path)
+        except OSError:
+            pass
+
+    def _trim_disk(self):
+        while self._disk_used > self.disk_bytes and self._disk_files:
+            self._remove_disk(next(iter(self._disk_files)))
+
+
+class HandleManager:
+    # Keeps recently read remote files open on one dedicated channel, so
+    # paging through a file costs only the reads, not an open and close each
+    # time. A handle is reopened when the caller's (mtime, size) differs from
+    # the one it was opened at, since a held handle keeps reading a replaced
+    # file's old contents. Handles idle for `idle_timeout` are closed by a
+    # reaper thread and at most `max_open` stay open. Reads are serialized on
+    # the channel and pipelined with readv.
+    def __init__(self, pool, idle_timeout: float = HANDLE_IDLE_TIMEOUT, max_open: int = HANDLE_MAX_OPEN):
+        self.pool = pool
+        self.idle_timeout = idle_timeout
+        self.max_open = max_open
+        self._channel = None
+        self._handles: collections.OrderedDict[str, list] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._reaper = None
+        self._closed = False
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+    def read(self, path: str, chunks: list[tuple[int, int]], version) -> list[bytes]:
+        for attempt in range(2):
+            with self._lock:
+                if self._closed:
+                    raise ConnectionError("Connection is closed.")
+                try:
+                    handle = self._handle(path, version)
+                    return [bytes(data) for data in handle.readv(chunks)]
+                except Exception:
+                    dropped = self._channel is None or self._channel.get_channel().closed
+                    if dropped:
+                        self._reset()
+                    else:
+                        self._discard(path)
+                    if attempt or not dropped:
+                        raise
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._reset()
+
+    def evict_idle(self):
+        with self._lock:
+            cutoff = time.monotonic() - self.idle_timeout
+            for path in [path for path, (_handle, _version, used) in self._handles.items() if used < cutoff]:
+                self._discard(path)
+
+    def _handle(self, path, version):
+        entry = self._handles.get(path)
+        if entry is not None and entry[1] != version:
+            self._discard(path)
+            entry = None
+        if entry is None:
+            if self._channel is None:
+                self._channel = self.pool.open_channel()
+            entry = [self._channel.open(path, "rb"), version, 0.0]
+            self._handles[path] = entry
+            while len(self._handles) > self.max_open:
+                self._discard(next(iter(self._handles)))
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, daemon=True)
+                self._reaper.start()
+        entry[2] = time.monotonic()
+        self._handles.move_to_end(path)
+        return entry[0]
+
+    def _reap(self):
+        while True:
+            time.sleep(self.idle_timeout / 2)
+            self.evict_idle()
+            with self._lock:
+                if not self._handles or self._closed:
+                    self._reaper = None
+                    return
+
+    def _discard(self, path):
+        entry = self._handles.pop(path, None)
+        if entry is not None:
+            ChannelPool._close_quietly(entry[0])
+
+    def _reset(self):
+        # The handles die with the channel; no need to close them one by one.
+        self._handles.clear()
+        if self._channel is not None:
+            ChannelPool._close_quietly(self._channel)
+        self._channel = None
 
 
 class SFTPClient:
-    def __init__(self):
-        self.ssh = None
-        self.sftp = None
+    def __init__(self, pool_size: int = POOL_CHANNELS, transfer_channels: int = TRANSFER_CHANNELS):
+        self.pool = None
+        self.session = ""
+        self.pool_size = pool_size
+        self.transfer_channels = transfer_channels
+        self.listings = ListingCache()
+        self.blocks = BlockCache()
+        self.handles = None
+        self._inflight: dict[tuple[str, int], threading.Event] = {}
+        self._inflight_lock = threading.Lock()
 
     @property
     def connected(self) -> bool:
-        return self.sftp is not None
+        return self.pool is not None
+
+    @property
+    def ssh(self):
+        return self.pool.ssh if self.pool else None
 
     def connect(self, host: str, port: int, username: str, password: str, timeout: int = 10) -> str:
         self.disconnect()
-        self.ssh = paramiko.SSHClient()
-        self.ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        self.ssh.connect(hostname=host, port=port, username=username, password=password, timeout=timeout)
-        self.sftp = self.ssh.open_sftp()
-        return self.sftp.normalize(".")
+
+        def open_ssh():
+            ssh = paramiko.SSHClient()
+            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            ssh.connect(hostname=host, port=port, username=username, password=password, timeout=timeout)
+            return ssh
+
+        pool = ChannelPool(open_ssh, size=self.pool_size)
+        pool.open()
+        self.pool = pool
+        self.handles = HandleManager(pool)
+        self.session = f"{username}@{host}:{port}"
+        return self.normalize(".")
 
     def disconnect(self):
-        if self.sftp:
-            try:
-                self.sftp.close()
-            except Exception:
-                pass
-        if self.ssh:
+        if self.handles:
+            self.handles.close()
+        self.handles = None
+        if self.pool:
+            self.pool.close()
+        self.pool = None
+        self.session = ""
+        self.listings.clear()
+        self.blocks.clear()
+
+    def lease(self, priority: int = PRIORITY_INTERACTIVE):
+        return self.pool.lease(priority)
+
+    def open_channel(self, block: bool = True) -> paramiko.SFTPClient | None:
+        return self.pool.open_channel(block)
+
+    def _call(self, func, priority: int = PRIORITY_INTERACTIVE):
+        # Retry once on a fresh channel when the connection dropped mid-call.
+        for attempt in range(2):
+            channel = self.pool.checkout(priority)
             try:
-                self.ssh.close()
+                return func(channel)
             except Exception:
-                pass
-        self.sftp = None
-        self.ssh = None
+                if attempt or not channel.get_channel().closed:
+                    raise
+            finally:
+                self.pool.checkin(channel)
 
     def normalize(self, path: str) -> str:
-        return self.sftp.normalize(path)
+        return self._call(lambda sftp: sftp.normalize(path))
 
     def stat(self, path: str):
-        return self.sftp.stat(path)
-
-    def listdir(self, path: str) -> list[RemoteEntry]:
-        entries = self.sftp.listdir_attr(path)
-        rows: list[RemoteEntry] = []
-        for entry in entries:
-            is_dir = stat.S_ISDIR(entry.st_mode)
-            full_path = self.join_remote(path, entry.filename)
-            rows.append(
-                RemoteEntry(
-                    name=entry.filename,
-                    file_type="DIR" if is_dir else "FILE",
-                    size_human="-" if is_dir else human_size(entry.st_size),
-                    modified=datetime.fromtimestamp(entry.st_mtime).strftime("%Y-%m-%d %H:%M"),
-                    full_path=full_path,
-                    is_dir=is_dir,
-                    st_mode=entry.st_mode,
-                    st_size=entry.st_size,
-                )
-            )
-        rows.sort(key=lambda r: (not r.is_dir, r.name.lower()))
+        return self._call(lambda sftp: sftp.stat(path))
+
+    def cached_listdir(self, path: str) -> Listing | None:
+        entry = self.listings.get(path)
+        return entry.rows if entry else None
+
+    def browse(self, path: str) -> tuple[str, Listing]:
+        # Resolves, checks and lists `path` in one pipelined batch.
+        normalized, attrs, entries = self._call(lambda sftp: list_directory(sftp, path))
+        rows = self._build_rows(normalized, entries)
+        self.listings.put(normalized, rows, attrs.st_mtime)
+        return normalized, rows
+
+    def iter_listdir(self, path: str):
+        # Yields (normalized path, rows) for each readdir reply as it arrives,
+        # starting with an empty batch once the folder is open; rows are not
+        # sorted. Closing the generator early cancels the listing. A complete
+        # listing is cached like browse().
+        with self.lease() as sftp:
+            stream = DirectoryStream(sftp, path).open()
+            rows = Listing(stream.path)
+            try:
+                yield stream.path, Listing(stream.path)
+                for entries in stream:
+                    batch = self._build_rows(stream.path, entries, sort=False)
+                    rows.extend(batch)
+                    yield stream.path, batch
+            finally:
+                stream.close()
+            self.listings.put(stream.path, rows.sort(), stream.attrs.st_mtime)
+
+    def listdir(self, path: str) -> Listing:
+        # The directory is stat'ed before it is listed, so a change that races
+        # the listing shows up as a newer mtime on the next revalidation.
+        _normalized, attrs, entries = self._call(lambda sftp: list_directory(sftp, path))
+        rows = self._build_rows(path, entries)
+        self.listings.put(path, rows, attrs.st_mtime)
         return rows
 
-    def read_range(self, path: str, offset: int, size: int) -> bytes:
-        with self.sftp.open(path, "rb") as handle:
-            handle.seek(offset)
-            return handle.read(size)
+    def revalidate(self, path: str) -> tuple[Listing, bool]:
+        # Returns (rows, changed). A fresh cache entry whose directory mtime is
+        # unchanged costs one stat instead of a full listing.
+        entry = self.listings.get(path)
+        attrs = self.stat(path)
+        if entry is not None and self.listings.fresh(entry) and attrs.st_mtime == entry.mtime:
+            return entry.rows, False
+        return self.listdir(path), True
+
+    def _build_rows(self, path, entries, sort: bool = True) -> Listing:
+        rows = Listing.from_attrs(path, entries)
+        return rows.sort() if sort else rows
+
+    def file_version(self, path: str) -> tuple[int, int]:
+        # (mtime, size) of a remote file; blocks cached for any other version
+        # of it are dropped.
+        attrs = self.stat(path)
+        version = (int(attrs.st_mtime or 0), attrs.st_size or 0)
+        self.blocks.validate(self.session, path, *version)
+        return version
+
+    def read_range(self, path: str, offset: int, size: int, version: tuple[int, int] | None = None) -> bytes:
+        # Reads through the block cache. `version` is a (mtime, size) from a
+        # recent file_version() call; without it the file is stat'ed first.
+        # Missing blocks are read on a kept-open handle in one pipelined batch;
+        # blocks a prefetch is already fetching are waited for instead.
+        version = version or self.file_version(path)
+        starts = self._block_starts(offset, size, version[1])
+        if not starts:
+            return b""
+        blocks = self._cached_blocks(path, starts, version)
+        pending = {self._inflight.get((path, start)) for start, data in blocks.items() if data is None} - {None}
+        for event in pending:
+            event.wait()
+        if pending:
+            blocks = self._cached_blocks(path, starts, version)
+        missing = [start for start, data in blocks.items() if data is None]
+        if missing:
+            blocks.update(self._fetch_blocks(path, missing, version))
+        data = b"".join(blocks[start] for start in starts)
+        skip = offset - starts[0]
+        return data[skip : skip + min(offset + size, version[1]) - offset]
+
+    def prefetch_range(self, path: str, offset: int, size: int, version: tuple[int, int]):
+        # Warms the block cache for a range on a background thread, e.g. the
+        # pages either side of the one on screen.
+        starts = self._block_starts(offset, size, version[1])
+        cached = self._cached_blocks(path, starts, version)
+        with self._inflight_lock:
+            wanted = [start for start in starts if cached[start] is None and (path, start) not in self._inflight]
+            if not wanted:
+                return
+            event = threading.Event()
+            for start in wanted:
+                self._inflight[(path, start)] = event
+        threading.Thread(target=self._prefetch_worker, args=(path, wanted, version, event), daemon=True).start()
+
+    def _prefetch_worker(self, path, starts, version, event):
+        try:
+            self._fetch_blocks(path, starts, version)
+        except Exception:
+            # A failed prefetch only means the read that needs it fetches it.
+            pass
+        finally:
+            with self._inflight_lock:
+                for start in starts:
+                    self._inflight.pop((path, start), None)
+            event.set()
+
+    def _block_starts(self, offset, size, file_size):
+        end = min(offset + size, file_size)
+        if offset < 0 or end <= offset:
+            return range(0)
+        block_size = self.blocks.block_size
+        return range(offset - offset % block_size, end, block_size)
+
+    def _cached_blocks(self, path, starts, version):
+        mtime, file_size = version
+        return {start: self.blocks.get(self.session, path, mtime, file_size, start) for start in starts}
+
+    def _fetch_blocks(self, path, starts, version):
+        mtime, file_size = version
+        block_size = self.blocks.block_size
+        chunks = [(start, min(block_size, file_size - start)) for start in starts]
+        fetched = dict(zip(starts, self.handles.read(path, chunks, version)))
+        for start, data in fetched.items():
+            self.blocks.put(self.session, path, mtime, file_size, start, data)
+        return fetched
+
+    def read_live(self, path: str, offset: int, size: int, generation: int = 0) -> bytes:
+        # Exact bytes of a file that is still growing, bypassing the block
+        # cache. The handle stays open across reads of the same `generation`;
+        # a caller bumps it when the file was replaced.
+        if size <= 0:
+            return b""
+        return self.handles.read(path, [(offset, size)], ("live", generation))[0]
+
+    def read_head(self, path: str, size: int, version: tuple[int, int] | None = None) -> bytes:
+        return self.read_range(path, 0, size, version)
+
+    def stream_file(self, path: str, chunk_size: int, offset: int = 0, end: int | None = None):
+        # Yields a file's bytes from `offset` to `end` in chunks of
+        # `chunk_size`, each fetched as one pipelined readv on a bulk channel.
+        # For whole-file scans that should not go through the block cache;
+        # closing the generator releases the channel.
+        with self.lease(PRIORITY_BULK) as sftp:
+            with sftp.open(path, "rb") as handle:
+                if end is None:
+                    end = handle.stat().st_size or 0
+                while offset < end:
+                    size = min(chunk_size, end - offset)
+                    chunks = [(offset + start, length) for start, length in split_ranges(size, TRANSFER_BLOCK_SIZE)]
+                    data = b"".join(handle.readv(chunks))
+                    if not data:
+                        return
+                    yield data
+                    offset += len(data)
+
+    def _bulk_checkout(self, block: bool = True):
+        return self.pool.checkout(PRIORITY_BULK, block=block)
+
+    def put(self, local_path: str, remote_path: str, callback=None, checkpoint=None) -> paramiko.SFTPAttributes:
+        uploader = ParallelUploader(self._bulk_checkout, self.pool.checkin, channels=self.transfer_channels)
+        try:
+            return uploader.upload(local_path, remote_path, callback=callback, checkpoint=checkpoint)
+        finally:
+            self.listings.invalidate(posixpath.dirname(remote_path))
+            self.blocks.invalidate(self.session, remote_path)
 
-    def read_head(self, path: str, size: int) -> bytes:
-        with self.sftp.open(path, "rb") as handle:
-            return handle.read(size)
+    def get(self, remote_path: str, local_path: str, callback=None, checkpoint=None) -> int:
+        downloader = ParallelDownloader(self._bulk_checkout, self.pool.checkin, channels=self.transfer_channels)
+        return downloader.download(remote_path, local_path, callback=callback, checkpoint=checkpoint)
 
-    def put(self, local_path: str, remote_path: str, callback=None):
-        self.sftp.put(local_path, remote_path, callback=callback)
+    def get_tree(self, remote_dir: str, local_dir: str, callback=None) -> int:
+        return TreeDownloader(self.pool, transfer_channels=self.transfer_channels).download(remote_dir, local_dir, callback=callback)
 
-    def get(self, remote_path: str, local_path: str, callback=None):
-        self.sftp.get(remote_path, local_path, callback=callback)
+    def put_tree(self, local_dir: str, remote_dir: str, callback=None) -> int:
+        try:
+            return TreeUploader(self.pool, transfer_channels=self.transfer_channels).upload(local_dir, remote_dir, callback=callback)
+        finally:
+            self.listings.invalidate(posixpath.dirname(remote_dir))
+            self.listings.invalidate_tree(remote_dir)
+            self.blocks.invalidate_tree(self.session, remote_dir)
 
     @staticmethod
     def join_remote(base: str, name: str) -> str:
-        if base == "/":
-            return f"/{name}"
-        return f"{base.rstrip('/')}/{name}"
+        return join_remote(base, name)
 
     @staticmethod
     def resolve_target_path(path: str, cwd: str, home: str) -> str:
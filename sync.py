@@ -0,0 +1,246 @@
+import hashlib
+import os
+import posixpath
+import shlex
+import stat
+import threading
+from dataclasses import dataclass, field
+
+from sftp_client import PRIORITY_BULK, ParallelDownloader, SFTPClient, TreeDownloader, human_size, read_files, walk_tree
+
+SYNC_BLOCK_SIZE = 128 * 1024
+SYNC_PATCH_MIN = 1024 * 1024
+SYNC_HASH_TIMEOUT = 120.0
+ACTION_COPY = "copy"
+ACTION_PATCH = "patch"
+ACTION_SKIP = "skip"
+
+# Prints one md5 per block followed by the whole-file digest, which is used to
+# verify a patched file before it is trusted.
+_REMOTE_HASH_SCRIPT = """
+import hashlib, sys
+size = int(sys.argv[1])
+whole = hashlib.md5()
+with open(sys.argv[2], "rb") as handle:
+    while True:
+        block = handle.read(size)
+        if not block:
+            break
+        whole.update(block)
+        print(hashlib.md5(block).hexdigest())
+print("total", whole.hexdigest())
+"""
+
+
+def remote_block_hashes(ssh, path: str, block_size: int = SYNC_BLOCK_SIZE):
+    # Returns (block digests, file digest), or None when the server cannot run
+    # Python over exec or the SFTP path is not visible to the shell (chroot).
+    if ssh is None:
+        return None
+    script = shlex.quote(_REMOTE_HASH_SCRIPT)
+    args = f"{block_size} {shlex.quote(path)}"
+    command = f"python3 -c {script} {args} 2>/dev/null || python -c {script} {args}"
+    try:
+        _stdin, stdout, _stderr = ssh.exec_command(command, timeout=SYNC_HASH_TIMEOUT)
+        lines = stdout.read().decode("ascii", errors="replace").split()
+        if stdout.channel.recv_exit_status() != 0:
+            return None
+    except Exception:
+        return None
+    if len(lines) < 2 or lines[-2] != "total":
+        return None
+    return lines[:-2], lines[-1]
+
+
+def local_block_hashes(path: str, block_size: int = SYNC_BLOCK_SIZE):
+    blocks = []
+    whole = hashlib.md5()
+    with open(path, "rb") as handle:
+        while True:
+            block = handle.read(block_size)
+            if not block:
+                break
+            whole.update(block)
+            blocks.append(hashlib.md5(block).hexdigest())
+    return blocks, whole.hexdigest()
+
+
+def changed_ranges(local_blocks, remote_blocks, size: int, block_size: int = SYNC_BLOCK_SIZE) -> list[tuple[int, int]]:
+    # Adjacent differing blocks are coalesced into one (offset, length) range.
+    ranges = []
+    for index, digest in enumerate(remote_blocks):
+        if index < len(local_blocks) and local_blocks[index] == digest:
+            continue
+        offset = index * block_size
+        length = min(block_size, size - offset)
+        if ranges and ranges[-1][0] + ranges[-1][1] == offset:
+            ranges[-1] = (ranges[-1][0], ranges[-1][1] + length)
+        else:
+            ranges.append((offset, length))
+    return ranges
+
+
+@dataclass
+class SyncAction:
+    action: str
+    remote_path: str
+    local_path: str
+    size: int
+    mtime: int
+    reason: str
+
+
+@dataclass
+class SyncPlan:
+    remote_root: str
+    local_root: str
+    actions: list[SyncAction] = field(default_factory=list)
+    errors: list[Exception] = field(default_factory=list)
+
+    def _select(self, action):
+        return [item for item in self.actions if item.action == action]
+
+    @property
+    def copies(self) -> list[SyncAction]:
+        return self._select(ACTION_COPY)
+
+    @property
+    def patches(self) -> list[SyncAction]:
+        return self._select(ACTION_PATCH)
+
+    @property
+    def skipped(self) -> list[SyncAction]:
+        return self._select(ACTION_SKIP)
+
+    @property
+    def pending(self) -> list[SyncAction]:
+        return [item for item in self.actions if item.action != ACTION_SKIP]
+
+    def summary(self) -> str:
+        copy_bytes = sum(item.size for item in self.copies)
+        patch_bytes = sum(item.size for item in self.patches)
+        skip_bytes = sum(item.size for item in self.skipped)
+        new = sum(1 for item in self.copies if item.reason == "new")
+        lines = [
+            f"{new} new and {len(self.copies) - new} changed files to copy ({human_size(copy_bytes)})",
+            f"{len(self.patches)} large changed files to patch by block (up to {human_size(patch_bytes)})",
+            f"{len(self.skipped)} unchanged files skipped ({human_size(skip_bytes)})",
+        ]
+        if self.errors:
+            lines.append(f"{len(self.errors)} folders could not be listed")
+        return "\n".join(lines)
+
+
+class SyncDownloader(TreeDownloader):
+    # Mirrors a remote tree into a local folder, transferring only what differs.
+    # Files are compared on size and whole-second mtime; large changed files are
+    # patched block by block when the server can hash them, otherwise copied.
+    def __init__(self, client: SFTPClient, hasher=None, block_size: int = SYNC_BLOCK_SIZE, **kwargs):
+        super().__init__(client.pool, transfer_channels=client.transfer_channels, **kwargs)
+        self.hasher = hasher or (lambda path, size: remote_block_hashes(client.ssh, path, size))
+        self.block_size = block_size
+        self.fetched = 0
+        self._hashing = True
+        self._lock = threading.Lock()
+
+    def plan(self, remote_root: str, local_root: str) -> SyncPlan:
+        plan = SyncPlan(remote_root, local_root)
+        channel = self.pool.checkout(PRIORITY_BULK)
+        try:
+            for path, entries, error in walk_tree(channel, remote_root):
+                if error is not None:
+                    if path == remote_root:
+                        raise error
+                    plan.errors.append(error)
+                    continue
+                local_dir = os.path.normpath(os.path.join(local_root, *posixpath.relpath(path, remote_root).split("/")))
+                for entry in entries:
+                    if stat.S_ISREG(entry.st_mode or 0):
+                        remote = SFTPClient.join_remote(path, entry.filename)
+                        plan.actions.append(self._compare(remote, os.path.join(local_dir, entry.filename), entry))
+        finally:
+            self.pool.checkin(channel)
+        return plan
+
+    def _compare(self, remote_path, local_path, entry) -> SyncAction:
+        size, mtime = entry.st_size, int(entry.st_mtime or 0)
+        try:
+            local = os.stat(local_path)
+        except OSError:
+            return SyncAction(ACTION_COPY, remote_path, local_path, size, mtime, "new")
+        if local.st_size == size and int(local.st_mtime) == mtime:
+            return SyncAction(ACTION_SKIP, remote_path, local_path, size, mtime, "unchanged")
+        if size >= SYNC_PATCH_MIN and local.st_size and stat.S_ISREG(local.st_mode):
+            return SyncAction(ACTION_PATCH, remote_path, local_path, size, mtime, "changed")
+        return SyncAction(ACTION_COPY, remote_path, local_path, size, mtime, "changed")
+
+    def execute(self, plan: SyncPlan, callback=None) -> int:
+        # Returns the number of bytes actually fetched.
+        self.fetched = 0
+
+        def produce(progress, pending, errors):
+            for action in plan.pending:
+                if progress.failed.is_set():
+                    return
+                os.makedirs(os.path.dirname(action.local_path), exist_ok=True)
+                progress.discover(action.size)
+                pending.put((action.remote_path, action.local_path, action.size, action))
+
+        def process_small(channel, batch, progress, errors):
+            results = read_files(channel, [(remote, size) for remote, _local, size, _action in batch])
+            for remote, local, size, action in batch:
+                data = results.get(remote)
+                if isinstance(data, Exception):
+                    errors.append(data)
+                    progress.advance(files=1)
+                    continue
+                with open(local, "wb") as handle:
+                    handle.write(data)
+                os.utime(local, (action.mtime, action.mtime))
+                self._count(len(data))
+                progress.advance(size, files=1)
+
+        def process_large(channel, item, progress):
+            _remote, local, size, action = item
+            file_callback = progress.file_callback()
+            if action.action == ACTION_PATCH:
+                self._patch(channel, action, file_callback)
+            else:
+                self._download(channel, action, file_callback)
+            file_callback(size, size)
+            os.utime(local, (action.mtime, action.mtime))
+            progress.advance(files=1)
+
+        self._run(produce, process_small, process_large, callback)
+        return self.fetched
+
+    def sync(self, remote_root: str, local_root: str, callback=None) -> int:
+        return self.execute(self.plan(remote_root, local_root), callback=callback)
+
+    def _count(self, size):
+        with self._lock:
+            self.fetched += size
+
+    def _download(self, channel, action, callback, ranges=None):
+        checkout, checkin = self._engine_channels(channel)
+        engine = ParallelDownloader(checkout, checkin, channels=self.transfer_channels)
+        engine.download(action.remote_path, action.local_path, callback=callback, ranges=ranges)
+        self._count(action.size if ranges is None else sum(length for _offset, length in ranges))
+
+    def _patch(self, channel, action, callback):
+        remote = self.hasher(action.remote_path, self.block_size) if self._hashing else None
+        if remote is None:
+            # Without remote hashing every patch would fall back anyway; stop asking.
+            self._hashing = False
+            self._download(channel, action, callback)
+            return
+        remote_blocks, remote_digest = remote
+        if len(remote_blocks) != -(-action.size // self.block_size):
+            self._download(channel, action, callback)
+            return
+        local_blocks, _digest = local_block_hashes(action.local_path, self.block_size)
+        ranges = changed_ranges(local_blocks, remote_blocks, action.size, self.block_size)
+        self._download(channel, action, callback, ranges=ranges)
+        if local_block_hashes(action.local_path, self.block_size)[1] != remote_digest:
+            # The file changed after hashing, or the shell saw a different path.
+            self._download(channel, action, callback)
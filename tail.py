@@ -0,0 +1,72 @@
+import codecs
+
+from preview import decode_bytes
+
+TAIL_BYTES = 64 * 1024
+TAIL_MAX_READ = 4 * 1024 * 1024
+TAIL_POLL_MIN = 0.5
+TAIL_POLL_MAX = 8.0
+TAIL_BACKOFF = 2.0
+TAIL_MAX_LINES = 5000
+
+
+class LogTail:
+    # "tail -f" over SFTP. start() returns the last `tail_bytes` of the file;
+    # each poll() stats it and reads only the bytes appended since. Quiet
+    # polls back off from `poll_min` to `poll_max` seconds, new data resets
+    # the interval. A file that shrank was truncated or rotated, and is
+    # re-read from its tail. Bytes are decoded incrementally, so characters
+    # split across polls come out whole.
+    def __init__(self, client, path: str, tail_bytes: int = TAIL_BYTES, max_read: int = TAIL_MAX_READ, poll_min: float = TAIL_POLL_MIN, poll_max: float = TAIL_POLL_MAX):
+        self.client = client
+        self.path = path
+        self.tail_bytes = tail_bytes
+        self.max_read = max_read
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+        self.interval = poll_min
+        self.position = 0
+        self.generation = 0
+        self.encoding = "utf-8"
+        self._decoder = None
+
+    def start(self) -> str:
+        size = self.client.stat(self.path).st_size or 0
+        self.generation += 1
+        return self._read_tail(size)
+
+    def poll(self) -> tuple[str, bool]:
+        # Returns (text, reset); reset means the file was replaced and `text`
+        # is a fresh tail rather than an append.
+        size = self.client.stat(self.path).st_size or 0
+        if size < self.position:
+            self.generation += 1
+            self.interval = self.poll_min
+            return self._read_tail(size), True
+        if size == self.position:
+            self.interval = min(self.poll_max, self.interval * TAIL_BACKOFF)
+            return "", False
+        self.interval = self.poll_min
+        if size - self.position > self.max_read:
+            # Fell too far behind to show it all; skip ahead like a fresh tail.
+            return self._read_tail(size), True
+        data = self.client.read_live(self.path, self.position, size - self.position, self.generation)
+        self.position += len(data)
+        return self._decoder.decode(data), False
+
+    def _read_tail(self, size: int) -> str:
+        start = max(0, size - self.tail_bytes)
+        data = self.client.read_live(self.path, start, size - start, self.generation)
+        self.position = start + len(data)
+        if start:
+            # Drop the partial first line.
+            newline = data.find(b"\n")
+            data = data[newline + 1 :] if newline != -1 else b""
+        # Sniff on whole lines so a character cut at the sample's end does not
+        # fail the UTF-8 check.
+        sample = data[:4096]
+        if b"\n" in sample[:-1]:
+            sample = sample[: sample.rfind(b"\n") + 1]
+        self.encoding = decode_bytes(sample).encoding
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        return self._decoder.decode(data)
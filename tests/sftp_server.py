@@ -0,0 +1,206 @@
+import collections
+import os
+import socket
+import threading
+import time
+
+import paramiko
+
+_HOST_KEY = None
+
+
+def _host_key():
+    global _HOST_KEY
+    if _HOST_KEY is None:
+        _HOST_KEY = paramiko.RSAKey.generate(2048)
+    return _HOST_KEY
+
+
+class _Server(paramiko.ServerInterface):
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+class _Handle(paramiko.SFTPHandle):
+    def stat(self):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as exc:
+            return paramiko.SFTPServer.convert_errno(exc.errno)
+
+    def chattr(self, attr):
+        return paramiko.SFTP_OK
+
+
+class _SFTPInterface(paramiko.SFTPServerInterface):
+    def __init__(self, server, root, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.root = root
+
+    def _local(self, path):
+        return os.path.join(self.root, self.canonicalize(path).lstrip("/"))
+
+    def _guard(self, func, *args):
+        try:
+            return func(*args)
+        except OSError as exc:
+            return paramiko.SFTPServer.convert_errno(exc.errno)
+
+    def list_folder(self, path):
+        def run():
+            local = self._local(path)
+            rows = []
+            for name in os.listdir(local):
+                attr = paramiko.SFTPAttributes.from_stat(os.lstat(os.path.join(local, name)))
+                attr.filename = name
+                rows.append(attr)
+            return rows
+
+        return self._guard(run)
+
+    def stat(self, path):
+        return self._guard(lambda: paramiko.SFTPAttributes.from_stat(os.stat(self._local(path))))
+
+    def lstat(self, path):
+        return self._guard(lambda: paramiko.SFTPAttributes.from_stat(os.lstat(self._local(path))))
+
+    def open(self, path, flags, attr):
+        def run():
+            fd = os.open(self._local(path), flags | getattr(os, "O_BINARY", 0), 0o644)
+            if flags & os.O_WRONLY:
+                mode = "ab" if flags & os.O_APPEND else "wb"
+            elif flags & os.O_RDWR:
+                mode = "a+b" if flags & os.O_APPEND else "r+b"
+            else:
+                mode = "rb"
+            handle = _Handle(flags)
+            handle.readfile = handle.writefile = os.fdopen(fd, mode)
+            return handle
+
+        return self._guard(run)
+
+    def remove(self, path):
+        return self._guard(lambda: os.remove(self._local(path)) or paramiko.SFTP_OK)
+
+    def rename(self, oldpath, newpath):
+        return self._guard(lambda: os.rename(self._local(oldpath), self._local(newpath)) or paramiko.SFTP_OK)
+
+    def posix_rename(self, oldpath, newpath):
+        return self._guard(lambda: os.replace(self._local(oldpath), self._local(newpath)) or paramiko.SFTP_OK)
+
+    def mkdir(self, path, attr):
+        return self._guard(lambda: os.mkdir(self._local(path)) or paramiko.SFTP_OK)
+
+    def rmdir(self, path):
+        return self._guard(lambda: os.rmdir(self._local(path)) or paramiko.SFTP_OK)
+
+    def chattr(self, path, attr):
+        def run():
+            if attr.st_mtime is not None and attr.st_atime is not None:
+                os.utime(self._local(path), (attr.st_atime, attr.st_mtime))
+            return paramiko.SFTP_OK
+
+        return self._guard(run)
+
+
+class _DelayedSocket:
+    # Holds every outgoing server packet for `delay` seconds without
+    # serializing them, which models link latency for pipelined requests.
+    def __init__(self, sock, delay):
+        self._sock = sock
+        self._delay = delay
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        threading.Thread(target=self._pump, daemon=True).start()
+
+    def send(self, data):
+        with self._cond:
+            self._queue.append((time.monotonic() + self._delay, bytes(data)))
+            self._cond.notify()
+        return len(data)
+
+    def sendall(self, data):
+        self.send(data)
+
+    def _pump(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                due, data = self._queue.popleft()
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                self._sock.sendall(data)
+            except OSError:
+                return
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._sock.close()
+
+    def __getattr__(self, name):
+        return getattr(self._sock, name)
+
+
+class LocalSFTPServer:
+    def __init__(self, root: str, latency: float = 0.0):
+        self.root = root
+        self.latency = latency
+        self.host = "127.0.0.1"
+        self.port = 0
+        self._listener = None
+        self._transports = []
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((self.host, 0))
+        self._listener.listen(16)
+        self.port = self._listener.getsockname()[1]
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                sock, _addr = self._listener.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = paramiko.Transport(_DelayedSocket(sock, self.latency) if self.latency else sock)
+            transport.add_server_key(_host_key())
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, _SFTPInterface, self.root)
+            self._transports.append(transport)
+            try:
+                transport.start_server(server=_Server())
+            except Exception:
+                transport.close()
+
+    def stop(self):
+        self._stopped.set()
+        if self._listener:
+            self._listener.close()
+        for transport in self._transports:
+            transport.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
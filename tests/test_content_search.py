@@ -0,0 +1,92 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from content_search import ContentSearch, SearchHit, _parse_grep_line, compile_search, scan_stream
+from sftp_client import SFTPClient
+from tests.sftp_server import LocalSFTPServer
+
+
+def _chunks(payload, size):
+    return [payload[i : i + size] for i in range(0, len(payload), size)]
+
+
+class ScanStreamTests(unittest.TestCase):
+    def test_matches_across_chunk_boundaries(self):
+        payload = b"".join(b"request %d ok\n" % i for i in range(500)) + b"fatal: disk full\n" + b"after\n"
+        offset = payload.index(b"fatal")
+        for size in (7, 64, 4096, len(payload)):
+            hits = scan_stream(_chunks(payload, size), compile_search("disk full"), "/app.log")
+            self.assertEqual(hits, [SearchHit("/app.log", offset, 501, "fatal: disk full")])
+
+    def test_one_hit_per_line_and_cap(self):
+        payload = b"x err err\ny\nerr\n" * 50
+        hits = scan_stream(_chunks(payload, 10), compile_search("ERR", ignore_case=True), "/a", max_hits=5)
+        self.assertEqual([hit.line for hit in hits], [1, 3, 4, 6, 7])
+        self.assertEqual([hit.offset for hit in hits[:2]], [0, 12])
+
+    def test_regex_and_last_line_without_newline(self):
+        hits = scan_stream([b"a\ncode=5", b"03"], compile_search(r"re:code=\d{3}$"), "/a")
+        self.assertEqual(hits, [SearchHit("/a", 2, 2, "code=503")])
+
+    def test_binary_files_are_skipped(self):
+        self.assertEqual(scan_stream([b"\0\0needle"], compile_search("needle"), "/a.bin"), [])
+
+    @unittest.skipUnless(shutil.which("grep"), "grep not installed")
+    def test_parses_grep_output(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "a:b.log")
+            with open(path, "wb") as handle:
+                handle.write(b"one\ntwo: needle\nthree\nneedle again\n")
+            output = subprocess.run(["grep", "-FIsnbHZ", "-e", "needle", "--", path], capture_output=True, check=True).stdout
+        hits = [_parse_grep_line(line) for line in output.splitlines()]
+        self.assertEqual(hits, [SearchHit(path, 4, 2, "two: needle"), SearchHit(path, 22, 4, "needle again")])
+
+
+class ContentSearchTests(unittest.TestCase):
+    def setUp(self):
+        self.remote_dir = tempfile.TemporaryDirectory()
+        for index in range(6):
+            with open(os.path.join(self.remote_dir.name, f"app-{index}.log"), "wb") as handle:
+                for line in range(20_000):
+                    handle.write(b"ERROR timeout\n" if (index, line) in ((1, 7), (4, 19_999)) else b"INFO served\n")
+        self.server = LocalSFTPServer(self.remote_dir.name).start()
+        self.client = SFTPClient()
+        self.client.connect(self.server.host, self.server.port, "nova", "secret")
+        self.paths = [f"/app-{index}.log" for index in range(6)]
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.server.stop()
+        self.remote_dir.cleanup()
+
+    def test_streams_when_the_server_cannot_grep(self):
+        search = ContentSearch(self.client, "timeout", workers=3, grep=lambda paths, cancel: None)
+        progress = []
+        hits = search.run(self.paths, progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(search.method, "stream")
+        self.assertEqual([(hit.path, hit.line, hit.offset) for hit in hits], [("/app-1.log", 8, 7 * 12), ("/app-4.log", 20_000, 19_999 * 12)])
+        self.assertEqual(progress[-1], (6, 6))
+
+    def test_uses_grep_for_literal_queries(self):
+        calls = []
+
+        def grep(paths, cancel):
+            calls.append(paths)
+            return [SearchHit(paths[0], 0, 1, "ERROR timeout")]
+
+        search = ContentSearch(self.client, "timeout", grep=grep)
+        self.assertEqual(len(search.run(self.paths)), 1)
+        self.assertEqual(search.method, "grep")
+        self.assertEqual(calls, [self.paths])
+
+        regex = ContentSearch(self.client, r"re:time\w+", grep=grep)
+        self.assertEqual(len(regex.run(self.paths)), 2)
+        self.assertEqual(regex.method, "stream")
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from datetime import datetime
+
+from filter_engine import ListingFilter, parse_query
+from listing import Listing
+
+NOW = 1_700_000_000
+
+
+def _listing(*rows):
+    listing = Listing("/d")
+    for name, size, mtime in rows:
+        listing.append(name, 0o100644, size, mtime)
+    return listing
+
+
+def _names(rows):
+    return [row.name for row in rows]
+
+
+class ParseQueryTests(unittest.TestCase):
+    def test_tokens(self):
+        query = parse_query("Core size>=1.5k mtime<2d *.LOG re:^a\\d", now=NOW)
+        self.assertEqual(query.terms, ("core",))
+        self.assertEqual(query.patterns, (("glob", "*.LOG"), ("regex", "^a\\d")))
+        self.assertEqual(query.predicates, (("size", ">=", 1536), ("mtime", ">", NOW - 2 * 86400)))
+        self.assertTrue(parse_query("  ").empty)
+
+    def test_invalid_input(self):
+        for text in ("size>lots", "size>10q", "mtime<yesterday", "re:(unclosed"):
+            with self.assertRaises(ValueError):
+                parse_query(text)
+
+    def test_narrows(self):
+        self.assertTrue(parse_query("abc").narrows(parse_query("ab")))
+        self.assertTrue(parse_query("ab size>1").narrows(parse_query("ab")))
+        self.assertFalse(parse_query("ab").narrows(parse_query("abc")))
+        self.assertFalse(parse_query("ab", show_hidden=True).narrows(parse_query("ab", show_hidden=False)))
+        # Relative ages resolve against a later `now` on every keystroke.
+        self.assertTrue(parse_query("mtime<7d abc", now=NOW + 1).narrows(parse_query("mtime<7d ab", now=NOW)))
+        self.assertFalse(parse_query("mtime<6d abc", now=NOW + 1).narrows(parse_query("mtime<7d ab", now=NOW)))
+        self.assertFalse(parse_query("mtime>7d abc").narrows(parse_query("mtime<7d ab")))
+
+
+class ListingFilterTests(unittest.TestCase):
+    def setUp(self):
+        self.rows = _listing(
+            ("alpha.log", 10, NOW - 10 * 86400),
+            ("Beta.LOG", 5000, NOW),
+            (".hidden.log", 20, NOW),
+            ("gamma.txt", 2 * 1024 * 1024, NOW),
+            ("core.1234", 1, NOW),
+        )
+
+    def test_empty_query_returns_listing(self):
+        engine = ListingFilter(self.rows)
+        self.assertIs(engine.filter(parse_query("")), self.rows)
+        self.assertEqual(_names(engine.filter(parse_query("", show_hidden=False))), ["alpha.log", "Beta.LOG", "gamma.txt", "core.1234"])
+
+    def test_terms_patterns_and_predicates(self):
+        engine = ListingFilter(self.rows)
+        self.assertEqual(_names(engine.filter(parse_query("LOG"))), ["alpha.log", "Beta.LOG", ".hidden.log"])
+        self.assertEqual(_names(engine.filter(parse_query("*.log size>15"))), ["Beta.LOG", ".hidden.log"])
+        self.assertEqual(_names(engine.filter(parse_query("re:^core\\.\\d+$"))), ["core.1234"])
+        self.assertEqual(_names(engine.filter(parse_query("size>1M"))), ["gamma.txt"])
+        # Ages compare age: mtime<7d is newer than a week, mtime>7d older.
+        self.assertEqual(_names(engine.filter(parse_query("mtime<7d", now=NOW))), ["Beta.LOG", ".hidden.log", "gamma.txt", "core.1234"])
+        self.assertEqual(_names(engine.filter(parse_query("mtime>7d", now=NOW))), ["alpha.log"])
+        cutoff = datetime.fromtimestamp(NOW - 86400).strftime("%Y-%m-%d")
+        self.assertEqual(_names(engine.filter(parse_query(f"mtime<{cutoff}", now=NOW))), ["alpha.log"])
+
+    def test_refinement_matches_fresh_filter(self):
+        engine = ListingFilter(self.rows)
+        for text in ("l", "lo", "log", "log size>15", "log size>15 be", "a"):
+            query = parse_query(text, show_hidden=False)
+            self.assertEqual(list(engine.filter(query)), list(ListingFilter(self.rows).filter(query)), text)
+
+    def test_index_matches_scan(self):
+        rows = _listing(*((f"file-{i:05d}.{'log' if i % 97 == 0 else 'dat'}", i, NOW) for i in range(5000)))
+        indexed = ListingFilter(rows, index_min=1)
+        scanned = ListingFilter(rows, index_min=10**9)
+        for text in ("00123", "log", "file", "dat 12", "nothing-here", "-0"):
+            query = parse_query(text)
+            self.assertEqual(indexed.filter(query).names, scanned.filter(query).names, text)
+
+
+if __name__ == "__main__":
+    unittest.main()
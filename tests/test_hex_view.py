@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from hex_view import HEX_ROW_BYTES, find_bytes, format_hex_rows, offset_width, parse_offset, parse_pattern, read_hex_rows
+from sftp_client import SFTPClient
+from tests.sftp_server import LocalSFTPServer
+
+
+def _per_byte(data, offset=0):
+    # The formatter the hex preview used before.
+    lines = []
+    for start in range(0, len(data), 16):
+        chunk = data[start : start + 16]
+        hex_part = " ".join(f"{b:02x}" for b in chunk)
+        ascii_part = "".join(chr(b) if 32 <= b <= 126 else "." for b in chunk)
+        lines.append(f"{offset + start:08x}  {hex_part:<47}  {ascii_part}")
+    return lines
+
+
+class FormatTests(unittest.TestCase):
+    def test_matches_per_byte_formatting(self):
+        data = bytes(range(256)) * 3 + b"tail"
+        self.assertEqual(format_hex_rows(data, 0), _per_byte(data))
+        self.assertEqual(format_hex_rows(data[:5], 0x40), _per_byte(data[:5], 0x40))
+
+    def test_offsets_past_four_gigabytes(self):
+        size = 5 * 2**30
+        self.assertEqual(offset_width(size), 9)
+        rows = format_hex_rows(b"ABC", size - 3, offset_width(size))
+        self.assertEqual(rows, [f"{size - 3:09x}  41 42 43{' ' * 39}  ABC"])
+
+    def test_reads_only_the_requested_rows(self):
+        data = os.urandom(10 * HEX_ROW_BYTES + 7)
+        calls = []
+
+        def read(offset, size):
+            calls.append((offset, size))
+            return data[offset : offset + size]
+
+        rows = read_hex_rows(read, len(data), 8, 5)
+        self.assertEqual(rows, _per_byte(data)[8:])
+        self.assertEqual(calls, [(8 * HEX_ROW_BYTES, 2 * HEX_ROW_BYTES + 7)])
+        self.assertEqual(read_hex_rows(read, len(data), 20, 5), [])
+
+
+class ParseTests(unittest.TestCase):
+    def test_offsets(self):
+        self.assertEqual(parse_offset("4096"), 4096)
+        self.assertEqual(parse_offset(" 0x1F40 "), 0x1F40)
+        self.assertEqual(parse_offset("1f40h"), 0x1F40)
+        self.assertEqual(parse_offset("1_000"), 1000)
+        with self.assertRaises(ValueError):
+            parse_offset("twelve")
+
+    def test_patterns(self):
+        self.assertEqual(parse_pattern("de ad BE ef"), b"\xde\xad\xbe\xef")
+        self.assertEqual(parse_pattern("0x89504e47"), b"\x89PNG")
+        self.assertEqual(parse_pattern('"IEND"'), b"IEND")
+        self.assertEqual(parse_pattern("'ab'"), b"ab")
+        self.assertEqual(parse_pattern("hello"), b"hello")
+        with self.assertRaises(ValueError):
+            parse_pattern('""')
+
+
+class FindTests(unittest.TestCase):
+    def test_match_split_across_chunks(self):
+        data = b"x" * 100 + b"NEEDLE" + b"y" * 50
+        for size in (1, 3, 7, 103, 1000):
+            chunks = (data[start : start + size] for start in range(0, len(data), size))
+            self.assertEqual(find_bytes(chunks, b"NEEDLE"), 100, size)
+
+    def test_start_offset_and_miss(self):
+        data = b"ab" * 20
+        self.assertEqual(find_bytes([data[11:]], b"ab", 11), 12)
+        self.assertIsNone(find_bytes([data[:20], data[20:]], b"abc"))
+
+    def test_cancel(self):
+        cancel = threading.Event()
+        cancel.set()
+        self.assertIsNone(find_bytes([b"needle"], b"needle", 0, cancel))
+
+
+class RemoteHexTests(unittest.TestCase):
+    def test_search_and_page_a_remote_file(self):
+        data = os.urandom(3 * 2**20)
+        marker = b"\xca\xfe\xba\xbe-marker"
+        data = data[: 2**20 + 5] + marker + data[2**20 + 5 + len(marker) :]
+        with tempfile.TemporaryDirectory() as remote:
+            with open(os.path.join(remote, "blob.bin"), "wb") as handle:
+                handle.write(data)
+            with LocalSFTPServer(remote) as server:
+                client = SFTPClient()
+                client.connect(server.host, server.port, "nova", "secret")
+                try:
+                    version = client.file_version("/blob.bin")
+                    chunks = client.stream_file("/blob.bin", 256 * 1024, 1000, len(data))
+                    try:
+                        hit = find_bytes(chunks, marker, 1000)
+                    finally:
+                        chunks.close()
+                    self.assertEqual(hit, data.find(marker))
+                    first = hit // HEX_ROW_BYTES
+                    rows = read_hex_rows(lambda offset, size: client.read_range("/blob.bin", offset, size, version), len(data), first, 4)
+                    self.assertEqual(rows, _per_byte(data[first * HEX_ROW_BYTES : (first + 4) * HEX_ROW_BYTES], first * HEX_ROW_BYTES))
+                finally:
+                    client.disconnect()
+
+
+if __name__ == "__main__":
+    unittest.main()
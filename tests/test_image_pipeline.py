@@ -0,0 +1,86 @@
+import io
+import threading
+import unittest
+
+from PIL import Image
+
+from image_pipeline import ImagePyramid, LatestRenderer, PyramidCache, decode_image, draft_size, probe_image
+
+
+def _jpeg(size, exif_padding=0):
+    buffer = io.BytesIO()
+    image = Image.new("RGB", size, (200, 40, 40))
+    kwargs = {"exif": b"Exif\0\0" + b"\0" * exif_padding} if exif_padding else {}
+    image.save(buffer, "JPEG", quality=80, **kwargs)
+    return buffer.getvalue()
+
+
+class ImagePipelineTests(unittest.TestCase):
+    def test_probe_reads_only_the_header(self):
+        data = _jpeg((4000, 3000), exif_padding=60_000) + b"\0" * 2_000_000
+        reads = []
+
+        def read(offset, size):
+            reads.append(size)
+            return data[offset : offset + size]
+
+        self.assertEqual(probe_image(read, len(data)), ("JPEG", (4000, 3000)))
+        self.assertLessEqual(sum(reads), 256 * 1024)
+
+    def test_draft_decodes_jpeg_at_reduced_scale(self):
+        data = _jpeg((4000, 3000))
+        self.assertEqual(draft_size((4000, 3000), 1000), (1000, 750))
+        image, full_size = decode_image(data, (1000, 750))
+        self.assertEqual(full_size, (4000, 3000))
+        self.assertEqual(image.size, (1000, 750))
+        self.assertEqual(decode_image(data)[0].size, (4000, 3000))
+
+    def test_palette_images_are_converted(self):
+        buffer = io.BytesIO()
+        Image.new("P", (10, 10)).save(buffer, "GIF")
+        self.assertEqual(decode_image(buffer.getvalue())[0].mode, "RGB")
+
+    def test_pyramid_levels_and_budget(self):
+        pyramid = ImagePyramid(Image.new("RGB", (1600, 1200)), (1600, 1200))
+        self.assertEqual(pyramid.level_for((380, 280)).size, (400, 300))
+        self.assertEqual([level.size for level in pyramid.levels], [(1600, 1200), (800, 600), (400, 300)])
+        self.assertEqual(pyramid.render((390, 290)).size, (390, 290))
+        self.assertEqual(pyramid.render((390, 290), quality=True).size, (390, 290))
+        self.assertEqual(pyramid.level_for((2000, 2000)).size, (1600, 1200))
+
+        tight = ImagePyramid(Image.new("RGB", (1600, 1200)), (3200, 2400), max_bytes=1600 * 1200 * 3)
+        self.assertFalse(tight.complete)
+        self.assertEqual(tight.level_for((100, 100)).size, (200, 150))
+        self.assertEqual(len(tight.levels), 1)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = PyramidCache(max_bytes=3 * 100 * 100 * 3)
+        for name in "abc":
+            cache.put(name, ImagePyramid(Image.new("RGB", (100, 100)), (100, 100)))
+        cache.get("a")
+        cache.put("d", ImagePyramid(Image.new("RGB", (100, 100)), (100, 100)))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertEqual(len(cache), 3)
+
+    def test_renderer_skips_superseded_jobs(self):
+        renderer = LatestRenderer()
+        started, release, finished = threading.Event(), threading.Event(), threading.Event()
+        results = []
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "first"
+
+        renderer.submit(slow, results.append)
+        started.wait(5)
+        renderer.submit(lambda: "second", results.append)
+        renderer.submit(lambda: "third", lambda result: (results.append(result), finished.set()))
+        release.set()
+        finished.wait(5)
+        self.assertEqual(results, ["first", "third"])
+
+
+if __name__ == "__main__":
+    unittest.main()
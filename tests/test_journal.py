@@ -0,0 +1,44 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from journal import TransferJournal, merge_range, missing_ranges
+
+
+class RangeTests(unittest.TestCase):
+    def test_merge_and_missing(self):
+        ranges = []
+        merge_range(ranges, 10, 20)
+        merge_range(ranges, 30, 40)
+        merge_range(ranges, 0, 5)
+        self.assertEqual(ranges, [[0, 5], [10, 20], [30, 40]])
+        merge_range(ranges, 18, 31)
+        self.assertEqual(ranges, [[0, 5], [10, 40]])
+        merge_range(ranges, 5, 10)
+        self.assertEqual(ranges, [[0, 40]])
+        self.assertEqual(missing_ranges([[0, 5], [10, 40]], 50), [(5, 5), (40, 10)])
+        self.assertEqual(missing_ranges([], 7), [(0, 7)])
+
+
+class JournalTests(unittest.TestCase):
+    def test_checkpoint_survives_reopen(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            journal = TransferJournal(Path(tmp))
+            checkpoint = journal.open("u@h:22", "Download", "/a.bin", "/tmp/a.bin")
+            checkpoint.reset(100, 1234)
+            checkpoint.mark(0, 40)
+            checkpoint.flush()
+
+            reopened = TransferJournal(Path(tmp)).open("u@h:22", "Download", "/a.bin", "/tmp/a.bin")
+            self.assertTrue(reopened.matches(100, 1234))
+            self.assertFalse(reopened.matches(100, 9999))
+            self.assertEqual(reopened.missing(), [(40, 60)])
+            self.assertEqual(len(journal.pending("u@h:22")), 1)
+            self.assertEqual(journal.pending("other"), [])
+
+            reopened.finish()
+            self.assertEqual(journal.pending(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from line_index import LineIndexStore, align_page, build_line_index, codepoint_boundary, read_lines
+from sftp_client import SFTPClient
+from tests.sftp_server import LocalSFTPServer
+
+
+def _lines(count):
+    return b"".join(b"line %d\n" % i for i in range(count))
+
+
+def _reader(payload):
+    return lambda offset, size: payload[offset : offset + size]
+
+
+class LineIndexTests(unittest.TestCase):
+    def test_checkpoints_across_chunks(self):
+        payload = _lines(2500) + b"tail without newline"
+        index = build_line_index((payload[i : i + 777] for i in range(0, len(payload), 777)), len(payload), 0, every=100)
+        self.assertEqual(index.total_lines, 2501)
+        self.assertEqual(len(index.checkpoints), 26)
+        for slot, offset in enumerate(index.checkpoints[:-1]):
+            self.assertTrue(payload[offset:].startswith(b"line %d\n" % (slot * 100)))
+        self.assertTrue(payload[index.checkpoints[-1] :].startswith(b"tail"))
+
+    def test_read_lines_from_checkpoint(self):
+        payload = _lines(5000)
+        index = build_line_index([payload], len(payload), 0, every=64)
+        data, start, end = read_lines(_reader(payload), index, 1234, 3, 1 << 20)
+        self.assertEqual(data, b"line 1234\nline 1235\nline 1236\n")
+        self.assertEqual(payload[start:end], data)
+        self.assertEqual(read_lines(_reader(payload), index, 4999, 10, 1 << 20)[0], b"line 4999\n")
+        self.assertEqual(read_lines(_reader(payload), index, 6000, 10, 1 << 20)[0], b"")
+
+    def test_long_lines_are_cut_on_character_boundaries(self):
+        payload = "€".encode("utf-8") * 50_000
+        index = build_line_index([payload], len(payload), 0)
+        data, _start, end = read_lines(_reader(payload), index, 0, 10, 1000)
+        self.assertEqual(len(data) % 3, 0)
+        self.assertEqual(end, len(data))
+        self.assertEqual(codepoint_boundary("a€".encode("utf-8")[:-1]), 1)
+
+    def test_align_page(self):
+        self.assertEqual(align_page(b"tial\nwhole\npar", True, True), (b"whole\n", 5))
+        self.assertEqual(align_page(b"whole\n", False, True), (b"whole\n", 0))
+
+    def test_cancel_stops_indexing(self):
+        cancel = threading.Event()
+        cancel.set()
+        self.assertIsNone(build_line_index([b"a\n"], 2, 0, cancel=cancel))
+
+    def test_store_round_trip_and_version_key(self):
+        payload = _lines(3000)
+        index = build_line_index([payload], len(payload), 42, every=100)
+        with tempfile.TemporaryDirectory() as state_dir:
+            store = LineIndexStore(state_dir)
+            store.save("nova@host:22", "/app.log", index)
+            loaded = store.load("nova@host:22", "/app.log", len(payload), 42)
+            self.assertEqual(loaded.checkpoints, index.checkpoints)
+            self.assertEqual(loaded.total_lines, 3000)
+            self.assertIsNone(store.load("nova@host:22", "/app.log", len(payload), 43))
+            self.assertIsNone(store.load("other@host:22", "/app.log", len(payload), 42))
+
+    def test_index_streamed_remote_file(self):
+        payload = _lines(20_000)
+        with tempfile.TemporaryDirectory() as remote_dir:
+            with open(os.path.join(remote_dir, "app.log"), "wb") as handle:
+                handle.write(payload)
+            with LocalSFTPServer(remote_dir) as server:
+                client = SFTPClient()
+                client.connect(server.host, server.port, "nova", "secret")
+                try:
+                    mtime, size = client.file_version("/app.log")
+                    fractions = []
+                    index = build_line_index(client.stream_file("/app.log", 64 * 1024), size, mtime, progress=fractions.append)
+                    self.assertEqual(index.total_lines, 20_000)
+                    self.assertEqual(fractions[-1], 1.0)
+                    self.assertGreater(len(fractions), 1)
+
+                    def read(offset, length):
+                        return client.read_range("/app.log", offset, length, (mtime, size))
+
+                    self.assertEqual(read_lines(read, index, 15_000, 2, 1 << 20)[0], b"line 15000\nline 15001\n")
+                finally:
+                    client.disconnect()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import stat
+import unittest
+
+from listing import Listing, format_mtime, human_size, natural_key
+from sftp_client import SFTPClient
+
+
+class _Attr:
+    def __init__(self, filename, mode, size, mtime):
+        self.filename = filename
+        self.st_mode = mode
+        self.st_size = size
+        self.st_mtime = mtime
+
+
+def _listing():
+    return Listing.from_attrs(
+        "/srv/data/",
+        [
+            _Attr("b.txt", stat.S_IFREG | 0o644, 2048, 1_700_000_000),
+            _Attr("Zeta", stat.S_IFDIR | 0o755, 4096, 1_700_000_030),
+            _Attr("a.txt", stat.S_IFREG | 0o644, 5, None),
+            _Attr("alpha", stat.S_IFDIR | 0o755, 4096, 1_700_000_059),
+        ],
+    )
+
+
+class ListingTests(unittest.TestCase):
+    def test_rows_read_columns(self):
+        row = _listing()[0]
+        self.assertEqual((row.name, row.full_path, row.st_size, row.is_dir), ("b.txt", "/srv/data/b.txt", 2048, False))
+        self.assertEqual((row.file_type, row.size_human), ("FILE", "2.0 KB"))
+        self.assertEqual(_listing()[1].size_human, "-")
+        self.assertEqual(_listing()[-2].st_mtime, 0)
+        self.assertEqual(SFTPClient.join_remote("/", "x"), "/x")
+        with self.assertRaises(IndexError):
+            _listing()[4]
+
+    def test_sort_puts_folders_first(self):
+        listing = _listing().sort()
+        self.assertEqual(listing.names, ["alpha", "Zeta", "a.txt", "b.txt"])
+        self.assertEqual(list(listing.sizes), [4096, 4096, 5, 2048])
+        self.assertEqual([row.name for row in listing[1:3]], ["Zeta", "a.txt"])
+
+    def test_select_and_equality(self):
+        listing = _listing()
+        picked = listing.select([2, 0])
+        self.assertEqual(picked.names, ["a.txt", "b.txt"])
+        self.assertEqual(picked[1], listing[0])
+        self.assertNotEqual(picked[0], listing[0])
+
+    def test_display_strings(self):
+        self.assertEqual(human_size(1536), "1.5 KB")
+        self.assertEqual(format_mtime(1_700_000_000), format_mtime(1_700_000_019))
+        self.assertEqual(_listing()[1].modified, _listing()[0].modified)
+
+
+class SortTests(unittest.TestCase):
+    def setUp(self):
+        self.listing = Listing("/logs")
+        for index, (name, size, mtime) in enumerate(
+            [("file10.log", 30, 5), ("File9.log", 10, 9), ("file1.log", 30, 7), ("archive", 0, 9), ("file2.log", 20, 1)]
+        ):
+            mode = (stat.S_IFDIR | 0o755) if name == "archive" else (stat.S_IFREG | 0o644)
+            self.listing.append(name, mode, size, mtime)
+
+    def test_natural_order(self):
+        self.assertLess(natural_key("file9"), natural_key("File10"))
+        self.assertLess(natural_key("a"), natural_key("a1"))
+        natural = self.listing.sorted_by((("name", False),), natural=True)
+        self.assertEqual(natural.names, ["archive", "file1.log", "file2.log", "File9.log", "file10.log"])
+        plain = self.listing.sorted_by((("name", False),))
+        self.assertEqual(plain.names, ["archive", "file1.log", "file10.log", "file2.log", "File9.log"])
+
+    def test_multi_key_sort_is_stable(self):
+        by_size = self.listing.sorted_by((("size", True),))
+        self.assertEqual(by_size.names, ["file10.log", "file1.log", "file2.log", "File9.log", "archive"])
+        spec = (("type", False), ("modified", True), ("name", True))
+        self.assertEqual(self.listing.sorted_by(spec).names, ["archive", "File9.log", "file1.log", "file10.log", "file2.log"])
+
+    def test_top_matches_full_sort(self):
+        for spec in ((("size", True),), (("name", True),), (("size", False), ("name", True)), (("type", True), ("modified", False))):
+            for count in (1, 3, 10):
+                expected = self.listing.sorted_by(spec, natural=True).names[:count]
+                self.assertEqual(self.listing.top(count, spec, natural=True).names, expected, (spec, count))
+
+    def test_sort_keys_are_cached(self):
+        keys = self.listing.sort_keys("name", natural=True)
+        self.assertIs(self.listing.sort_keys("name", natural=True), keys)
+        self.assertIsNot(self.listing.sort_keys("name"), keys)
+        with self.assertRaises(ValueError):
+            self.listing.sort_keys("owner")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from preview import decode_bytes, looks_like_text, should_preview_as_text
+from preview import decode_bytes, looks_like_text, should_preview_as_text, sniff_text
 
 
 class PreviewTests(unittest.TestCase):
@@ -22,6 +22,37 @@ class PreviewTests(unittest.TestCase):
         self.assertTrue(looks_like_text(b"abc 123\nxyz"))
         self.assertFalse(looks_like_text(bytes([0, 159, 255, 13, 0, 0, 1, 2])))
 
+    def test_utf16_looks_like_text(self):
+        self.assertTrue(looks_like_text("plain log line\n".encode("utf-16")))
+        self.assertTrue(looks_like_text("plain log line\n".encode("utf-16-be")))
+
+    def test_page_cut_inside_a_character_stays_utf8(self):
+        decoded = decode_bytes("naïve €".encode("utf-8")[:-1])
+        self.assertEqual(decoded.encoding, "utf-8")
+        self.assertEqual(decoded.text, "naïve ")
+
+    def test_latin1_page_without_nulls_is_not_utf16(self):
+        self.assertEqual(decode_bytes("café au lait".encode("latin-1")).encoding, "latin-1")
+
+    def test_sniff_samples_middle_and_tail(self):
+        reads = []
+
+        def reader(payload):
+            def read(offset, size):
+                reads.append(offset)
+                return payload[offset : offset + size]
+
+            return read
+
+        text_header = b"# header\n" * 1000 + bytes(range(256)) * 400
+        self.assertFalse(sniff_text(reader(text_header), len(text_header)))
+        binary = bytes(range(256)) * 400
+        reads.clear()
+        self.assertFalse(sniff_text(reader(binary), len(binary)))
+        self.assertEqual(reads, [0])
+        log = b"INFO ok\n" * 20_000
+        self.assertTrue(sniff_text(reader(log), len(log)))
+
     def test_text_extension_forces_text(self):
         self.assertTrue(should_preview_as_text(".dat", bytes([0, 1, 2, 3])))
 
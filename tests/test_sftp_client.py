@@ -0,0 +1,455 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from sftp_client import (
+    BlockCache,
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    Listing,
+    ListingCache,
+    ParallelDownloader,
+    ParallelUploader,
+    SFTPClient,
+    split_ranges,
+    walk_tree,
+)
+from journal import TransferJournal
+from tests.sftp_server import LocalSFTPServer
+
+
+class SplitRangesTests(unittest.TestCase):
+    def test_covers_total(self):
+        self.assertEqual(split_ranges(10, 4), [(0, 4), (4, 4), (8, 2)])
+        self.assertEqual(split_ranges(0, 4), [])
+
+
+def _rows(count, prefix="f"):
+    rows = Listing("/d")
+    for i in range(count):
+        rows.append(f"{prefix}{i}", 0o100644, 1, 0)
+    return rows
+
+
+class ListingCacheTests(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = ListingCache(max_entries=2)
+        cache.put("/a", _rows(1), 1)
+        cache.put("/b/", _rows(1), 1)
+        self.assertIsNotNone(cache.get("/a"))
+        cache.put("/c", _rows(1), 1)
+        self.assertIsNone(cache.get("/b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_memory_budget(self):
+        cache = ListingCache(max_bytes=50_000)
+        cache.put("/big", _rows(1000), 1)
+        self.assertIsNone(cache.get("/big"))
+        cache.put("/a", _rows(400), 1)
+        cache.put("/b", _rows(400), 1)
+        self.assertIsNone(cache.get("/a"))
+        self.assertLessEqual(cache.bytes, 50_000)
+
+    def test_invalidate_tree(self):
+        cache = ListingCache()
+        for path in ("/srv", "/srv/a", "/srv/a/b", "/srvx"):
+            cache.put(path, _rows(1), 1)
+        cache.invalidate_tree("/srv/a")
+        self.assertEqual([p for p in ("/srv", "/srv/a", "/srv/a/b", "/srvx") if cache.get(p)], ["/srv", "/srvx"])
+
+
+class BlockCacheTests(unittest.TestCase):
+    def test_memory_budget_and_versions(self):
+        cache = BlockCache(max_bytes=10, block_size=4)
+        cache.put("s", "/f", 1, 8, 0, b"abcd")
+        cache.put("s", "/f", 1, 8, 4, b"efgh")
+        cache.put("s", "/g", 1, 4, 0, b"ijkl")
+        self.assertIsNone(cache.get("s", "/f", 1, 8, 0))
+        self.assertEqual(cache.get("s", "/f", 1, 8, 4), b"efgh")
+        self.assertIsNone(cache.get("other", "/f", 1, 8, 4))
+        cache.validate("s", "/f", 2, 8)
+        self.assertIsNone(cache.get("s", "/f", 1, 8, 4))
+        self.assertEqual(cache.bytes, 4)
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as state:
+            cache = BlockCache(block_size=4, disk_bytes=8)
+            cache.attach_disk(state)
+            for offset in (0, 4, 8):
+                cache.put("s", "/f", 1, 12, offset, b"abcd")
+            reopened = BlockCache(block_size=4, disk_bytes=8)
+            reopened.attach_disk(state)
+            self.assertIsNone(reopened.get("s", "/f", 1, 12, 0))
+            self.assertEqual(reopened.get("s", "/f", 1, 12, 8), b"abcd")
+            reopened.validate("s", "/f", 2, 12)
+            self.assertEqual(sum(len(files) for _root, _dirs, files in os.walk(state)), 0)
+
+    def test_short_and_partial_disk_blocks_are_discarded(self):
+        with tempfile.TemporaryDirectory() as state:
+            cache = BlockCache(block_size=4)
+            cache.attach_disk(state)
+            cache.put("s", "/f", 1, 10, 0, b"abcd")
+            cache.put("s", "/f", 1, 10, 8, b"ij")
+            folder = next(os.scandir(state)).path
+            names = sorted(os.listdir(folder))
+            # A block cut short by a crash, and a write that never finished.
+            with open(os.path.join(folder, names[0]), "wb") as handle:
+                handle.write(b"ab")
+            with open(os.path.join(folder, names[0] + ".99.tmp"), "wb") as handle:
+                handle.write(b"abcd")
+            reopened = BlockCache(block_size=4)
+            reopened.attach_disk(state)
+            self.assertIsNone(reopened.get("s", "/f", 1, 10, 0))
+            self.assertEqual(reopened.get("s", "/f", 1, 10, 8), b"ij")
+            self.assertEqual(sorted(os.listdir(folder)), names[1:])
+
+
+class TransferTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.remote_dir = tempfile.TemporaryDirectory()
+        cls.server = LocalSFTPServer(cls.remote_dir.name).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.remote_dir.cleanup()
+
+    def setUp(self):
+        self.local_dir = tempfile.TemporaryDirectory()
+        self.client = SFTPClient(transfer_channels=3)
+        self.client.connect(self.server.host, self.server.port, "nova", "secret")
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.local_dir.cleanup()
+
+    def _remote_file(self, name, payload):
+        with open(os.path.join(self.remote_dir.name, name), "wb") as handle:
+            handle.write(payload)
+        return f"/{name}"
+
+    def test_parallel_download_matches_remote(self):
+        payload = os.urandom(300_000)
+        remote = self._remote_file("blob.bin", payload)
+        local = os.path.join(self.local_dir.name, "blob.bin")
+        progress = []
+
+        downloader = ParallelDownloader(self.client.open_channel, channels=3, segment_size=64 * 1024, block_size=8 * 1024)
+        size = downloader.download(remote, local, callback=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(size, len(payload))
+        with open(local, "rb") as handle:
+            self.assertEqual(handle.read(), payload)
+        self.assertEqual(progress[-1], (len(payload), len(payload)))
+
+    def test_parallel_upload_matches_local(self):
+        payload = os.urandom(250_000)
+        local = os.path.join(self.local_dir.name, "up.bin")
+        with open(local, "wb") as handle:
+            handle.write(payload)
+        progress = []
+
+        uploader = ParallelUploader(self.client.open_channel, channels=3, segment_size=64 * 1024, block_size=8 * 1024, max_inflight=128 * 1024)
+        attrs = uploader.upload(local, "/up.bin", callback=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual(attrs.st_size, len(payload))
+        with open(os.path.join(self.remote_dir.name, "up.bin"), "rb") as handle:
+            self.assertEqual(handle.read(), payload)
+        self.assertEqual(progress[-1], (len(payload), len(payload)))
+
+    def test_put_empty_file(self):
+        local = os.path.join(self.local_dir.name, "empty.txt")
+        open(local, "wb").close()
+        self.assertEqual(self.client.put(local, "/empty-up.txt").st_size, 0)
+
+    def test_download_resumes_from_checkpoint(self):
+        payload = os.urandom(200_000)
+        remote = self._remote_file("resume.bin", payload)
+        local = os.path.join(self.local_dir.name, "resume.bin")
+        journal = TransferJournal(Path(self.local_dir.name) / "journal")
+        checkpoint = journal.open("test", "Download", remote, local)
+
+        def interrupt(done, total):
+            if done >= 64 * 1024:
+                raise ConnectionError("link dropped")
+
+        downloader = ParallelDownloader(self.client.open_channel, channels=1, segment_size=32 * 1024, block_size=8 * 1024)
+        with self.assertRaises(ConnectionError):
+            downloader.download(remote, local, callback=interrupt, checkpoint=checkpoint)
+        self.assertEqual(len(journal.pending("test")), 1)
+
+        resumed = journal.open("test", "Download", remote, local)
+        already = resumed.completed
+        self.assertGreater(already, 0)
+        progress = []
+        downloader.download(remote, local, callback=lambda done, total: progress.append(done), checkpoint=resumed)
+        self.assertGreater(progress[0], already)
+        self.assertEqual(len(progress), (len(payload) - already) // (8 * 1024) + 1)
+        with open(local, "rb") as handle:
+            self.assertEqual(handle.read(), payload)
+        self.assertEqual(journal.pending("test"), [])
+
+    def test_upload_resumes_from_checkpoint(self):
+        payload = os.urandom(150_000)
+        local = os.path.join(self.local_dir.name, "resume-up.bin")
+        with open(local, "wb") as handle:
+            handle.write(payload)
+        journal = TransferJournal(Path(self.local_dir.name) / "journal")
+        calls = []
+
+        def interrupt(done, total):
+            calls.append(done)
+            if len(calls) == 6:
+                raise ConnectionError("link dropped")
+
+        uploader = ParallelUploader(self.client.open_channel, channels=1, segment_size=32 * 1024, block_size=8 * 1024)
+        with self.assertRaises(ConnectionError):
+            uploader.upload(local, "/resume-up.bin", callback=interrupt, checkpoint=journal.open("test", "Upload", "/resume-up.bin", local))
+        resumed = journal.open("test", "Upload", "/resume-up.bin", local)
+        self.assertEqual(resumed.completed, 32 * 1024)
+        uploader.upload(local, "/resume-up.bin", checkpoint=resumed)
+        with open(os.path.join(self.remote_dir.name, "resume-up.bin"), "rb") as handle:
+            self.assertEqual(handle.read(), payload)
+
+    def test_upload_restarts_when_the_remote_file_changed(self):
+        payload = os.urandom(150_000)
+        local = os.path.join(self.local_dir.name, "replaced-up.bin")
+        with open(local, "wb") as handle:
+            handle.write(payload)
+        journal = TransferJournal(Path(self.local_dir.name) / "journal")
+
+        def interrupt(done, total):
+            if done >= 64 * 1024:
+                raise ConnectionError("link dropped")
+
+        uploader = ParallelUploader(self.client.open_channel, channels=1, segment_size=32 * 1024, block_size=8 * 1024)
+        with self.assertRaises(ConnectionError):
+            uploader.upload(local, "/replaced-up.bin", callback=interrupt, checkpoint=journal.open("test", "Upload", "/replaced-up.bin", local))
+        # Rewritten to the same length by someone else between runs.
+        remote = os.path.join(self.remote_dir.name, "replaced-up.bin")
+        with open(remote, "r+b") as handle:
+            handle.write(b"\0" * 150_000)
+        os.utime(remote, (1_000_000, 1_000_000))
+        reports = []
+        uploader.upload(local, "/replaced-up.bin", callback=lambda done, total: reports.append(done), checkpoint=journal.open("test", "Upload", "/replaced-up.bin", local))
+        self.assertEqual(len(reports), 150_000 // (8 * 1024) + 1)
+        with open(remote, "rb") as handle:
+            self.assertEqual(handle.read(), payload)
+
+    def test_tree_round_trip(self):
+        source = os.path.join(self.local_dir.name, "run")
+        for rel, size in (("a.txt", 10), ("logs/b.log", 5000), ("logs/deep/c.bin", 400_000), ("empty/.keep", 0)):
+            path = os.path.join(source, *rel.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as handle:
+                handle.write(os.urandom(size))
+        reports = []
+
+        uploaded = self.client.put_tree(source, "/run", callback=lambda done, total, detail=None: reports.append(detail))
+        self.assertEqual(uploaded, 4)
+        self.assertEqual(reports[-1], "4/4 files")
+
+        target = os.path.join(self.local_dir.name, "copy")
+        downloaded = self.client.get_tree("/run", target, callback=lambda done, total, detail=None: None)
+        self.assertEqual(downloaded, 4)
+        for rel in ("a.txt", "logs/b.log", "logs/deep/c.bin", "empty/.keep"):
+            with open(os.path.join(source, *rel.split("/")), "rb") as expected, open(os.path.join(target, *rel.split("/")), "rb") as actual:
+                self.assertEqual(expected.read(), actual.read(), rel)
+
+    def test_walk_closed_early_leaves_the_channel_clean(self):
+        for index in range(30):
+            os.makedirs(os.path.join(self.remote_dir.name, "walk", f"d{index:02d}", "sub"))
+        with self.client.lease(PRIORITY_BULK) as channel:
+            walk = walk_tree(channel, "/walk", max_inflight=8)
+            path, entries, error = next(walk)
+            self.assertEqual((path, len(entries), error), ("/walk", 30, None))
+            walk.close()
+            # No request of the walk is still waiting for a reply.
+            self.assertEqual(channel._expecting, {})
+            self.assertEqual(len(channel.listdir("/walk/d00")), 1)
+
+    def test_get_tree_missing_root(self):
+        with self.assertRaises(IOError):
+            self.client.get_tree("/does-not-exist", os.path.join(self.local_dir.name, "x"))
+
+    def test_listing_cache_revalidates_on_mtime(self):
+        folder = os.path.join(self.remote_dir.name, "cached")
+        os.makedirs(folder)
+        os.utime(folder, (1_700_000_000, 1_700_000_000))
+        self.assertEqual(len(self.client.listdir("/cached")), 0)
+        rows, changed = self.client.revalidate("/cached")
+        self.assertFalse(changed)
+
+        self._remote_file("cached/new.txt", b"x")
+        rows, changed = self.client.revalidate("/cached")
+        self.assertTrue(changed)
+        self.assertEqual([r.name for r in rows], ["new.txt"])
+        self.assertIs(self.client.cached_listdir("/cached/"), rows)
+
+    def test_read_range_is_cached_until_the_file_changes(self):
+        remote = self._remote_file("page.txt", bytes(range(256)) * 1024)
+        os.utime(os.path.join(self.remote_dir.name, "page.txt"), (1_700_000_000, 1_700_000_000))
+        version = self.client.file_version(remote)
+        self.assertEqual(self.client.read_range(remote, 70_000, 100, version), (bytes(range(256)) * 1024)[70_000:70_100])
+        self.assertEqual(self.client.read_range(remote, 262_100, 500), (bytes(range(256)) * 1024)[262_100:])
+        self.assertEqual(self.client.read_range(remote, 300_000, 10), b"")
+        self.assertEqual(self.client.read_head(remote, 4, version), bytes(range(4)))
+
+        # Same mtime and size: served from the cache, not the server.
+        with open(os.path.join(self.remote_dir.name, "page.txt"), "r+b") as handle:
+            handle.write(b"\xff" * 16)
+        os.utime(os.path.join(self.remote_dir.name, "page.txt"), (1_700_000_000, 1_700_000_000))
+        self.assertEqual(self.client.read_head(remote, 4), bytes(range(4)))
+
+        os.utime(os.path.join(self.remote_dir.name, "page.txt"), (1_700_000_100, 1_700_000_100))
+        self.assertEqual(self.client.read_head(remote, 4), b"\xff" * 4)
+
+    def test_handles_are_reused_and_reopened_on_change(self):
+        remote = self._remote_file("rotating.log", b"a" * 1000)
+        version = self.client.file_version(remote)
+        self.client.blocks.block_size = 100
+        for offset in (0, 300, 600):
+            self.assertEqual(self.client.read_range(remote, offset, 100, version), b"a" * 100)
+        self.assertEqual(len(self.client.handles), 1)
+
+        # Rotated: a held handle would keep reading the old file.
+        replacement = os.path.join(self.remote_dir.name, "rotating.new")
+        Path(replacement).write_bytes(b"b" * 2000)
+        os.replace(replacement, os.path.join(self.remote_dir.name, "rotating.log"))
+        os.utime(os.path.join(self.remote_dir.name, "rotating.log"), (1_700_000_000, 1_700_000_000))
+        self.assertEqual(self.client.read_range(remote, 1500, 10), b"b" * 10)
+        self.assertEqual(len(self.client.handles), 1)
+
+        self.client.handles.idle_timeout = 0
+        self.client.handles.evict_idle()
+        self.assertEqual(len(self.client.handles), 0)
+
+    def test_prefetch_warms_the_block_cache(self):
+        payload = os.urandom(300_000)
+        remote = self._remote_file("pages.bin", payload)
+        version = self.client.file_version(remote)
+        self.client.prefetch_range(remote, 100_000, 150_000, version)
+        # Waits for the prefetch of the overlapping blocks instead of refetching.
+        self.assertEqual(self.client.read_range(remote, 120_000, 100_000, version), payload[120_000:220_000])
+        cached = self.client.blocks.bytes
+        self.client.prefetch_range(remote, 100_000, 150_000, version)
+        self.assertEqual(self.client.blocks.bytes, cached)
+        self.assertEqual(self.client._inflight, {})
+
+    def test_upload_invalidates_target_folder_only(self):
+        os.makedirs(os.path.join(self.remote_dir.name, "up"))
+        self.client.listdir("/")
+        self.client.listdir("/up")
+        local = os.path.join(self.local_dir.name, "file.txt")
+        Path(local).write_bytes(b"payload")
+        self.client.put(local, "/up/file.txt")
+        self.assertIsNone(self.client.cached_listdir("/up"))
+        self.assertIsNotNone(self.client.cached_listdir("/"))
+
+    def test_browse_lists_in_one_batch(self):
+        folder = os.path.join(self.remote_dir.name, "many", "sub")
+        os.makedirs(folder)
+        for i in range(250):
+            Path(folder, f"f{i:03d}").write_bytes(b"")
+        path, rows = self.client.browse("/many/./sub/../sub")
+        self.assertEqual(path, "/many/sub")
+        self.assertEqual([r.name for r in rows], [f"f{i:03d}" for i in range(250)])
+        self.assertEqual(rows[0].full_path, "/many/sub/f000")
+        # The unawaited close reply must not confuse the next request on the channel.
+        self.assertEqual(len(self.client.listdir("/many")), 1)
+        self.assertEqual(self.client.read_head("/many/sub/f000", 10), b"")
+
+    def test_iter_listdir_streams_batches(self):
+        folder = os.path.join(self.remote_dir.name, "spool")
+        os.makedirs(folder)
+        for i in range(100):
+            Path(folder, f"m{i:03d}").write_bytes(b"")
+        batches = list(self.client.iter_listdir("/spool"))
+        self.assertEqual((batches[0][0], len(batches[0][1])), ("/spool", 0))
+        self.assertGreater(len(batches), 2)
+        self.assertEqual(sorted(r.name for _path, rows in batches for r in rows), [f"m{i:03d}" for i in range(100)])
+        self.assertEqual(len(self.client.cached_listdir("/spool")), 100)
+
+    def test_iter_listdir_cancel(self):
+        folder = os.path.join(self.remote_dir.name, "spool2")
+        os.makedirs(folder)
+        for i in range(200):
+            Path(folder, f"m{i:03d}").write_bytes(b"")
+        stream = self.client.iter_listdir("/spool2")
+        next(stream)
+        next(stream)
+        stream.close()
+        self.assertIsNone(self.client.cached_listdir("/spool2"))
+        self.assertEqual(len(self.client.listdir("/spool2")), 200)
+
+    def test_browse_errors(self):
+        self._remote_file("plain.txt", b"x")
+        with self.assertRaises(NotADirectoryError):
+            self.client.browse("/plain.txt")
+        with self.assertRaises(IOError):
+            self.client.browse("/missing")
+
+    def test_get_empty_file(self):
+        remote = self._remote_file("empty.txt", b"")
+        local = os.path.join(self.local_dir.name, "empty.txt")
+        self.assertEqual(self.client.get(remote, local), 0)
+        self.assertEqual(os.path.getsize(local), 0)
+
+
+class ChannelPoolTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.remote_dir = tempfile.TemporaryDirectory()
+        cls.server = LocalSFTPServer(cls.remote_dir.name).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        cls.remote_dir.cleanup()
+
+    def setUp(self):
+        self.client = SFTPClient(pool_size=3)
+        self.client.connect(self.server.host, self.server.port, "nova", "secret")
+        self.pool = self.client.pool
+
+    def tearDown(self):
+        self.client.disconnect()
+
+    def test_bulk_leaves_interactive_reserve(self):
+        bulk = [self.pool.checkout(PRIORITY_BULK, block=False) for _ in range(3)]
+        self.assertIsNotNone(bulk[0])
+        self.assertIsNone(bulk[1])
+        self.assertIsNone(bulk[2])
+        with self.pool.lease(PRIORITY_INTERACTIVE) as channel:
+            self.assertEqual(channel.normalize("/"), "/")
+        self.pool.checkin(bulk[0])
+
+    def test_open_channel_without_blocking_declines_when_full(self):
+        leased = [self.pool.checkout(block=False) for _ in range(3)]
+        self.assertIsNone(self.pool.open_channel(block=False))
+        channel = self.client.open_channel()
+        self.assertEqual(channel.normalize("/"), "/")
+        channel.close()
+        self.pool.checkin(leased.pop())
+        channel = self.client.open_channel(block=False)
+        self.assertIsNotNone(channel)
+        channel.close()
+        for held in leased:
+            self.pool.checkin(held)
+
+    def test_channels_are_reused(self):
+        with self.pool.lease() as first:
+            pass
+        with self.pool.lease() as second:
+            self.assertIs(first, second)
+
+    def test_reconnects_after_transport_drop(self):
+        self.client.ssh.get_transport().close()
+        self.assertEqual(self.client.normalize("/"), "/")
+        self.assertTrue(self.pool.alive)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from sftp_client import SFTPClient
+from sync import ACTION_COPY, ACTION_PATCH, ACTION_SKIP, SYNC_BLOCK_SIZE, SyncDownloader, changed_ranges, local_block_hashes
+from tests.sftp_server import LocalSFTPServer
+
+
+class ChangedRangesTests(unittest.TestCase):
+    def test_coalesces_adjacent_blocks(self):
+        self.assertEqual(changed_ranges(["a", "b", "c", "d"], ["a", "x", "y", "d", "e"], 4 * 10 + 3, 10), [(10, 20), (40, 3)])
+
+
+class SyncTests(unittest.TestCase):
+    def setUp(self):
+        self.remote_dir = tempfile.TemporaryDirectory()
+        self.local_dir = tempfile.TemporaryDirectory()
+        self.server = LocalSFTPServer(self.remote_dir.name).start()
+        self.client = SFTPClient(transfer_channels=2)
+        self.client.connect(self.server.host, self.server.port, "nova", "secret")
+        self.target = os.path.join(self.local_dir.name, "mirror")
+        self.files = {"a.txt": os.urandom(100), "logs/b.log": os.urandom(5000), "big.bin": os.urandom(20 * SYNC_BLOCK_SIZE + 7)}
+        for rel, payload in self.files.items():
+            self._write_remote(rel, payload)
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.server.stop()
+        self.remote_dir.cleanup()
+        self.local_dir.cleanup()
+
+    def _write_remote(self, rel, payload):
+        path = os.path.join(self.remote_dir.name, "data", *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as handle:
+            handle.write(payload)
+        os.utime(path, (1_700_000_000, 1_700_000_000))
+
+    def _hasher(self, path, block_size):
+        # Stands in for the exec-based hash a real server would run.
+        return local_block_hashes(os.path.join(self.remote_dir.name, path.lstrip("/")), block_size)
+
+    def _assert_mirrored(self):
+        for rel, payload in self.files.items():
+            with open(os.path.join(self.target, *rel.split("/")), "rb") as handle:
+                self.assertEqual(handle.read(), payload, rel)
+
+    def test_resync_skips_unchanged_files(self):
+        first = SyncDownloader(self.client, hasher=self._hasher)
+        self.assertEqual(first.sync("/data", self.target), sum(map(len, self.files.values())))
+        self._assert_mirrored()
+
+        plan = SyncDownloader(self.client, hasher=self._hasher).plan("/data", self.target)
+        self.assertEqual({action.action for action in plan.actions}, {ACTION_SKIP})
+        self.assertEqual(SyncDownloader(self.client).execute(plan), 0)
+
+    def test_changed_large_file_fetches_only_differing_blocks(self):
+        SyncDownloader(self.client, hasher=self._hasher).sync("/data", self.target)
+        big = bytearray(self.files["big.bin"])
+        big[3 * SYNC_BLOCK_SIZE + 5] ^= 0xFF
+        self.files["big.bin"] = bytes(big)
+        self.files["c.txt"] = b"new"
+        self._write_remote("big.bin", self.files["big.bin"])
+        self._write_remote("c.txt", self.files["c.txt"])
+        os.utime(os.path.join(self.remote_dir.name, "data", "big.bin"), (1_700_000_100, 1_700_000_100))
+
+        engine = SyncDownloader(self.client, hasher=self._hasher)
+        plan = engine.plan("/data", self.target)
+        by_name = {os.path.basename(action.local_path): action.action for action in plan.actions}
+        self.assertEqual(by_name, {"a.txt": ACTION_SKIP, "b.log": ACTION_SKIP, "big.bin": ACTION_PATCH, "c.txt": ACTION_COPY})
+        self.assertEqual(engine.execute(plan), SYNC_BLOCK_SIZE + 3)
+        self._assert_mirrored()
+
+    def test_patch_without_remote_hashing_copies_whole_file(self):
+        SyncDownloader(self.client, hasher=self._hasher).sync("/data", self.target)
+        self.files["big.bin"] = self.files["big.bin"][:-100] + os.urandom(100)
+        self._write_remote("big.bin", self.files["big.bin"])
+        os.utime(os.path.join(self.remote_dir.name, "data", "big.bin"), (1_700_000_100, 1_700_000_100))
+
+        engine = SyncDownloader(self.client, hasher=lambda path, size: None)
+        self.assertEqual(engine.sync("/data", self.target), len(self.files["big.bin"]))
+        self._assert_mirrored()
+
+
+if __name__ == "__main__":
+    unittest.main()
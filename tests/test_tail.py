@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from sftp_client import SFTPClient
+from tail import LogTail
+from tests.sftp_server import LocalSFTPServer
+
+
+class LogTailTests(unittest.TestCase):
+    def setUp(self):
+        self.remote_dir = tempfile.TemporaryDirectory()
+        self.server = LocalSFTPServer(self.remote_dir.name).start()
+        self.client = SFTPClient()
+        self.client.connect(self.server.host, self.server.port, "nova", "secret")
+        self.local_path = os.path.join(self.remote_dir.name, "app.log")
+
+    def tearDown(self):
+        self.client.disconnect()
+        self.server.stop()
+        self.remote_dir.cleanup()
+
+    def _append(self, payload, mode="ab"):
+        with open(self.local_path, mode) as handle:
+            handle.write(payload)
+
+    def test_follows_appends(self):
+        self._append(b"".join(b"line %04d\n" % i for i in range(1000)), "wb")
+        tail = LogTail(self.client, "/app.log", tail_bytes=95, poll_min=0.5, poll_max=2.0)
+        self.assertEqual(tail.start(), "line 0991\n" + "".join(f"line {i:04d}\n" for i in range(992, 1000)))
+
+        self.assertEqual(tail.poll(), ("", False))
+        self.assertEqual(tail.poll(), ("", False))
+        self.assertEqual(tail.interval, 2.0)
+
+        # A multi-byte character split across two appends decodes whole.
+        euro = "€".encode("utf-8")
+        self._append(b"price " + euro[:1])
+        self.assertEqual(tail.poll(), ("price ", False))
+        self.assertEqual(tail.interval, 0.5)
+        self._append(euro[1:] + b"\n")
+        self.assertEqual(tail.poll(), ("€\n", False))
+
+    def test_truncation_restarts_from_the_tail(self):
+        self._append(b"old\n" * 100, "wb")
+        tail = LogTail(self.client, "/app.log")
+        tail.start()
+        self._append(b"rotated\n", "wb")
+        self.assertEqual(tail.poll(), ("rotated\n", True))
+        self._append(b"next\n")
+        self.assertEqual(tail.poll(), ("next\n", False))
+
+    def test_large_gap_skips_ahead(self):
+        self._append(b"start\n", "wb")
+        tail = LogTail(self.client, "/app.log", tail_bytes=16, max_read=64)
+        tail.start()
+        self._append(b"x" * 100 + b"\nend of burst\n")
+        self.assertEqual(tail.poll(), ("end of burst\n", True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+
+from PIL import Image
+
+from sftp_client import SFTPClient
+from tests.sftp_server import LocalSFTPServer
+from thumbnails import THUMB_HEAD_BYTES, ThumbnailCache, Thumbnailer, make_thumbnail
+
+
+def _jpeg(size, exif_thumb=None):
+    exif = b""
+    if exif_thumb is not None:
+        # A bare EXIF block: an empty IFD0 chained to an IFD1 that holds only
+        # the thumbnail's offset and length.
+        buffer = io.BytesIO()
+        Image.new("RGB", exif_thumb, (0, 200, 0)).save(buffer, "JPEG")
+        thumb = buffer.getvalue()
+        data_at = 14 + 2 + 2 * 12 + 4
+        exif = b"Exif\0\0II*\0" + struct.pack("<IHIH", 8, 0, 14, 2) + struct.pack("<HHII", 0x201, 4, 1, data_at) + struct.pack("<HHII", 0x202, 4, 1, len(thumb)) + struct.pack("<I", 0) + thumb
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 40).convert("RGB").save(buffer, "JPEG", quality=90, exif=exif)
+    return buffer.getvalue()
+
+
+class _Reads:
+    def __init__(self, files):
+        self.files = files
+        self.calls = []
+
+    def __call__(self, path, offset, size):
+        self.calls.append((path, offset, size))
+        return self.files[path][offset : offset + size]
+
+
+class MakeThumbnailTests(unittest.TestCase):
+    def test_exif_thumbnail_needs_only_the_head(self):
+        data = _jpeg((3000, 2000), exif_thumb=(160, 120))
+        reads = _Reads({"/a.jpg": data})
+        image = make_thumbnail(lambda offset, size: reads("/a.jpg", offset, size), len(data))
+        self.assertEqual(image.size, (128, 96))
+        self.assertGreater(image.getpixel((10, 10))[1], 150)
+        self.assertEqual(reads.calls, [("/a.jpg", 0, THUMB_HEAD_BYTES)])
+
+    def test_full_decode_without_exif_thumbnail(self):
+        data = _jpeg((1600, 1200))
+        image = make_thumbnail(lambda offset, size: data[offset : offset + size], len(data))
+        self.assertEqual(image.size, (128, 96))
+
+    def test_undecodable_and_oversized_files(self):
+        data = b"not an image" * 10
+        self.assertIsNone(make_thumbnail(lambda offset, size: data[offset : offset + size], len(data)))
+        reads = []
+        big = _jpeg((400, 300))
+        self.assertIsNone(make_thumbnail(lambda offset, size: reads.append(size) or big[offset : offset + size], len(big), max_bytes=len(big) - 1))
+        self.assertEqual(reads, [min(len(big), THUMB_HEAD_BYTES)])
+
+
+class ThumbnailCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_revisit_costs_no_reads(self):
+        files = {f"/photos/{index}.jpg": _jpeg((640, 480)) for index in range(3)}
+        files["/photos/notes.jpg"] = b"plain text"
+        reads = _Reads(files)
+        thumbs = Thumbnailer(reads, ThumbnailCache(self.folder.name))
+        first = [thumbs.load("nova@host:22", path, len(data), 100) for path, data in files.items()]
+        self.assertEqual([image is None for image in first], [False, False, False, True])
+        count = len(reads.calls)
+
+        # A new session of the app: the index is rebuilt from disk.
+        thumbs = Thumbnailer(reads, ThumbnailCache(self.folder.name))
+        again = [thumbs.load("nova@host:22", path, len(data), 100) for path, data in files.items()]
+        self.assertEqual(len(reads.calls), count)
+        self.assertEqual([None if image is None else image.size for image in again], [(128, 96)] * 3 + [None])
+
+        # A changed file (new mtime) or another host is a miss.
+        thumbs.load("nova@host:22", "/photos/0.jpg", len(files["/photos/0.jpg"]), 101)
+        thumbs.load("nova@other:22", "/photos/1.jpg", len(files["/photos/1.jpg"]), 100)
+        self.assertGreater(len(reads.calls), count)
+
+    def test_evicts_least_recently_used_past_budget(self):
+        cache = ThumbnailCache(self.folder.name, max_bytes=3 * 8192)
+        for name in "abc":
+            cache.put("s", name, 1, 1, b"x" * 8000)
+        self.assertIsNotNone(cache.get("s", "a", 1, 1))
+        cache.put("s", "d", 1, 1, b"x" * 8000)
+        self.assertIsNone(cache.get("s", "b", 1, 1))
+        self.assertEqual(cache.get("s", "a", 1, 1), b"x" * 8000)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(sum(len(names) for _root, _dirs, names in os.walk(self.folder.name)), 3)
+        self.assertLessEqual(cache.used, cache.max_bytes)
+
+    def test_unfinished_writes_are_ignored(self):
+        cache = ThumbnailCache(self.folder.name)
+        cache.put("s", "a", 1, 1, b"jpeg bytes")
+        written = [os.path.join(root, name) for root, _dirs, names in os.walk(self.folder.name) for name in names]
+        self.assertEqual(len(written), 1)
+        # A write interrupted by a crash leaves only its temp file.
+        with open(written[0] + ".1234.tmp", "wb") as handle:
+            handle.write(b"jp")
+        reopened = ThumbnailCache(self.folder.name)
+        self.assertEqual(len(reopened), 1)
+        self.assertEqual(reopened.get("s", "a", 1, 1), b"jpeg bytes")
+        self.assertFalse(os.path.exists(written[0] + ".1234.tmp"))
+
+
+class RemoteThumbnailTests(unittest.TestCase):
+    def test_streams_from_the_server(self):
+        with tempfile.TemporaryDirectory() as remote, tempfile.TemporaryDirectory() as local:
+            data = _jpeg((900, 600))
+            with open(os.path.join(remote, "shot.jpg"), "wb") as handle:
+                handle.write(data)
+            with LocalSFTPServer(remote) as server:
+                client = SFTPClient()
+                client.connect(server.host, server.port, "nova", "secret")
+                try:
+                    thumbs = Thumbnailer(
+                        lambda path, offset, size: b"".join(client.stream_file(path, size, offset, offset + size)),
+                        ThumbnailCache(local),
+                    )
+                    self.assertEqual(thumbs.load(client.session, "/shot.jpg", len(data), 1).size, (128, 85))
+                finally:
+                    client.disconnect()
+
+
+if __name__ == "__main__":
+    unittest.main()
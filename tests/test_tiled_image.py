@@ -0,0 +1,146 @@
+import io
+import struct
+import threading
+import unittest
+
+from PIL import Image, ImageChops, TiffImagePlugin
+
+from tiled_image import TILE_SIZE, RawRows, TiffTiles, TileLoader, open_tiled
+
+
+def _encode(image, image_format, **kwargs):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **kwargs)
+    return buffer.getvalue()
+
+
+def _tiled_tiff(image, tile=128):
+    # Pillow cannot write tiled TIFFs: an uncompressed RGB one by hand, with
+    # edge tiles padded as the format requires.
+    width, height = image.size
+    payloads = []
+    for top in range(0, height, tile):
+        for left in range(0, width, tile):
+            block = Image.new("RGB", (tile, tile))
+            block.paste(image.crop((left, top, min(width, left + tile), min(height, top + tile))))
+            payloads.append(block.tobytes())
+    ifd = TiffImagePlugin.ImageFileDirectory_v2(prefix=b"II")
+    for tag, value, kind in ((256, width, 4), (257, height, 4), (258, (8, 8, 8), 3), (259, 1, 3), (262, 2, 3), (277, 3, 3), (322, tile, 4), (323, tile, 4)):
+        ifd[tag] = value
+        ifd.tagtype[tag] = kind
+    ifd[325] = tuple(map(len, payloads))
+    ifd[324] = (0,) * len(payloads)
+    ifd.tagtype[324] = ifd.tagtype[325] = 4
+    base = 8 + len(ifd.tobytes(8))
+    ifd[324] = tuple(base + sum(ifd[325][:index]) for index in range(len(payloads)))
+    return b"II" + struct.pack("<HI", 42, 8) + ifd.tobytes(8) + b"".join(payloads)
+
+
+class _Source:
+    def __init__(self, data):
+        self.data = data
+        self.bytes_read = 0
+
+    def read(self, offset, size):
+        self.bytes_read += size
+        return self.data[offset : offset + size]
+
+
+def _assemble(tiled, level):
+    canvas = None
+    width, height = tiled.level_size(level)
+    for tx, ty in tiled.tiles_in(level, 0, 0, width, height):
+        tile = tiled.render(level, tx, ty)
+        if canvas is None:
+            canvas = Image.new(tile.mode, (width, height))
+        canvas.paste(tile, (tx * TILE_SIZE, ty * TILE_SIZE))
+    return canvas
+
+
+class TiledImageTests(unittest.TestCase):
+    def setUp(self):
+        self.image = Image.effect_noise((1300, 900), 60).convert("RGB")
+
+    def assertSameImage(self, first, second):
+        self.assertEqual(first.size, second.size)
+        self.assertIsNone(ImageChops.difference(first, second).getbbox())
+
+    def test_compressed_tiff_strips_decode_piecewise(self):
+        for compression in ("tiff_lzw", "tiff_adobe_deflate", "packbits"):
+            source = _Source(_encode(self.image, "TIFF", compression=compression))
+            tiled = open_tiled(source.read, len(source.data))
+            self.assertIsInstance(tiled, TiffTiles)
+            source.bytes_read = 0
+            tile = tiled.render(0, 1, 1)
+            self.assertSameImage(tile, self.image.crop((256, 256, 512, 512)))
+            # Only the strips under one tile are fetched and decoded.
+            self.assertLess(source.bytes_read, len(source.data) / 2)
+            self.assertLess(tiled.decoded, len(tiled.offsets) / 2)
+            self.assertSameImage(_assemble(tiled, 0), self.image)
+
+    def test_tiled_tiff_and_reduced_levels(self):
+        source = _Source(_tiled_tiff(self.image))
+        tiled = open_tiled(source.read, len(source.data))
+        self.assertEqual((tiled.block_w, tiled.block_h), (128, 128))
+        self.assertSameImage(_assemble(tiled, 0), self.image)
+        self.assertEqual(tiled.max_level, 3)
+        self.assertEqual(_assemble(tiled, 2).size, (325, 225))
+        self.assertSameImage(_assemble(tiled, 1), self.image.reduce(2))
+
+    def test_raw_formats_read_row_bands(self):
+        for image_format in ("BMP", "PPM", "TIFF"):
+            source = _Source(_encode(self.image, image_format))
+            tiled = open_tiled(source.read, len(source.data))
+            self.assertIsInstance(tiled, RawRows)
+            self.assertSameImage(_assemble(tiled, 0), self.image)
+
+    def test_sequential_formats_are_not_tiled(self):
+        data = _encode(self.image, "PNG")
+        self.assertIsNone(open_tiled(lambda offset, size: data[offset : offset + size], len(data)))
+
+    def test_tile_ordering_and_levels(self):
+        data = _encode(self.image, "BMP")
+        tiled = open_tiled(lambda offset, size: data[offset : offset + size], len(data))
+        self.assertEqual(tiled.fit_level(800, 600), 1)
+        self.assertEqual(tiled.fit_level(2000, 2000), 0)
+        self.assertEqual(tiled.tiles_in(0, 300, 300, 500, 500), [(1, 1)])
+        ring = tiled.tiles_in(0, 300, 300, 500, 500, ring=1)
+        self.assertEqual(ring[0], (1, 1))
+        self.assertEqual(len(ring), 9)
+
+    def test_caches_are_bounded(self):
+        data = _encode(self.image, "TIFF", compression="tiff_lzw")
+        tiled = open_tiled(lambda offset, size: data[offset : offset + size], len(data), tile_bytes=4 * TILE_SIZE * TILE_SIZE * 3, block_bytes=1)
+        _assemble(tiled, 0)
+        self.assertLessEqual(tiled.tiles.used, tiled.tiles.max_bytes)
+        self.assertLess(len(tiled.tiles), 24)
+        self.assertEqual(len(tiled.blocks), 1)
+
+    def test_loader_renders_latest_request(self):
+        started, release, finished = threading.Event(), threading.Event(), threading.Event()
+        rendered = []
+
+        def render(key):
+            if key == "slow":
+                started.set()
+                release.wait(5)
+            return key
+
+        def done(key, image):
+            rendered.append(image)
+            if key == "last":
+                finished.set()
+
+        loader = TileLoader(render, done, workers=1)
+        loader.request(["slow"])
+        started.wait(5)
+        loader.request(["skipped"])
+        loader.request(["last"])
+        release.set()
+        finished.wait(5)
+        loader.close()
+        self.assertEqual(rendered, ["slow", "last"])
+
+
+if __name__ == "__main__":
+    unittest.main()
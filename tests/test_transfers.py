@@ -0,0 +1,222 @@
+import threading
+import time
+import unittest
+
+from transfers import (
+    STATUS_CANCELLED,
+    STATUS_DONE,
+    STATUS_ERROR,
+    STATUS_INTERRUPTED,
+    STATUS_PAUSED,
+    STATUS_QUEUED,
+    STATUS_RUNNING,
+    ProgressStore,
+    RateWindow,
+    TokenBucket,
+    TransferScheduler,
+    format_eta,
+)
+
+
+def _chunked(total, chunk=10, delay=0.0, log=None, name=None):
+    def run(callback):
+        if log is not None:
+            log.append(name)
+        done = 0
+        while done < total:
+            done = min(total, done + chunk)
+            if delay:
+                time.sleep(delay)
+            callback(done, total)
+
+    return run
+
+
+class TransferSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = None
+
+    def tearDown(self):
+        if self.scheduler:
+            self.scheduler.shutdown()
+
+    def test_runs_jobs_in_priority_order(self):
+        gate = threading.Event()
+        log = []
+        self.scheduler = TransferScheduler(workers=1)
+        self.scheduler.submit("Download", "blocker", lambda cb: gate.wait(5))
+        time.sleep(0.05)
+        self.scheduler.submit("Download", "low", _chunked(10, log=log, name="low"), priority=5)
+        self.scheduler.submit("Download", "high", _chunked(10, log=log, name="high"), priority=1)
+        late = self.scheduler.submit("Download", "late", _chunked(10, log=log, name="late"), priority=5)
+        self.scheduler.move_to_front(late.job_id)
+        gate.set()
+        self.assertTrue(self.scheduler.wait(5))
+        self.assertEqual(log, ["late", "high", "low"])
+
+    def test_direction_limit_caps_concurrency(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def run(callback):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+
+        self.scheduler = TransferScheduler(workers=4, direction_limits={"Upload": 1})
+        for idx in range(5):
+            self.scheduler.submit("Upload", f"f{idx}", run)
+        self.assertTrue(self.scheduler.wait(5))
+        self.assertEqual(max(peak), 1)
+
+    def test_pause_resume_and_cancel(self):
+        self.scheduler = TransferScheduler(workers=1)
+        job = self.scheduler.submit("Download", "slow", _chunked(1000, delay=0.005))
+        waiting = self.scheduler.submit("Download", "waiting", _chunked(10))
+        time.sleep(0.03)
+        self.scheduler.pause(job.job_id)
+        self.assertEqual(job.status, STATUS_PAUSED)
+        snapshot = job.transferred
+        # The paused job gives up the only worker, so the queued one runs.
+        deadline = time.monotonic() + 5
+        while waiting.status != STATUS_DONE and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(waiting.status, STATUS_DONE)
+        self.assertEqual(job.status, STATUS_PAUSED)
+        self.assertLessEqual(job.transferred - snapshot, 10)
+        self.scheduler.resume(job.job_id)
+        self.assertTrue(self.scheduler.wait(5))
+        self.assertEqual(job.status, STATUS_DONE)
+        self.assertEqual(job.transferred, 1000)
+
+        running = self.scheduler.submit("Download", "cancel-me", _chunked(1000, delay=0.005))
+        queued = self.scheduler.submit("Download", "never", _chunked(10))
+        time.sleep(0.02)
+        self.scheduler.cancel(queued.job_id)
+        self.scheduler.cancel(running.job_id)
+        self.assertTrue(self.scheduler.wait(5))
+        self.assertEqual(running.status, STATUS_CANCELLED)
+        self.assertEqual(queued.status, STATUS_CANCELLED)
+
+    def test_errors_are_reported_and_retryable(self):
+        attempts = []
+
+        def flaky(callback):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise IOError("link dropped")
+            callback(5, 5)
+
+        self.scheduler = TransferScheduler(workers=1)
+        job = self.scheduler.submit("Download", "flaky", flaky)
+        self.scheduler.wait(5)
+        self.assertEqual(job.status, STATUS_ERROR)
+        self.assertEqual(job.error, "link dropped")
+        self.scheduler.retry(job.job_id)
+        self.scheduler.wait(5)
+        self.assertEqual(job.status, STATUS_DONE)
+
+    def test_interrupt_keeps_jobs_resumable(self):
+        self.scheduler = TransferScheduler(workers=1)
+        running = self.scheduler.submit("Download", "running", _chunked(1000, delay=0.005))
+        queued = self.scheduler.submit("Download", "queued", _chunked(10))
+        restored = self.scheduler.submit("Download", "restored", _chunked(10), status=STATUS_INTERRUPTED)
+        time.sleep(0.02)
+        self.scheduler.interrupt_all()
+        self.assertTrue(self.scheduler.wait(5))
+        self.assertEqual([running.status, queued.status, restored.status], [STATUS_INTERRUPTED] * 3)
+        self.scheduler.retry(running.job_id)
+        self.assertTrue(self.scheduler.wait(5))
+        self.assertEqual(running.status, STATUS_DONE)
+
+    def test_shutdown_without_cancel_interrupts(self):
+        updates = []
+        self.scheduler = TransferScheduler(workers=1, on_update=lambda job: updates.append(job.status))
+        job = self.scheduler.submit("Download", "slow", _chunked(1000, delay=0.005))
+        time.sleep(0.02)
+        self.scheduler.shutdown(cancel=False)
+        self.scheduler = None
+        self.assertEqual(job.status, STATUS_INTERRUPTED)
+        self.assertNotIn(STATUS_CANCELLED, updates)
+
+    def test_paused_queued_job_is_skipped(self):
+        gate = threading.Event()
+        self.scheduler = TransferScheduler(workers=1)
+        self.scheduler.submit("Download", "blocker", lambda cb: gate.wait(5))
+        held = self.scheduler.submit("Download", "held", _chunked(10))
+        other = self.scheduler.submit("Download", "other", _chunked(10))
+        self.scheduler.pause(held.job_id)
+        gate.set()
+        time.sleep(0.1)
+        self.assertEqual(other.status, STATUS_DONE)
+        self.assertEqual(held.status, STATUS_PAUSED)
+        self.scheduler.resume(held.job_id)
+        self.assertTrue(self.scheduler.wait(5))
+
+
+class ProgressTests(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = None
+
+    def tearDown(self):
+        if self.scheduler:
+            self.scheduler.shutdown()
+
+    def test_progress_is_published_not_notified(self):
+        updates = []
+        seen = []
+        gate = threading.Event()
+
+        def run(callback):
+            for done in range(1, 1001):
+                callback(done * 10, 10_000, "1 of 1 files")
+            seen.append(self.scheduler.progress.poll())
+            gate.wait(5)
+
+        self.scheduler = TransferScheduler(workers=1, on_update=lambda job: updates.append(job.status))
+        job = self.scheduler.submit("Download", "big", run)
+        gate.set()
+        self.assertTrue(self.scheduler.wait(5))
+        # Queued, running and done; none of the 1000 blocks.
+        self.assertEqual(updates, [STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE])
+        self.assertEqual(seen[0][job.job_id][:3], (10_000, 10_000, "1 of 1 files"))
+        self.assertEqual(self.scheduler.progress.poll(), {})
+
+    def test_rate_and_eta_over_a_sliding_window(self):
+        progress = ProgressStore(window=2.0)
+        for second in range(5):
+            # 1 MB/s for two seconds, then 4 MB/s.
+            progress.publish("t1", [0, 1, 2, 6, 10][second] * 2**20, 20 * 2**20)
+            transferred, total, _detail, rate, eta = progress.poll(now=100.0 + second)["t1"]
+        self.assertEqual(rate, 4 * 2**20)
+        self.assertEqual(eta, 2.5)
+        progress.discard("t1")
+        self.assertEqual(progress.poll(now=106.0), {})
+
+        window = RateWindow()
+        window.add(0.0, 500)
+        self.assertIsNone(window.eta(100))
+        window.add(1.0, 100)
+        self.assertEqual(window.rate(), 0.0)
+
+    def test_format_eta(self):
+        self.assertEqual(format_eta(None), "")
+        self.assertEqual(format_eta(65.4), "1:05")
+        self.assertEqual(format_eta(3 * 3600 + 7), "3:00:07")
+
+
+class TokenBucketTests(unittest.TestCase):
+    def test_limits_rate(self):
+        bucket = TokenBucket(rate=100_000, burst=10_000)
+        started = time.monotonic()
+        for _ in range(5):
+            bucket.consume(10_000)
+        self.assertGreaterEqual(time.monotonic() - started, 0.35)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import ast
+import collections
+import os
+import unittest
+
+UI_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ui.py")
+
+
+def _methods():
+    # ui.py needs customtkinter and a display, so it is read as source.
+    with open(UI_PATH, encoding="utf-8") as handle:
+        tree = ast.parse(handle.read())
+    return {node.name: node for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)}
+
+
+def _self_attrs(node, context):
+    return {
+        child.attr
+        for child in ast.walk(node)
+        if isinstance(child, ast.Attribute) and isinstance(child.ctx, context) and isinstance(child.value, ast.Name) and child.value.id == "self"
+    }
+
+
+class WidgetAttributeTests(unittest.TestCase):
+    def test_widgets_are_assigned_once(self):
+        created = collections.Counter()
+        for node in _methods().values():
+            for child in ast.walk(node):
+                if isinstance(child, ast.Assign) and isinstance(child.value, ast.Call) and isinstance(child.value.func, ast.Attribute) and child.value.func.attr.startswith("CTk"):
+                    created.update(target.attr for target in child.targets if isinstance(target, ast.Attribute))
+        self.assertEqual([name for name, count in created.items() if count > 1], [])
+
+    def test_filter_and_content_search_read_different_entries(self):
+        methods = _methods()
+        filter_reads = _self_attrs(methods["_apply_filter"], ast.Load)
+        search_reads = _self_attrs(methods["_toggle_search"], ast.Load)
+        self.assertIn("search_entry", filter_reads)
+        self.assertNotIn("content_search_entry", filter_reads)
+        self.assertIn("content_search_entry", search_reads)
+        self.assertNotIn("search_entry", search_reads)
+
+
+if __name__ == "__main__":
+    unittest.main()
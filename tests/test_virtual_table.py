@@ -0,0 +1,44 @@
+import unittest
+
+from virtual_table import TableViewport
+
+
+def _viewport(count, visible=10):
+    viewport = TableViewport(key=lambda row: row, overscan=2)
+    viewport.set_visible(visible)
+    viewport.set_rows([f"/d/f{i:06d}" for i in range(count)])
+    return viewport
+
+
+class TableViewportTests(unittest.TestCase):
+    def test_window_is_viewport_plus_overscan(self):
+        viewport = _viewport(100_000)
+        self.assertEqual(viewport.window(), range(0, 12))
+        viewport.moveto(0.5)
+        self.assertEqual(viewport.window(), range(50_000, 50_012))
+        viewport.scroll_by(10**9)
+        self.assertEqual(viewport.window(), range(99_990, 100_000))
+        self.assertEqual(viewport.fractions(), (0.9999, 1.0))
+
+    def test_selection_follows_path_across_filtering(self):
+        viewport = _viewport(1000)
+        viewport.select_index(500)
+        self.assertEqual(viewport.top, 491)
+        viewport.set_rows([row for row in viewport.rows if row.endswith("0")])
+        self.assertEqual(viewport.selected_row(), "/d/f000500")
+        self.assertEqual(viewport.selected_index(), 50)
+        viewport.set_rows([row for row in viewport.rows if row.endswith("00")])
+        self.assertEqual(viewport.selected_index(), 5)
+        viewport.set_rows(["/d/other"])
+        self.assertIsNone(viewport.selected_row())
+
+    def test_select_index_reports_changes(self):
+        viewport = _viewport(5)
+        self.assertTrue(viewport.select_index(2))
+        self.assertFalse(viewport.select_index(2))
+        self.assertTrue(viewport.select_index(99))
+        self.assertEqual(viewport.selected_row(), "/d/f000004")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+import collections
+import hashlib
+import io
+import os
+import threading
+
+from PIL import ExifTags, Image
+
+from image_pipeline import decode_image
+
+THUMB_SIZE = 128
+THUMB_WORKERS = 3
+THUMB_HEAD_BYTES = 64 * 1024
+THUMB_MAX_BYTES = 32 * 1024 * 1024
+THUMB_DISK_BYTES = 128 * 1024 * 1024
+THUMB_DIR_NAME = "thumbnails"
+THUMB_MIN_FILE_BYTES = 4096
+
+
+def exif_thumbnail(head: bytes, box: int = THUMB_SIZE) -> Image.Image | None:
+    # The preview most cameras embed in a JPEG's EXIF block (IFD1), which
+    # sits in the first few KB, if it is at least `box` on its long side.
+    try:
+        image = Image.open(io.BytesIO(head))
+        if image.format != "JPEG" or "exif" not in image.info:
+            return None
+        ifd1 = image.getexif().get_ifd(ExifTags.IFD.IFD1)
+        offset, length = ifd1.get(0x201), ifd1.get(0x202)
+        if not offset or not length:
+            return None
+        # Offsets count from the TIFF header, after the "Exif\0\0" marker.
+        data = image.info["exif"][6 + offset : 6 + offset + length]
+        if len(data) < length:
+            return None
+        thumb = Image.open(io.BytesIO(data))
+        thumb.load()
+    except (OSError, SyntaxError, ValueError, KeyError):
+        return None
+    if max(thumb.size) < box:
+        return None
+    return thumb.convert("RGB")
+
+
+def make_thumbnail(read, size: int, box: int = THUMB_SIZE, max_bytes: int = THUMB_MAX_BYTES) -> Image.Image | None:
+    # A thumbnail of at most box x box from read(offset, size). The first
+    # THUMB_HEAD_BYTES are read on their own: an EXIF thumbnail in them saves
+    # fetching the rest. Otherwise the file is read whole (JPEGs then decode
+    # at 1/8 scale). None for files over `max_bytes` or that do not decode;
+    # read errors propagate.
+    head = read(0, min(size, THUMB_HEAD_BYTES))
+    image = exif_thumbnail(head, box)
+    if image is None:
+        if size > max_bytes:
+            return None
+        data = head if size <= len(head) else head + read(len(head), size - len(head))
+        try:
+            image, _full_size = decode_image(data, (box, box))
+        except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+            return None
+    image.thumbnail((box, box))
+    return image
+
+
+def encode_thumbnail(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    if image.mode == "RGBA":
+        image.save(buffer, "PNG")
+    else:
+        image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ThumbnailCache:
+    # Encoded thumbnails on disk, one file per (session, path, size, mtime),
+    # so an unchanged file is never fetched again. Least recently used files
+    # are deleted past `max_bytes`. An empty file records a file that has no
+    # thumbnail (not an image, or too large) so it is skipped as well.
+    def __init__(self, directory, max_bytes: int = THUMB_DISK_BYTES):
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._files: collections.OrderedDict[str, int] | None = None
+        self._lock = threading.Lock()
+
+    def _path(self, session: str, path: str, size: int, mtime: int) -> str:
+        digest = hashlib.sha1(f"{session}\0{path}\0{size}\0{mtime}".encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _index(self):
+        # Scanned on first use, oldest first, not at startup.
+        if self._files is None:
+            found = []
+            if os.path.isdir(self.directory):
+                for folder in os.scandir(self.directory):
+                    if folder.is_dir():
+                        for entry in os.scandir(folder.path):
+                            if entry.name.endswith(".tmp"):
+                                # Left by a write that never finished.
+                                _remove_quietly(entry.path)
+                                continue
+                            info = entry.stat()
+                            found.append((info.st_mtime, entry.path, max(info.st_size, THUMB_MIN_FILE_BYTES)))
+            self._files = collections.OrderedDict((path, size) for _mtime, path, size in sorted(found))
+            self.used = sum(self._files.values())
+        return self._files
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index())
+
+    def get(self, session: str, path: str, size: int, mtime: int) -> bytes | None:
+        # The encoded thumbnail, b"" for a file known to have none, or None
+        # when it was never made.
+        disk_path = self._path(session, path, size, mtime)
+        with self._lock:
+            files = self._index()
+            if disk_path not in files:
+                return None
+            files.move_to_end(disk_path)
+        try:
+            with open(disk_path, "rb") as handle:
+                data = handle.read()
+            os.utime(disk_path)
+        except OSError:
+            with self._lock:
+                self.used -= self._index().pop(disk_path, 0)
+            return None
+        return data
+
+    def put(self, session: str, path: str, size: int, mtime: int, data: bytes):
+        disk_path = self._path(session, path, size, mtime)
+        # Written beside the final name and renamed into place: a file cut
+        # short by a crash would read as an empty marker or a broken image.
+        tmp = f"{disk_path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            with open(tmp, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp, disk_path)
+        except OSError:
+            _remove_quietly(tmp)
+            return
+        # Even an empty marker takes a disk block.
+        cost = max(len(data), THUMB_MIN_FILE_BYTES)
+        with self._lock:
+            files = self._index()
+            self.used += cost - files.pop(disk_path, 0)
+            files[disk_path] = cost
+            while self.used > self.max_bytes and len(files) > 1:
+                victim, victim_size = files.popitem(last=False)
+                self.used -= victim_size
+                _remove_quietly(victim)
+
+
+class Thumbnailer:
+    # Thumbnails for remote files: from the disk cache when this version of
+    # the file was seen before, else made from read(path, offset, size) and
+    # stored. Keyed by the listing's size and mtime, so no stat is needed.
+    def __init__(self, read, cache: ThumbnailCache, box: int = THUMB_SIZE):
+        self.read = read
+        self.cache = cache
+        self.box = box
+
+    def load(self, session: str, path: str, size: int, mtime: int) -> Image.Image | None:
+        data = self.cache.get(session, path, size, mtime)
+        if data is not None:
+            if not data:
+                return None
+            image = Image.open(io.BytesIO(data))
+            image.load()
+            return image
+        image = make_thumbnail(lambda offset, length: self.read(path, offset, length), size, self.box)
+        self.cache.put(session, path, size, mtime, b"" if image is None else encode_thumbnail(image))
+        return image
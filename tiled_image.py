@@ -0,0 +1,374 @@
+import collections
+import io
+import struct
+import threading
+
+from PIL import BmpImagePlugin, Image, PpmImagePlugin, TiffImagePlugin, TiffTags
+
+TILE_SIZE = 256
+TILE_CACHE_BYTES = 96 * 1024 * 1024
+TILE_BLOCK_CACHE_BYTES = 64 * 1024 * 1024
+TILE_WORKERS = 2
+TILE_RAW_BAND = 512 * 1024
+TILE_READ_GAP = 64 * 1024
+TILE_READ_SPAN = 8 * 1024 * 1024
+
+# TIFF tags a strip or tile needs to decode on its own.
+_TIFF_COPY_TAGS = (258, 259, 262, 277, 317, 320, 338, 339, 347, 530, 531, 532)
+_RAW_BYTES_PER_PIXEL = {"L": 1, "I;16": 2, "I;16B": 2, "RGB": 3, "BGR": 3, "RGBA": 4, "BGRA": 4, "RGBX": 4, "BGRX": 4}
+
+
+class RangeFile(io.RawIOBase):
+    # A read-only file over read(offset, size), e.g. SFTPClient.read_range,
+    # so Pillow can parse headers and directories without fetching the file.
+    def __init__(self, read, size: int):
+        self._read = read
+        self.size = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = max(0, base + offset)
+        return self.position
+
+    def tell(self) -> int:
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        data = self._read(self.position, min(len(buffer), max(0, self.size - self.position)))
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def displayable(image: Image.Image) -> Image.Image:
+    # 8-bit L/RGB/RGBA for Tk. 16-bit and float samples are scaled down
+    # rather than clipped.
+    if image.mode in ("L", "RGB", "RGBA"):
+        return image
+    if image.mode.startswith("I;16"):
+        return image.convert("I").point(lambda value: value * (1 / 257)).convert("L")
+    if image.mode in ("I", "F"):
+        low, high = image.getextrema()
+        scale = 255 / (high - low) if high > low else 1
+        return image.point(lambda value: (value - low) * scale).convert("L")
+    transparent = "transparency" in image.info or image.mode in ("LA", "PA", "RGBa")
+    return image.convert("RGBA" if transparent else "RGB")
+
+
+class _LRU:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+            return image
+
+    def put(self, key, image: Image.Image):
+        size = image.width * image.height * len(image.getbands())
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.used -= previous.width * previous.height * len(previous.getbands())
+            self._entries[key] = image
+            self.used += size
+            while self.used > self.max_bytes and len(self._entries) > 1:
+                _key, dropped = self._entries.popitem(last=False)
+                self.used -= dropped.width * dropped.height * len(dropped.getbands())
+
+
+class TiledImage:
+    # An image decoded a block at a time. Blocks are the file's own units (TIFF
+    # strips or tiles, row bands of raw formats) on a uniform grid of
+    # block_w x block_h. Display tiles are TILE_SIZE squares at power-of-two
+    # levels (level L shows the image at 1/2**L); a tile decodes only the
+    # blocks under it, and both decoded blocks and rendered tiles are kept in
+    # bounded LRU caches.
+    def __init__(self, size, image_format: str, block_w: int, block_h: int, tile_bytes: int = TILE_CACHE_BYTES, block_bytes: int = TILE_BLOCK_CACHE_BYTES):
+        self.size = size
+        self.format = image_format
+        self.block_w = block_w
+        self.block_h = block_h
+        self.block_cols = -(-size[0] // block_w)
+        self.tiles = _LRU(tile_bytes)
+        self.blocks = _LRU(block_bytes)
+        self.decoded = 0
+        self._lock = threading.Lock()
+        self._block_locks = {}
+
+    @property
+    def max_level(self) -> int:
+        level = 0
+        while max(self.size) >> level > TILE_SIZE:
+            level += 1
+        return level
+
+    def fit_level(self, width: int, height: int) -> int:
+        # Largest scale at which the whole image fits in width x height.
+        level = 0
+        while level < self.max_level and ((self.size[0] >> level) > width or (self.size[1] >> level) > height):
+            level += 1
+        return level
+
+    def level_size(self, level: int) -> tuple[int, int]:
+        scale = 1 << level
+        return -(-self.size[0] // scale), -(-self.size[1] // scale)
+
+    def tiles_in(self, level: int, left: float, top: float, right: float, bottom: float, ring: int = 0) -> list[tuple[int, int]]:
+        # Tiles covering a rectangle in level coordinates, widened by `ring`
+        # tiles each way, nearest the rectangle's centre first.
+        width, height = self.level_size(level)
+        cols, rows = -(-width // TILE_SIZE), -(-height // TILE_SIZE)
+        first_x, last_x = max(0, int(left) // TILE_SIZE - ring), min(cols - 1, int(right) // TILE_SIZE + ring)
+        first_y, last_y = max(0, int(top) // TILE_SIZE - ring), min(rows - 1, int(bottom) // TILE_SIZE + ring)
+        centre_x, centre_y = (left + right) / 2 / TILE_SIZE, (top + bottom) / 2 / TILE_SIZE
+        tiles = [(tx, ty) for ty in range(first_y, last_y + 1) for tx in range(first_x, last_x + 1)]
+        tiles.sort(key=lambda tile: (tile[0] + 0.5 - centre_x) ** 2 + (tile[1] + 0.5 - centre_y) ** 2)
+        return tiles
+
+    def render(self, level: int, tx: int, ty: int) -> Image.Image:
+        key = (level, tx, ty)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            return tile
+        scale = 1 << level
+        span = TILE_SIZE * scale
+        x0, y0 = tx * span, ty * span
+        x1, y1 = min(self.size[0], x0 + span), min(self.size[1], y0 + span)
+        cols = range(x0 // self.block_w, (x1 - 1) // self.block_w + 1)
+        rows = range(y0 // self.block_h, (y1 - 1) // self.block_h + 1)
+        self._fetch([row * self.block_cols + col for row in rows for col in cols if self.blocks.get(row * self.block_cols + col) is None])
+        tile = None
+        for col in cols:
+            for row in rows:
+                block = self._block(row * self.block_cols + col)
+                bx, by = col * self.block_w, row * self.block_h
+                left, top = max(x0, bx), max(y0, by)
+                right, bottom = min(x1, bx + block.width), min(y1, by + block.height)
+                if right <= left or bottom <= top:
+                    continue
+                piece = block.crop((left - bx, top - by, right - bx, bottom - by))
+                if scale > 1:
+                    piece = piece.reduce(scale)
+                if tile is None:
+                    tile = Image.new(block.mode, (-(-(x1 - x0) // scale), -(-(y1 - y0) // scale)))
+                tile.paste(piece, ((left - x0) // scale, (top - y0) // scale))
+        self.tiles.put(key, tile)
+        return tile
+
+    def _block(self, index: int) -> Image.Image:
+        # Neighbouring tiles share blocks; a block being decoded for one
+        # tile is waited for, not decoded again.
+        with self._lock:
+            lock = self._block_locks.setdefault(index, threading.Lock())
+        with lock:
+            block = self.blocks.get(index)
+            if block is None:
+                block = displayable(self._decode_block(index))
+                self.decoded += 1
+                self.blocks.put(index, block)
+            return block
+
+    def _fetch(self, indexes):
+        # Called with the blocks a tile is about to decode, so subclasses can
+        # read them in fewer requests.
+        pass
+
+    def _decode_block(self, index: int) -> Image.Image:
+        raise NotImplementedError
+
+
+class TiffTiles(TiledImage):
+    # Strips or tiles of the first TIFF page, fetched with range reads and
+    # decoded as a small TIFF carrying the page's compression tags, so LZW,
+    # Deflate, JPEG and PackBits pages all decode piecewise. Thin strips are
+    # grouped into blocks of at least TILE_SIZE rows, one decode each.
+    def __init__(self, image, read, **kwargs):
+        tags = image.tag_v2
+        width, height = image.size
+        if 322 in tags:
+            block_w, block_h = tags[322], tags[323]
+            self.offsets, self.counts = tags[324], tags[325]
+            self.rows_per_unit, self.group = block_h, 1
+        else:
+            self.rows_per_unit = min(height, tags.get(278, height))
+            self.group = max(1, TILE_SIZE // self.rows_per_unit)
+            block_w, block_h = width, self.rows_per_unit * self.group
+            self.offsets, self.counts = tags[273], tags[279]
+        super().__init__(image.size, "TIFF", block_w, block_h, **kwargs)
+        self.read = read
+        self.source = tags
+        self._payloads = {}
+
+    def _units(self, index):
+        return range(index * self.group, min(len(self.offsets), (index + 1) * self.group))
+
+    def _fetch(self, indexes):
+        # Strips are often small (Pillow writes 64 KB ones, scanners a row or
+        # two), so neighbours stored close together are fetched in one read
+        # of up to TILE_READ_SPAN bytes rather than a round trip each.
+        units = sorted((unit for index in indexes for unit in self._units(index)), key=lambda unit: self.offsets[unit])
+        run = []
+        for unit in units + [None]:
+            if run and (
+                unit is None
+                or self.offsets[unit] - (self.offsets[run[-1]] + self.counts[run[-1]]) > TILE_READ_GAP
+                or self.offsets[unit] + self.counts[unit] - self.offsets[run[0]] > TILE_READ_SPAN
+            ):
+                start = self.offsets[run[0]]
+                data = self.read(start, self.offsets[run[-1]] + self.counts[run[-1]] - start)
+                for member in run:
+                    offset = self.offsets[member] - start
+                    self._payloads[member] = data[offset : offset + self.counts[member]]
+                run = []
+            if unit is not None:
+                run.append(unit)
+
+    def _decode_block(self, index):
+        payloads = []
+        for unit in self._units(index):
+            payload = self._payloads.pop(unit, None)
+            payloads.append(self.read(self.offsets[unit], self.counts[unit]) if payload is None else payload)
+        bx, by = index % self.block_cols * self.block_w, index // self.block_cols * self.block_h
+        rows = self.block_h if self.block_w != self.size[0] else min(self.block_h, self.size[1] - by)
+        block = Image.open(io.BytesIO(strip_tiff(self.source, self.block_w, rows, self.rows_per_unit, payloads)))
+        block.load()
+        # Edge tiles are stored padded to the full tile size.
+        return block.crop((0, 0, min(self.block_w, self.size[0] - bx), min(rows, self.size[1] - by)))
+
+
+class RawRows(TiledImage):
+    # Uncompressed formats (BMP, PPM/PGM, ...) whose rows sit at a fixed
+    # stride: each block is a band of rows read with one range read.
+    def __init__(self, image, read, offset: int, rawmode: str, stride: int, orientation: int, **kwargs):
+        rows = max(1, TILE_RAW_BAND // stride)
+        super().__init__(image.size, image.format, image.size[0], rows, **kwargs)
+        self.mode = image.mode
+        self.read = read
+        self.offset = offset
+        self.rawmode = rawmode
+        self.stride = stride
+        self.orientation = orientation
+
+    def _decode_block(self, index):
+        y0 = index * self.block_h
+        y1 = min(self.size[1], y0 + self.block_h)
+        first = y0 if self.orientation > 0 else self.size[1] - y1
+        data = self.read(self.offset + first * self.stride, (y1 - y0) * self.stride)
+        return Image.frombuffer(self.mode, (self.size[0], y1 - y0), data, "raw", self.rawmode, self.stride, self.orientation)
+
+
+def strip_tiff(source, width: int, height: int, rows_per_strip: int, payloads) -> bytes:
+    # A minimal TIFF holding the given strips with the source directory's
+    # sample layout and compression, in the source's byte order.
+    ifd = TiffImagePlugin.ImageFileDirectory_v2(prefix=source.prefix)
+    for tag in _TIFF_COPY_TAGS:
+        if tag in source:
+            ifd[tag] = source[tag]
+            ifd.tagtype[tag] = source.tagtype[tag]
+    ifd[256], ifd[257], ifd[278] = width, height, rows_per_strip
+    # tobytes() writes StripOffsets relative to the end of the directory, so
+    # they count from 0 at the first strip.
+    counts = tuple(map(len, payloads))
+    ifd[273] = tuple(sum(counts[:position]) for position in range(len(counts)))
+    ifd[279] = counts
+    for tag in (256, 257, 273, 278, 279):
+        ifd.tagtype[tag] = TiffTags.LONG
+    order = "<" if source.prefix == b"II" else ">"
+    return source.prefix + struct.pack(order + "HI", 42, 8) + ifd.tobytes(8) + b"".join(payloads)
+
+
+def open_tiled(read, size: int, **kwargs) -> TiledImage | None:
+    # A TiledImage for files that can be decoded piecewise, or None for
+    # sequential formats such as PNG and JPEG.
+    # The plugins are used directly, not Image.open: its decompression-bomb
+    # check exists to stop whole-image decodes, which never happen here.
+    image = None
+    for plugin in (TiffImagePlugin.TiffImageFile, BmpImagePlugin.BmpImageFile, PpmImagePlugin.PpmImageFile):
+        try:
+            image = plugin(io.BufferedReader(RangeFile(read, size), buffer_size=64 * 1024))
+            break
+        except SyntaxError:
+            continue
+    if image is None:
+        return None
+    single_raw = len(image.tile) == 1 and image.tile[0][0] == "raw"
+    if image.format == "TIFF" and not single_raw:
+        tags = image.tag_v2
+        if tags.get(284, 1) != 1 or not (322 in tags or 273 in tags):
+            return None
+        return TiffTiles(image, read, **kwargs)
+    # Uncompressed one-strip TIFFs land here too: any band of rows can be
+    # read on its own.
+    if not single_raw:
+        return None
+    _codec, _extents, offset, args = image.tile[0]
+    if isinstance(args, str):
+        args = (args, 0, 1)
+    rawmode, stride, orientation = (tuple(args) + (0, 1))[:3]
+    per_pixel = _RAW_BYTES_PER_PIXEL.get(rawmode)
+    if per_pixel is None or image.mode not in ("L", "RGB", "RGBA", "I;16", "I;16B"):
+        return None
+    return RawRows(image, read, offset, rawmode, stride or image.size[0] * per_pixel, orientation or 1, **kwargs)
+
+
+class TileLoader:
+    # A bounded pool rendering display tiles most-wanted first. Each
+    # request() replaces the queue, so tiles panned past before a worker got
+    # to them are never rendered.
+    def __init__(self, render, done, workers: int = TILE_WORKERS):
+        self.render = render
+        self.done = done
+        self.workers = workers
+        self._queue = collections.deque()
+        self._running = set()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._closed = False
+
+    def request(self, keys):
+        with self._condition:
+            self._queue = collections.deque(key for key in keys if key not in self._running)
+            self._condition.notify_all()
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._queue.clear()
+            self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                key = self._queue.popleft()
+                self._running.add(key)
+            try:
+                image = self.render(key)
+            except Exception:
+                image = None
+            with self._condition:
+                self._running.discard(key)
+            self.done(key, image)
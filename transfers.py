@@ -0,0 +1,410 @@
+import collections
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+STATUS_QUEUED = "Queued"
+STATUS_RUNNING = "Running"
+STATUS_PAUSED = "Paused"
+STATUS_DONE = "Done"
+STATUS_CANCELLED = "Cancelled"
+STATUS_ERROR = "Error"
+STATUS_INTERRUPTED = "Interrupted"
+FINISHED_STATUSES = {STATUS_DONE, STATUS_CANCELLED, STATUS_ERROR, STATUS_INTERRUPTED}
+RETRYABLE_STATUSES = {STATUS_CANCELLED, STATUS_ERROR, STATUS_INTERRUPTED}
+
+TRANSFER_WORKERS = 4
+DIRECTION_LIMITS = {"Upload": 2, "Download": 3}
+RATE_WINDOW = 5.0
+
+
+class TransferCancelled(Exception):
+    pass
+
+
+class TransferPaused(Exception):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> float:
+        # Goes into debt instead of refusing large blocks; the caller sleeps it off.
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class RateWindow:
+    # Bytes per second over the last `window` seconds of (time, transferred)
+    # samples, so the rate follows the link instead of the whole-run average.
+    def __init__(self, window: float = RATE_WINDOW):
+        self.window = window
+        self._samples: collections.deque[tuple[float, int]] = collections.deque()
+
+    def add(self, now: float, transferred: int):
+        samples = self._samples
+        if samples and transferred < samples[-1][1]:
+            # Restarted (retry); the old samples would give a negative rate.
+            samples.clear()
+        samples.append((now, transferred))
+        while len(samples) > 2 and now - samples[1][0] >= self.window:
+            samples.popleft()
+
+    def rate(self) -> float:
+        if len(self._samples) < 2:
+            return 0.0
+        (start, first), (end, last) = self._samples[0], self._samples[-1]
+        return (last - first) / (end - start) if end > start else 0.0
+
+    def eta(self, remaining: int) -> float | None:
+        rate = self.rate()
+        return remaining / rate if rate > 0 else None
+
+
+def format_eta(seconds: float | None) -> str:
+    if seconds is None:
+        return ""
+    seconds = int(seconds + 0.5)
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
+
+
+class ProgressStore:
+    # Latest (transferred, total, detail) per running job. Workers publish
+    # with one dict store and the UI copies the dict on its own timer; both
+    # are atomic under the GIL for str keys, so neither side takes a lock or
+    # wakes the other per block. Rate windows are only touched by the poller.
+    def __init__(self, window: float = RATE_WINDOW):
+        self.window = window
+        self._latest: dict[str, tuple[int, int, str]] = {}
+        self._rates: dict[str, RateWindow] = {}
+
+    def publish(self, job_id: str, transferred: int, total: int, detail: str = ""):
+        self._latest[job_id] = (transferred, total, detail)
+
+    def discard(self, job_id: str):
+        self._latest.pop(job_id, None)
+
+    def poll(self, now: float | None = None) -> dict[str, tuple[int, int, str, float, float | None]]:
+        # (transferred, total, detail, bytes/s, ETA seconds) per published job.
+        now = time.monotonic() if now is None else now
+        latest = self._latest.copy()
+        for job_id in [job_id for job_id in self._rates if job_id not in latest]:
+            del self._rates[job_id]
+        result = {}
+        for job_id, (transferred, total, detail) in latest.items():
+            rates = self._rates.get(job_id)
+            if rates is None:
+                rates = self._rates[job_id] = RateWindow(self.window)
+            rates.add(now, transferred)
+            result[job_id] = (transferred, total, detail, rates.rate(), rates.eta(max(0, total - transferred)) if total else None)
+        return result
+
+
+@dataclass
+class TransferJob:
+    job_id: str
+    direction: str
+    label: str
+    run: Callable = field(repr=False)
+    priority: int = 0
+    seq: int = 0
+    status: str = STATUS_QUEUED
+    transferred: int = 0
+    total: int = 0
+    error: str = ""
+    detail: str = ""
+    paused: bool = False
+    active: bool = False
+    cancelled: bool = False
+    interrupted: bool = False
+
+    @property
+    def percent(self) -> int:
+        return int((self.transferred / self.total) * 100) if self.total else 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+
+class TransferScheduler:
+    # A fixed pool of worker threads drains a prioritized job queue. Lower
+    # priority values run first, ties run in submission order, and each
+    # direction is capped separately. Jobs are plain callables taking a
+    # `callback(transferred, total)`; the scheduler hooks that callback to
+    # apply pause, cancel and the optional global bytes-per-second limit.
+    # Tree transfers may also pass a `detail` string such as a file count.
+    # Pausing a running job stops it at its next callback and frees its
+    # worker and direction slots; resume queues it again and its run starts
+    # over, so journaled transfers continue from their checkpoint.
+    # `on_update` fires on state changes only; byte counts go to `progress`,
+    # which a UI polls at its own frame rate.
+    def __init__(
+        self,
+        workers: int = TRANSFER_WORKERS,
+        direction_limits: dict[str, int] | None = None,
+        rate_limit: float | None = None,
+        on_update: Callable[[TransferJob], None] | None = None,
+    ):
+        self.direction_limits = dict(DIRECTION_LIMITS if direction_limits is None else direction_limits)
+        self.on_update = on_update
+        self.progress = ProgressStore()
+        self._bucket = TokenBucket(rate_limit) if rate_limit else None
+        self._jobs: dict[str, TransferJob] = {}
+        self._running: dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._seq = itertools.count(1)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(max(1, workers))]
+        for thread in self._threads:
+            thread.start()
+
+    # Public API
+    def submit(self, direction: str, label: str, run: Callable, priority: int = 0, status: str = STATUS_QUEUED) -> TransferJob:
+        # status=STATUS_INTERRUPTED registers a job restored from a previous
+        # session; it waits for an explicit retry instead of starting.
+        with self._cond:
+            job = TransferJob(f"t{next(self._ids)}", direction, label, run, priority=priority, seq=next(self._seq), status=status)
+            self._jobs[job.job_id] = job
+            self._cond.notify_all()
+        self._notify(job)
+        return job
+
+    def get(self, job_id: str) -> TransferJob | None:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> list[TransferJob]:
+        with self._cond:
+            return list(self._jobs.values())
+
+    def queued(self) -> list[TransferJob]:
+        with self._cond:
+            return sorted((j for j in self._jobs.values() if j.status == STATUS_QUEUED), key=self._order)
+
+    def pause(self, job_id: str):
+        job = self._update(job_id, lambda j: not j.finished and not j.paused)
+        if job:
+            with self._cond:
+                job.paused = True
+                job.status = STATUS_PAUSED
+            self._notify(job)
+
+    def resume(self, job_id: str):
+        job = self._update(job_id, lambda j: j.paused)
+        if job:
+            with self._cond:
+                job.paused = False
+                job.status = STATUS_RUNNING if job.active else STATUS_QUEUED
+                self._cond.notify_all()
+            self._notify(job)
+
+    def cancel(self, job_id: str):
+        job = self._update(job_id, lambda j: not j.finished or j.status == STATUS_INTERRUPTED)
+        if not job:
+            return
+        with self._cond:
+            job.cancelled = True
+            if not job.active:
+                job.status = STATUS_CANCELLED
+            self._cond.notify_all()
+        self._notify(job)
+
+    def cancel_all(self):
+        for job in self.jobs():
+            self.cancel(job.job_id)
+
+    def interrupt(self, job_id: str):
+        # Stops a job like cancel() but leaves it STATUS_INTERRUPTED, so a
+        # caller keeping checkpoints (app close, disconnect) can resume it.
+        job = self._update(job_id, lambda j: not j.finished)
+        if not job:
+            return
+        with self._cond:
+            job.cancelled = True
+            job.interrupted = True
+            if not job.active:
+                job.status = STATUS_INTERRUPTED
+            self._cond.notify_all()
+        self._notify(job)
+
+    def interrupt_all(self):
+        for job in self.jobs():
+            self.interrupt(job.job_id)
+
+    def set_priority(self, job_id: str, priority: int):
+        job = self._update(job_id, lambda j: not j.active and not j.finished)
+        if job:
+            with self._cond:
+                job.priority = priority
+                self._cond.notify_all()
+
+    def move_to_front(self, job_id: str):
+        job = self._update(job_id, lambda j: not j.active and not j.finished)
+        if job:
+            with self._cond:
+                ahead = [j for j in self._jobs.values() if not j.active and not j.finished]
+                job.priority = min(j.priority for j in ahead)
+                job.seq = min(j.seq for j in ahead) - 1
+                self._cond.notify_all()
+
+    def retry(self, job_id: str) -> TransferJob | None:
+        job = self._update(job_id, lambda j: j.status in RETRYABLE_STATUSES)
+        if not job:
+            return None
+        with self._cond:
+            job.status = STATUS_QUEUED
+            job.error = ""
+            job.transferred = 0
+            job.detail = ""
+            job.cancelled = False
+            job.interrupted = False
+            job.paused = False
+            job.seq = next(self._seq)
+            self._cond.notify_all()
+        self._notify(job)
+        return job
+
+    def set_rate_limit(self, rate: float | None):
+        self._bucket = TokenBucket(rate) if rate else None
+
+    @property
+    def rate_limit(self) -> float | None:
+        return self._bucket.rate if self._bucket else None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while any(not j.finished for j in self._jobs.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def shutdown(self, wait: bool = True, cancel: bool = True):
+        # cancel=False interrupts instead, keeping unfinished jobs resumable.
+        if cancel:
+            self.cancel_all()
+        else:
+            self.interrupt_all()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    # Internals
+    @staticmethod
+    def _order(job: TransferJob):
+        return (job.priority, job.seq)
+
+    def _update(self, job_id, predicate):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or not predicate(job):
+                return None
+            return job
+
+    def _notify(self, job: TransferJob):
+        # Read once: on_update may be cleared from another thread (app close).
+        on_update = self.on_update
+        if on_update:
+            on_update(job)
+
+    def _next_job(self) -> TransferJob | None:
+        # Called with the lock held.
+        candidates = [
+            job
+            for job in self._jobs.values()
+            if job.status == STATUS_QUEUED
+            and self._running.get(job.direction, 0) < self.direction_limits.get(job.direction, len(self._threads))
+        ]
+        return min(candidates, key=self._order) if candidates else None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and not self._stopped:
+                    self._cond.wait()
+                    job = self._next_job()
+                if job is None:
+                    return
+                job.status = STATUS_RUNNING
+                job.active = True
+                # A resumed job runs again from the start and reports afresh.
+                job.transferred = 0
+                self._running[job.direction] = self._running.get(job.direction, 0) + 1
+            self._notify(job)
+            try:
+                job.run(self._progress_callback(job))
+                status, error = STATUS_DONE, ""
+            except TransferCancelled:
+                status, error = STATUS_CANCELLED, ""
+            except TransferPaused:
+                status, error = STATUS_PAUSED, ""
+            except Exception as exc:
+                if job.cancelled:
+                    status, error = STATUS_CANCELLED, ""
+                elif job.paused:
+                    status, error = STATUS_PAUSED, ""
+                else:
+                    status, error = STATUS_ERROR, str(exc)
+            self.progress.discard(job.job_id)
+            with self._cond:
+                self._running[job.direction] -= 1
+                job.active = False
+                if status == STATUS_PAUSED:
+                    # Resumed or cancelled while the engine was unwinding.
+                    if job.cancelled:
+                        status = STATUS_CANCELLED
+                    elif not job.paused:
+                        status = STATUS_QUEUED
+                if job.interrupted and status == STATUS_CANCELLED:
+                    status = STATUS_INTERRUPTED
+                job.status = status
+                job.error = error
+                if status == STATUS_DONE:
+                    job.transferred = max(job.transferred, job.total)
+                self._cond.notify_all()
+            self._notify(job)
+
+    def _progress_callback(self, job: TransferJob):
+        lock = threading.Lock()
+
+        def callback(transferred, total, detail=None):
+            # Parallel engines report from several threads; keep the counter monotonic.
+            with lock:
+                if detail is not None:
+                    job.detail = detail
+                delta = max(0, transferred - job.transferred)
+                job.transferred = max(job.transferred, transferred)
+                job.total = total
+            bucket = self._bucket
+            if bucket and delta:
+                bucket.consume(delta)
+            if job.cancelled:
+                raise TransferCancelled(job.job_id)
+            if job.paused:
+                raise TransferPaused(job.job_id)
+            self.progress.publish(job.job_id, job.transferred, job.total, job.detail)
+
+        return callback
@@ -1,30 +1,63 @@
-import io
+import collections
 import json
+import math
 import os
+import posixpath
 import stat
 import sys
 import threading
+import time
 import tkinter as tk
+import tkinter.font as tkfont
 from dataclasses import asdict
 from pathlib import Path
 from tkinter import filedialog, messagebox, ttk
 
 import customtkinter as ctk
-from PIL import Image, ImageTk
+from PIL import ImageTk
 
 from preview import (
+    IMAGE_EXTENSIONS,
+    TEXT_EXTENSIONS,
     decode_bytes,
     should_preview_as_image,
-    should_preview_as_text,
+    sniff_text,
 )
-from sftp_client import RemoteEntry, SFTPClient
+from content_search import ContentSearch
+from filter_engine import ListingFilter, parse_query
+from hex_view import HEX_ROW_BYTES, HEX_SEARCH_CHUNK, find_bytes, offset_width, parse_offset, parse_pattern, read_hex_rows
+from image_pipeline import ImagePyramid, LatestRenderer, PyramidCache, decode_image, draft_size, probe_image
+from journal import JOURNAL_DIR_NAME, TransferJournal
+from line_index import LINE_INDEX_CHUNK, LINE_INDEX_DIR_NAME, LineIndexStore, align_page, build_line_index, read_lines
+from listing import DEFAULT_SORT, SORT_COLUMNS, human_size
+from sftp_client import PREVIEW_CACHE_DIR_NAME, Listing, ListingCache, RemoteEntry, SFTPClient
+from sync import SyncDownloader
+from tail import TAIL_MAX_LINES, LogTail
+from thumbnails import THUMB_DIR_NAME, THUMB_SIZE, THUMB_WORKERS, ThumbnailCache, Thumbnailer
+from tiled_image import TILE_SIZE, TileLoader, open_tiled
+from transfers import STATUS_CANCELLED, STATUS_ERROR, STATUS_INTERRUPTED, STATUS_QUEUED, STATUS_RUNNING, TRANSFER_WORKERS, TransferScheduler, format_eta
+from virtual_table import TableViewport, VirtualTable
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("dark-blue")
 
 TEXT_PREVIEW_LIMIT = 256 * 1024
-HEX_PREVIEW_LIMIT = 32 * 1024
+TEXT_PAGE_LINES = 2000
+HEX_PREFETCH_SCREENS = 4
+HEX_WHEEL_ROWS = 3
 IMAGE_PREVIEW_LIMIT = 8 * 1024 * 1024
+IMAGE_IDLE_MS = 200
+LISTING_FIRST_SCREEN = 200
+LISTING_FLUSH_INTERVAL = 0.15
+FILTER_DEBOUNCE_MS = 120
+FILTER_THREAD_MIN = 20_000
+SORT_THREAD_MIN = 20_000
+THUMB_CELL_W = THUMB_SIZE + 32
+THUMB_CELL_H = THUMB_SIZE + 44
+THUMB_PREFETCH_SCREENS = 2
+THUMB_PHOTOS = 600
+TRANSFER_FRAME_MS = 100
+SORT_HEADINGS = {"name": "Name", "type": "Type", "size": "Size", "modified": "Modified"}
 SETTINGS_FILE = "nova_state.json"
 APP_DIR_NAME = "nova-sftp-explorer"
 
@@ -42,24 +75,65 @@ class NovaSFTPExplorer(ctk.CTk):
         self.cwd = "/"
         self.home_dir = "/"
 
-        self.listing_rows: list[RemoteEntry] = []
-        self.visible_rows: list[RemoteEntry] = []
+        self.listing_base = Listing("/")
+        self.listing_rows = self.listing_base
+        self.visible_rows = self.listing_rows
+        self.listing_token = 0
+        self.listing_filter = ListingFilter(self.listing_rows)
+        self.filter_token = 0
+        self.filter_after_id = None
+        self.sort_spec = DEFAULT_SORT
+        self.natural_sort = True
+        self.sort_token = 0
 
         self.preview_token = 0
         self.preview_file_path = None
         self.preview_file_size = 0
+        self.preview_version = None
         self.preview_offset = 0
+        self.preview_end = 0
+        self.preview_line = None
         self.preview_page_size = TEXT_PREVIEW_LIMIT
-        self.image_original = None
+        self.line_index = None
+        self.line_index_path = None
+        self.index_cancel = None
+        self.image_pyramid = None
+        self.image_key = None
         self.image_tk = None
         self.image_zoom = 1.0
         self.image_fit_mode = True
         self.image_canvas_item = None
+        self.image_pyramids = PyramidCache()
+        self.image_renderer = LatestRenderer()
+        self.image_render_token = 0
+        self.image_idle_id = None
+        self.image_full_pending = None
+        self.tiled_image = None
+        self.tiled_key = None
+        self.tiled_level = 0
+        self.tiled_origin = (0, 0)
+        self.tiled_items = {}
+        self.tiled_loader = None
+        self.grid_mode = False
+        self.grid_columns = 1
+        self.grid_folder = None
+        self.grid_cells = {}
+        self.grid_photos = collections.OrderedDict()
+        self.hex_path = None
+        self.hex_version = None
+        self.hex_viewport = TableViewport(lambda row: row, overscan=0)
+        self.hex_renderer = LatestRenderer()
+        self.hex_token = 0
+        self.hex_match = None
+        self.hex_find_cancel = None
         self.nav_back_stack = []
         self.nav_forward_stack = []
 
-        self.transfer_counter = 0
         self.transfer_rows = {}
+        self.transfer_poll_id = None
+        self.transfer_checkpoints = {}
+        self.transfer_discards = set()
+        self.closing = False
 
         self.state_path = self._resolve_state_path()
         self.profiles = []
@@ -67,6 +141,28 @@ class NovaSFTPExplorer(ctk.CTk):
         self.ui_prefs = {}
         self.profile_options = {}
         self._load_state()
+        self.transfer_journal = TransferJournal(self.state_path.parent / JOURNAL_DIR_NAME)
+        self.line_indexes = LineIndexStore(self.state_path.parent / LINE_INDEX_DIR_NAME)
+        try:
+            self.client.blocks.attach_disk(self.state_path.parent / PREVIEW_CACHE_DIR_NAME)
+        except OSError:
+            pass
+        # Thumbnails read whole files on bulk channels, outside the preview
+        # block cache, so browsing a photo folder does not evict previews.
+        self.thumbnails = Thumbnailer(
+            lambda path, offset, size: b"".join(self.client.stream_file(path, size, offset, offset + size)),
+            ThumbnailCache(self.state_path.parent / THUMB_DIR_NAME),
+        )
+        self.thumb_loader = TileLoader(
+            lambda key: self.thumbnails.load(*key),
+            lambda key, image: self.after(0, lambda: self._show_thumbnail(key, image)),
+            workers=THUMB_WORKERS,
+        )
+        self.transfer_scheduler = TransferScheduler(
+            workers=TRANSFER_WORKERS,
+            rate_limit=self.ui_prefs.get("transfer_rate_limit") or None,
+            on_update=self._on_transfer_update,
+        )
 
         self._setup_layout()
         self._setup_toolbar()
@@ -198,7 +294,7 @@ class NovaSFTPExplorer(ctk.CTk):
             font=ctk.CTkFont(family=self.ui_font_family, size=18, weight="bold"),
         ).grid(row=0, column=0, sticky="w", padx=(2, 8))
 
-        self.search_entry = ctk.CTkEntry(header, placeholder_text="Filter files...")
+        self.search_entry = ctk.CTkEntry(header, placeholder_text="Filter: name, *.log, re:^core, size>10M, mtime<7d")
         self.search_entry.grid(row=0, column=1, sticky="ew", padx=(0, 8))
         self.search_entry.bind("<KeyRelease>", self._on_filter_change)
 
@@ -212,18 +308,25 @@ class NovaSFTPExplorer(ctk.CTk):
         self.chk_show_hidden.grid(row=0, column=2, padx=(0, 8))
 
         self.btn_upload = ctk.CTkButton(header, text="Upload", width=80, state="disabled", command=self.start_upload)
+        self.btn_upload_dir = ctk.CTkButton(header, text="Upload Folder", width=110, state="disabled", command=self.start_upload_folder)
         self.btn_download = ctk.CTkButton(header, text="Download", width=92, state="disabled", command=self.start_download)
+        self.btn_sync = ctk.CTkButton(header, text="Sync Folder", width=100, state="disabled", command=self.start_sync)
         self.btn_upload.grid(row=0, column=3, padx=(0, 6))
-        self.btn_download.grid(row=0, column=4)
+        self.btn_upload_dir.grid(row=0, column=4, padx=(0, 6))
+        self.btn_download.grid(row=0, column=5, padx=(0, 6))
+        self.btn_sync.grid(row=0, column=6, padx=(0, 6))
+        self.btn_grid = ctk.CTkButton(header, text="Grid", width=64, command=self._toggle_grid_view)
+        self.btn_grid.grid(row=0, column=7)
 
         self.breadcrumb_frame = ctk.CTkFrame(self.browser_panel, fg_color="transparent")
         self.breadcrumb_frame.grid(row=1, column=0, sticky="ew", padx=10, pady=(4, 2))
 
         self._setup_file_table()
+        self._setup_thumbnail_grid()
         self._setup_preview_tabs()
 
     def _setup_file_table(self):
-        table_holder = ctk.CTkFrame(self.browser_panel, fg_color="transparent")
+        self.table_holder = table_holder = ctk.CTkFrame(self.browser_panel, fg_color="transparent")
         table_holder.grid(row=3, column=0, sticky="nsew", padx=10, pady=10)
         table_holder.grid_rowconfigure(0, weight=1)
         table_holder.grid_columnconfigure(0, weight=1)
@@ -247,31 +350,57 @@ class NovaSFTPExplorer(ctk.CTk):
         )
 
         self.columns = ("name", "type", "size", "modified")
-        self.file_table = ttk.Treeview(table_holder, columns=self.columns, show="headings", style="SFTP.Treeview")
+        self.file_table = VirtualTable(
+            table_holder,
+            self.columns,
+            values=lambda row: (row.name, row.file_type, row.size_human, row.modified),
+            key=lambda row: row.full_path,
+            on_select=self._on_file_select,
+            style="SFTP.Treeview",
+        )
+        tree = self.file_table.tree
 
-        self.file_table.heading("name", text="Name")
-        self.file_table.heading("type", text="Type")
-        self.file_table.heading("size", text="Size")
-        self.file_table.heading("modified", text="Modified")
+        # Click a heading to sort by it (again to reverse), Shift+click to add
+        # it as a further sort key.
+        for col in self.columns:
+            tree.heading(col, text=SORT_HEADINGS[col], command=lambda c=col: self._on_sort_heading(c))
+        self.file_table.bind("<Shift-Button-1>", self._on_sort_heading_shift)
 
-        self.file_table.column("name", width=360, anchor="w")
-        self.file_table.column("type", width=90, anchor="center")
-        self.file_table.column("size", width=120, anchor="e")
-        self.file_table.column("modified", width=180, anchor="center")
+        tree.column("name", width=360, anchor="w")
+        tree.column("type", width=90, anchor="center")
+        tree.column("size", width=120, anchor="e")
+        tree.column("modified", width=180, anchor="center")
 
-        y_scroll = ttk.Scrollbar(table_holder, orient="vertical", command=self.file_table.yview)
-        x_scroll = ttk.Scrollbar(table_holder, orient="horizontal", command=self.file_table.xview)
-        self.file_table.configure(yscrollcommand=y_scroll.set, xscrollcommand=x_scroll.set)
+        y_scroll = self.file_table.scrollbar
+        x_scroll = ttk.Scrollbar(table_holder, orient="horizontal", command=tree.xview)
+        tree.configure(xscrollcommand=x_scroll.set)
 
         self.file_table.grid(row=0, column=0, sticky="nsew")
         y_scroll.grid(row=0, column=1, sticky="ns")
         x_scroll.grid(row=1, column=0, sticky="ew")
 
-        self.file_table.bind("<<TreeviewSelect>>", self._on_file_select)
         self.file_table.bind("<Double-1>", self._on_file_open)
         self.file_table.bind("<Return>", self._on_file_open)
         self.file_table.bind("<KP_Enter>", self._on_file_open)
 
+    def _setup_thumbnail_grid(self):
+        self.grid_holder = ctk.CTkFrame(self.browser_panel, fg_color="transparent")
+        self.grid_holder.grid(row=3, column=0, sticky="nsew", padx=10, pady=10)
+        self.grid_holder.grid_rowconfigure(0, weight=1)
+        self.grid_holder.grid_columnconfigure(0, weight=1)
+        self.thumb_canvas = tk.Canvas(self.grid_holder, background="#17212b", highlightthickness=0, bd=0)
+        self.thumb_scroll = ttk.Scrollbar(self.grid_holder, orient="vertical", command=self._on_grid_scroll)
+        self.thumb_canvas.configure(yscrollcommand=self.thumb_scroll.set, yscrollincrement=THUMB_CELL_H // 4)
+        self.thumb_canvas.grid(row=0, column=0, sticky="nsew")
+        self.thumb_scroll.grid(row=0, column=1, sticky="ns")
+        self.thumb_canvas.bind("<Configure>", lambda _event: self._grid_layout())
+        self.thumb_canvas.bind("<MouseWheel>", lambda event: self._on_grid_scroll("scroll", -event.delta // 120 or (-1 if event.delta > 0 else 1), "units"))
+        self.thumb_canvas.bind("<Button-4>", lambda _event: self._on_grid_scroll("scroll", -1, "units"))
+        self.thumb_canvas.bind("<Button-5>", lambda _event: self._on_grid_scroll("scroll", 1, "units"))
+        self.thumb_canvas.bind("<Button-1>", self._on_grid_click)
+        self.thumb_canvas.bind("<Double-1>", self._on_grid_open)
+        self.grid_holder.grid_remove()
+
     def _setup_preview_tabs(self):
         self.preview_panel.grid_rowconfigure(1, weight=1)
         self.preview_panel.grid_columnconfigure(0, weight=1)
@@ -290,6 +419,7 @@ class NovaSFTPExplorer(ctk.CTk):
         self.tab_hex = self.preview_tabs.add("Hex")
         self.tab_meta = self.preview_tabs.add("Metadata")
         self.tab_transfers = self.preview_tabs.add("Transfers")
+        self.tab_search = self.preview_tabs.add("Search")
 
         self.text_controls = ctk.CTkFrame(self.tab_text, fg_color="transparent")
         self.text_controls.pack(fill="x", padx=8, pady=(8, 0))
@@ -299,6 +429,16 @@ class NovaSFTPExplorer(ctk.CTk):
         self.btn_prev_page.pack(side="left")
         self.page_label.pack(side="left", padx=10)
         self.btn_next_page.pack(side="left")
+        self.line_entry = ctk.CTkEntry(self.text_controls, width=90, placeholder_text="Line")
+        self.line_entry.bind("<Return>", lambda _event: self._goto_line())
+        self.btn_goto_line = ctk.CTkButton(self.text_controls, text="Go", width=44, state="disabled", command=self._goto_line)
+        self.btn_index_lines = ctk.CTkButton(self.text_controls, text="Index lines", width=100, state="disabled", command=self._toggle_line_index)
+        self.line_entry.pack(side="left", padx=(16, 4))
+        self.btn_goto_line.pack(side="left")
+        self.btn_index_lines.pack(side="left", padx=(8, 0))
+        self.tail_var = ctk.BooleanVar(value=False)
+        self.chk_tail = ctk.CTkCheckBox(self.text_controls, text="Follow (tail -f)", variable=self.tail_var, command=self._on_file_select)
+        self.chk_tail.pack(side="right")
 
         self.text_preview = ctk.CTkTextbox(self.tab_text, font=(self.mono_font_family, 13))
         self.text_preview.pack(fill="both", expand=True, padx=8, pady=8)
@@ -329,8 +469,8 @@ class NovaSFTPExplorer(ctk.CTk):
         self.image_viewer.grid_columnconfigure(0, weight=1)
 
         self.image_canvas = tk.Canvas(self.image_viewer, background="#171c23", highlightthickness=0, bd=0)
-        self.image_x_scroll = ttk.Scrollbar(self.image_viewer, orient="horizontal", command=self.image_canvas.xview)
-        self.image_y_scroll = ttk.Scrollbar(self.image_viewer, orient="vertical", command=self.image_canvas.yview)
+        self.image_x_scroll = ttk.Scrollbar(self.image_viewer, orient="horizontal", command=lambda *args: self._on_image_scroll(self.image_canvas.xview, *args))
+        self.image_y_scroll = ttk.Scrollbar(self.image_viewer, orient="vertical", command=lambda *args: self._on_image_scroll(self.image_canvas.yview, *args))
         self.image_canvas.configure(xscrollcommand=self.image_x_scroll.set, yscrollcommand=self.image_y_scroll.set)
 
         self.image_canvas.grid(row=0, column=0, sticky="nsew")
@@ -345,26 +485,73 @@ class NovaSFTPExplorer(ctk.CTk):
         self.image_canvas.bind("<B1-Motion>", self._on_image_pan_move)
         self.image_canvas.create_text(20, 20, anchor="nw", text="Select an image file to preview", fill="#c9d2df", tags=("placeholder",))
 
-        self.hex_preview = ctk.CTkTextbox(self.tab_hex, font=(self.mono_font_family, 12))
-        self.hex_preview.pack(fill="both", expand=True, padx=8, pady=8)
+        self.hex_controls = ctk.CTkFrame(self.tab_hex, fg_color="transparent")
+        self.hex_controls.pack(fill="x", padx=8, pady=(8, 0))
+        self.hex_offset_entry = ctk.CTkEntry(self.hex_controls, width=130, placeholder_text="Offset (0x...)")
+        self.hex_offset_entry.bind("<Return>", lambda _event: self._hex_goto_offset())
+        self.btn_hex_goto = ctk.CTkButton(self.hex_controls, text="Go", width=44, command=self._hex_goto_offset)
+        self.hex_find_entry = ctk.CTkEntry(self.hex_controls, width=220, placeholder_text='Find: de ad be ef or "text"')
+        self.hex_find_entry.bind("<Return>", lambda _event: self._toggle_hex_find())
+        self.btn_hex_find = ctk.CTkButton(self.hex_controls, text="Find", width=70, command=self._toggle_hex_find)
+        self.hex_info_label = ctk.CTkLabel(self.hex_controls, text="")
+        self.hex_offset_entry.pack(side="left", padx=(0, 4))
+        self.btn_hex_goto.pack(side="left", padx=(0, 12))
+        self.hex_find_entry.pack(side="left", padx=(0, 4))
+        self.btn_hex_find.pack(side="left", padx=(0, 12))
+        self.hex_info_label.pack(side="left")
+
+        # Virtual scrolling: the Text only ever holds the rows on screen; the
+        # scrollbar moves a row viewport over the whole file.
+        hex_body = ctk.CTkFrame(self.tab_hex, fg_color="transparent")
+        hex_body.pack(fill="both", expand=True, padx=8, pady=8)
+        hex_body.grid_rowconfigure(0, weight=1)
+        hex_body.grid_columnconfigure(0, weight=1)
+        self.hex_font = tkfont.Font(family=self.mono_font_family, size=12)
+        self.hex_preview = tk.Text(hex_body, font=self.hex_font, wrap="none", background="#17212b", foreground="#e6edf6", borderwidth=0, highlightthickness=0, padx=6, pady=4, state="disabled")
+        self.hex_preview.tag_configure("match", background="#245f91")
+        self.hex_scroll = ttk.Scrollbar(hex_body, orient="vertical", command=self._on_hex_scroll)
+        self.hex_preview.grid(row=0, column=0, sticky="nsew")
+        self.hex_scroll.grid(row=0, column=1, sticky="ns")
+        self.hex_preview.bind("<Configure>", self._on_hex_resize)
+        self.hex_preview.bind("<MouseWheel>", lambda event: self._on_hex_scroll("scroll", (-1 if event.delta > 0 else 1) * HEX_WHEEL_ROWS, "units"))
+        self.hex_preview.bind("<Button-4>", lambda _event: self._on_hex_scroll("scroll", -HEX_WHEEL_ROWS, "units"))
+        self.hex_preview.bind("<Button-5>", lambda _event: self._on_hex_scroll("scroll", HEX_WHEEL_ROWS, "units"))
+        for sequence, args in (("<Prior>", (-1, "pages")), ("<Next>", (1, "pages")), ("<Up>", (-1, "units")), ("<Down>", (1, "units"))):
+            self.hex_preview.bind(sequence, lambda _event, a=args: self._on_hex_scroll("scroll", *a))
+        self.hex_preview.bind("<Home>", lambda _event: self._on_hex_scroll("moveto", 0))
+        self.hex_preview.bind("<End>", lambda _event: self._on_hex_scroll("moveto", 1))
 
         self.meta_preview = ctk.CTkTextbox(self.tab_meta, font=(self.mono_font_family, 12))
         self.meta_preview.pack(fill="both", expand=True, padx=8, pady=8)
 
         self._setup_transfer_table()
+        self._setup_search_tab()
 
     def _setup_transfer_table(self):
+        controls = ctk.CTkFrame(self.tab_transfers, fg_color="transparent")
+        controls.pack(fill="x", padx=8, pady=(8, 0))
+        for text, command in (
+            ("Pause", self.pause_selected_transfers),
+            ("Resume", self.resume_selected_transfers),
+            ("Cancel", self.cancel_selected_transfers),
+            ("Retry", self.retry_selected_transfers),
+            ("Run Next", self.prioritize_selected_transfers),
+        ):
+            ctk.CTkButton(controls, text=text, width=76, command=command).pack(side="left", padx=(0, 6))
+
         holder = ctk.CTkFrame(self.tab_transfers, fg_color="transparent")
         holder.pack(fill="both", expand=True, padx=8, pady=8)
         holder.grid_rowconfigure(0, weight=1)
         holder.grid_columnconfigure(0, weight=1)
 
-        cols = ("direction", "file", "progress", "status")
+        cols = ("direction", "file", "progress", "rate", "eta", "status")
         self.transfer_table = ttk.Treeview(holder, columns=cols, show="headings")
         for col, text, width in (
             ("direction", "Direction", 110),
             ("file", "File", 330),
             ("progress", "Progress", 90),
+            ("rate", "Rate", 90),
+            ("eta", "ETA", 70),
             ("status", "Status", 110),
         ):
             self.transfer_table.heading(col, text=text)
@@ -375,6 +562,39 @@ class NovaSFTPExplorer(ctk.CTk):
         self.transfer_table.grid(row=0, column=0, sticky="nsew")
         y_scroll.grid(row=0, column=1, sticky="ns")
 
+    def _setup_search_tab(self):
+        controls = ctk.CTkFrame(self.tab_search, fg_color="transparent")
+        controls.pack(fill="x", padx=8, pady=(8, 0))
+        controls.grid_columnconfigure(0, weight=1)
+        self.content_search_entry = ctk.CTkEntry(controls, placeholder_text="Text in listed files (re: for regex)")
+        self.content_search_entry.bind("<Return>", lambda _event: self._toggle_search())
+        self.search_case_var = ctk.BooleanVar(value=False)
+        self.chk_search_case = ctk.CTkCheckBox(controls, text="Match case", variable=self.search_case_var)
+        self.btn_search = ctk.CTkButton(controls, text="Search", width=80, command=self._toggle_search)
+        self.content_search_entry.grid(row=0, column=0, padx=(0, 8), sticky="ew")
+        self.chk_search_case.grid(row=0, column=1, padx=(0, 8))
+        self.btn_search.grid(row=0, column=2)
+
+        holder = ctk.CTkFrame(self.tab_search, fg_color="transparent")
+        holder.pack(fill="both", expand=True, padx=8, pady=8)
+        holder.grid_rowconfigure(0, weight=1)
+        holder.grid_columnconfigure(0, weight=1)
+
+        cols = ("file", "line", "text")
+        self.search_table = ttk.Treeview(holder, columns=cols, show="headings")
+        for col, text, width in (("file", "File", 180), ("line", "Line", 70), ("text", "Match", 420)):
+            self.search_table.heading(col, text=text)
+            self.search_table.column(col, width=width, anchor="w")
+        y_scroll = ttk.Scrollbar(holder, orient="vertical", command=self.search_table.yview)
+        self.search_table.configure(yscrollcommand=y_scroll.set)
+        self.search_table.grid(row=0, column=0, sticky="nsew")
+        y_scroll.grid(row=0, column=1, sticky="ns")
+        self.search_table.bind("<Double-1>", self._open_search_hit)
+        self.search_table.bind("<Return>", self._open_search_hit)
+        self.search_hits = {}
+        self.search = None
+        self.search_token = 0
+
     def _setup_status_bar(self):
         self.status_var = ctk.StringVar(value="Disconnected")
         self.status = ctk.CTkLabel(self, textvariable=self.status_var, anchor="w")
@@ -419,13 +639,23 @@ class NovaSFTPExplorer(ctk.CTk):
     def _apply_ui_prefs(self):
         for col, width in self.ui_prefs.get("columns", {}).items():
             if col in self.columns:
-                self.file_table.column(col, width=int(width))
+                self.file_table.tree.column(col, width=int(width))
         last_profile = self.ui_prefs.get("last_profile")
         if last_profile and last_profile in self.profile_options:
             self.profile_var.set(last_profile)
+        sort_spec = tuple((col, bool(desc)) for col, desc in self.ui_prefs.get("sort", []) if col in SORT_COLUMNS)
+        self.sort_spec = sort_spec or DEFAULT_SORT
+        self.natural_sort = bool(self.ui_prefs.get("natural_sort", True))
+        self._update_sort_headings()
 
     def _on_close(self):
         self._persist_ui_prefs()
+        # Unfinished transfers keep their journals and resume next time. The
+        # workers report the interruption after the window is gone, so their
+        # updates are dropped rather than scheduled on a destroyed root.
+        self.closing = True
+        self.transfer_scheduler.on_update = None
+        self.transfer_scheduler.shutdown(wait=False, cancel=False)
         self.client.disconnect()
         self.destroy()
 
@@ -436,8 +666,10 @@ class NovaSFTPExplorer(ctk.CTk):
         except Exception:
             pass
         self.ui_prefs["splitter_x"] = splitter_x
-        self.ui_prefs["columns"] = {col: self.file_table.column(col, "width") for col in self.columns}
+        self.ui_prefs["columns"] = {col: self.file_table.tree.column(col, "width") for col in self.columns}
         self.ui_prefs["last_profile"] = self.profile_var.get() if self.profile_var.get() in self.profile_options else ""
+        self.ui_prefs["sort"] = [list(key) for key in self.sort_spec]
+        self.ui_prefs["natural_sort"] = self.natural_sort
         self._save_state()
 
     # Menus
@@ -526,27 +758,36 @@ class NovaSFTPExplorer(ctk.CTk):
 
     def _on_connected(self, requested_path: str):
         self.btn_connect.configure(state="disabled", text="Connected")
-        for btn in (self.btn_disconnect, self.btn_up, self.btn_refresh, self.btn_go, self.btn_upload, self.btn_download):
+        for btn in (self.btn_disconnect, self.btn_up, self.btn_refresh, self.btn_go, self.btn_upload, self.btn_upload_dir, self.btn_download, self.btn_sync):
             btn.configure(state="normal")
         self._update_nav_buttons()
         self.path_entry.delete(0, "end")
         self.path_entry.insert(0, self.cwd)
+        self._restore_interrupted_transfers()
         if requested_path and requested_path != ".":
             self._navigate(requested_path, track_history=False)
         else:
             self.refresh_listing()
 
     def disconnect(self):
+        self.listing_token += 1
+        self.transfer_scheduler.interrupt_all()
+        if self.search is not None:
+            self.search.cancel()
+        self.thumb_loader.request([])
+        self.grid_photos.clear()
         self.client.disconnect()
         self.cwd = "/"
         self.home_dir = "/"
-        self.listing_rows = []
-        self.visible_rows = []
+        self.listing_base = Listing("/")
+        self.listing_rows = self.listing_base
+        self.visible_rows = self.listing_rows
+        self.listing_filter = ListingFilter(self.listing_rows)
         self._clear_table()
         self._render_breadcrumbs("/")
         self._reset_preview()
         self.btn_connect.configure(state="normal", text="Connect")
-        for btn in (self.btn_disconnect, self.btn_up, self.btn_refresh, self.btn_go, self.btn_upload, self.btn_download):
+        for btn in (self.btn_disconnect, self.btn_up, self.btn_refresh, self.btn_go, self.btn_upload, self.btn_upload_dir, self.btn_download, self.btn_sync):
             btn.configure(state="disabled")
         self.nav_back_stack = []
         self.nav_forward_stack = []
@@ -589,49 +830,175 @@ class NovaSFTPExplorer(ctk.CTk):
         if not self.client.connected:
             return
         resolved = SFTPClient.resolve_target_path(target, self.cwd, self.home_dir)
-        self._set_status(f"Navigating to {resolved} ...")
         previous_path = self.cwd
-        threading.Thread(target=self._navigate_worker, args=(resolved, previous_path, track_history), daemon=True).start()
+        cached = self.client.cached_listdir(resolved)
+        if cached is not None:
+            # Show the cached rows now and revalidate them in the background.
+            self.listing_token += 1
+            self._render_listing(ListingCache.key(resolved), cached, previous_path, track_history)
+            self._set_status(f"Loaded {len(cached)} items in {self.cwd} (cached, checking for changes...)")
+            threading.Thread(target=self._revalidate_worker, args=(self.cwd,), daemon=True).start()
+            return
+        self._set_status(f"Navigating to {resolved} ...")
+        self._start_listing(resolved, previous_path, track_history)
 
-    def _navigate_worker(self, target, previous_path, track_history):
+    def _revalidate_worker(self, path):
         try:
-            normalized = self.client.normalize(target)
-            attrs = self.client.stat(normalized)
-            if not stat.S_ISDIR(attrs.st_mode):
-                raise ValueError(f"{normalized} is not a directory.")
-            rows = self.client.listdir(normalized)
+            rows, changed = self.client.revalidate(path)
         except Exception as exc:
-            self.after(0, lambda: messagebox.showerror("Navigation Error", str(exc)))
+            self.after(0, lambda message=str(exc): self._set_status(f"Could not revalidate {path}: {message}"))
             return
-        self.after(0, lambda: self._render_listing(normalized, rows, previous_path, track_history))
 
-    def refresh_listing(self):
-        if not self.client.connected:
-            return
-        threading.Thread(target=self._refresh_worker, daemon=True).start()
+        def update():
+            if self.cwd != path:
+                return
+            if changed:
+                self._render_listing(path, rows)
+            else:
+                self._set_status(f"Loaded {len(rows)} items in {path}")
 
-    def _refresh_worker(self):
+        self.after(0, update)
+
+    def _start_listing(self, target, previous_path=None, track_history=False, error_title="Navigation Error"):
+        # Starting a new listing cancels the one in flight.
+        self.listing_token += 1
+        args = (self.listing_token, target, previous_path, track_history, error_title)
+        threading.Thread(target=self._navigate_worker, args=args, daemon=True).start()
+
+    def _navigate_worker(self, token, target, previous_path, track_history, error_title):
+        # Streams the folder: the first screenful is kept sorted as batches
+        # arrive and rendered every LISTING_FLUSH_INTERVAL, the full listing is
+        # sorted once at the end.
+        stream = self.client.iter_listdir(target)
+        head = None
+        rows = None
+        flushed = 0.0
         try:
-            rows = self.client.listdir(self.cwd)
+            for path, batch in stream:
+                if token != self.listing_token:
+                    return
+                if rows is None:
+                    head, rows = Listing(path), Listing(path)
+                rows.extend(batch)
+                # head may already be on screen; merge into a copy.
+                merged = head[:]
+                merged.extend(batch)
+                head = merged.sort()[:LISTING_FIRST_SCREEN]
+                now = time.monotonic()
+                if now - flushed >= LISTING_FLUSH_INTERVAL:
+                    flushed = now
+                    partial = (token, path, head, previous_path, track_history, len(rows))
+                    self.after(0, lambda args=partial: self._render_streamed_listing(*args))
+                    track_history = False
         except Exception as exc:
-            self.after(0, lambda: messagebox.showerror("Browse Error", str(exc)))
+            self.after(0, lambda message=str(exc): messagebox.showerror(error_title, message))
+            return
+        finally:
+            stream.close()
+        rows = self.client.cached_listdir(path) or rows.sort()
+        self.after(0, lambda: self._render_streamed_listing(token, path, rows, previous_path, track_history))
+
+    def _render_streamed_listing(self, token, path, rows, previous_path, track_history, loading=None):
+        if token != self.listing_token:
+            return
+        self._render_listing(path, rows, previous_path, track_history)
+        if loading is not None:
+            self._set_status(f"Loading {path}: {loading} items so far...")
+
+    def refresh_listing(self):
+        if not self.client.connected:
             return
-        self.after(0, lambda: self._render_listing(self.cwd, rows))
+        self._start_listing(self.cwd, error_title="Browse Error")
+
+    def _refresh_if_showing(self, path):
+        if ListingCache.key(path) == self.cwd:
+            self.refresh_listing()
 
     def _render_listing(self, path, rows, previous_path=None, track_history=False):
         if track_history and previous_path and previous_path != path:
             if not self.nav_back_stack or self.nav_back_stack[-1] != previous_path:
                 self.nav_back_stack.append(previous_path)
             self.nav_forward_stack.clear()
+        if path != self.cwd:
+            self.file_table.scroll_to(0)
         self.cwd = path
-        self.listing_rows = rows
+        self.listing_base = rows
         self.path_entry.delete(0, "end")
         self.path_entry.insert(0, path)
         self._render_breadcrumbs(path)
-        self._apply_filter()
+        self._apply_sort()
         self._update_nav_buttons()
         self._set_status(f"Loaded {len(rows)} items in {path}")
 
+    # Sorting
+    def _on_sort_heading(self, column, add=False):
+        spec = list(self.sort_spec)
+        columns = [col for col, _desc in spec]
+        if column in columns and (add or columns[0] == column):
+            index = columns.index(column)
+            spec[index] = (column, not spec[index][1])
+        elif add:
+            spec.append((column, column in ("size", "modified")))
+        else:
+            # Largest and newest first on the first click.
+            spec = [(column, column in ("size", "modified"))]
+        self.sort_spec = tuple(spec)
+        self._update_sort_headings()
+        self.file_table.scroll_to(0)
+        self._apply_sort()
+
+    def _on_sort_heading_shift(self, event):
+        tree = self.file_table.tree
+        if tree.identify_region(event.x, event.y) != "heading":
+            return None
+        column = tree.identify_column(event.x)
+        index = int(column.lstrip("#") or 0) - 1
+        if 0 <= index < len(self.columns):
+            self._on_sort_heading(self.columns[index], add=True)
+        return "break"
+
+    def _update_sort_headings(self):
+        positions = {col: (index, desc) for index, (col, desc) in enumerate(self.sort_spec)}
+        for col in self.columns:
+            text = SORT_HEADINGS[col]
+            if col in positions and self.sort_spec != DEFAULT_SORT:
+                index, desc = positions[col]
+                text += " \u25bc" if desc else " \u25b2"
+                if len(self.sort_spec) > 1:
+                    text += str(index + 1)
+            self.file_table.tree.heading(col, text=text)
+
+    def _apply_sort(self):
+        # Sort keys are cached on the listing, so re-sorting a listing (or a
+        # cached folder revisited) only pays for the sort itself.
+        self.sort_token += 1
+        token, base, spec = self.sort_token, self.listing_base, self.sort_spec
+        if spec == DEFAULT_SORT:
+            self._show_sorted(token, base)
+        elif len(base) < SORT_THREAD_MIN:
+            self._show_sorted(token, base.sorted_by(spec, self.natural_sort))
+        else:
+            if self.listing_rows.path != base.path:
+                self._show_sorted(token, base)
+            self._set_status(f"Sorting {len(base)} items...")
+            threading.Thread(target=self._sort_worker, args=(token, base, spec, self.natural_sort), daemon=True).start()
+
+    def _sort_worker(self, token, base, spec, natural):
+        # The first screen comes from a heap selection; the full order follows.
+        first = base.top(LISTING_FIRST_SCREEN, spec, natural)
+        self.after(0, lambda: self._show_sorted(token, first))
+        rows = base.sorted_by(spec, natural)
+        self.after(0, lambda: self._show_sorted(token, rows, status=f"Sorted {len(rows)} items in {base.path}"))
+
+    def _show_sorted(self, token, rows, status=None):
+        if token != self.sort_token:
+            return
+        self.listing_rows = rows
+        self.listing_filter = ListingFilter(rows)
+        self._apply_filter()
+        if status:
+            self._set_status(status)
+
     def _update_nav_buttons(self):
         self.btn_back.configure(state="normal" if self.nav_back_stack else "disabled")
         self.btn_forward.configure(state="normal" if self.nav_forward_stack else "disabled")
@@ -653,43 +1020,49 @@ class NovaSFTPExplorer(ctk.CTk):
 
     # Filter
     def _on_filter_change(self, _event=None):
-        self._apply_filter()
+        # Debounced: a burst of keystrokes runs one filter pass.
+        if self.filter_after_id is not None:
+            self.after_cancel(self.filter_after_id)
+        self.filter_after_id = self.after(FILTER_DEBOUNCE_MS, self._apply_filter)
 
     def _apply_filter(self):
-        query = self.search_entry.get().strip().lower()
-        show_hidden = self.show_hidden_var.get()
-
-        rows = self.listing_rows
-        if not show_hidden:
-            rows = [r for r in rows if not r.name.startswith(".")]
+        self.filter_after_id = None
+        try:
+            query = parse_query(self.search_entry.get(), show_hidden=self.show_hidden_var.get())
+        except ValueError as exc:
+            self._set_status(f"Filter: {exc}")
+            return
+        self.filter_token += 1
+        token = self.filter_token
+        engine = self.listing_filter
+        if len(engine.rows) < FILTER_THREAD_MIN:
+            self._show_filtered(token, engine.filter(query), query)
+            return
+        threading.Thread(target=self._filter_worker, args=(token, engine, query), daemon=True).start()
 
-        if query:
-            rows = [r for r in rows if query in r.name.lower()]
+    def _filter_worker(self, token, engine, query):
+        rows = engine.filter(query)
+        self.after(0, lambda: self._show_filtered(token, rows, query))
 
+    def _show_filtered(self, token, rows, query):
+        if token != self.filter_token:
+            return
         self.visible_rows = rows
-        self._clear_table()
-        for idx, row in enumerate(self.visible_rows):
-            self.file_table.insert("", "end", iid=str(idx), values=(row.name, row.file_type, row.size_human, row.modified))
+        self.file_table.set_rows(rows)
+        self._grid_set_rows()
+        if not query.empty:
+            self._set_status(f"{len(rows)} of {len(self.listing_rows)} items match")
 
     def _clear_table(self):
-        for item in self.file_table.get_children():
-            self.file_table.delete(item)
+        self.file_table.set_rows([])
+        self._grid_set_rows()
 
     def _selected_row(self):
-        sel = self.file_table.selection()
-        if not sel:
-            return None
-        idx = int(sel[0])
-        if 0 <= idx < len(self.visible_rows):
-            return self.visible_rows[idx]
-        return None
+        return self.file_table.selected_row()
 
     def _selected_row_from_event(self, event):
         if event is not None and hasattr(event, "x") and hasattr(event, "y"):
-            row_id = self.file_table.identify_row(event.y)
-            if row_id:
-                self.file_table.selection_set(row_id)
-                self.file_table.focus(row_id)
+            self.file_table.select_at(event.y)
         return self._selected_row()
 
     def _on_file_open(self, event=None):
@@ -697,8 +1070,140 @@ class NovaSFTPExplorer(ctk.CTk):
         if row and row.is_dir:
             self._navigate(row.full_path)
 
+    # Thumbnail grid
+    def _toggle_grid_view(self):
+        self.grid_mode = not self.grid_mode
+        if self.grid_mode:
+            self.table_holder.grid_remove()
+            self.grid_holder.grid()
+            self.btn_grid.configure(text="List")
+            self._grid_set_rows()
+            return
+        self.thumb_loader.request([])
+        self.grid_holder.grid_remove()
+        self.table_holder.grid()
+        self.btn_grid.configure(text="Grid")
+        index = self.file_table.viewport.selected_index()
+        if index is not None:
+            self.file_table.viewport.ensure_visible(index)
+        self.file_table.refresh()
+
+    def _grid_set_rows(self):
+        if not self.grid_mode:
+            return
+        # Back to the top for a new folder, not when a streaming listing or
+        # a filter updates the current one.
+        if self.grid_folder != self.cwd:
+            self.grid_folder = self.cwd
+            self.thumb_canvas.yview_moveto(0)
+        self._grid_layout(reset=True)
+
+    def _grid_layout(self, reset=False):
+        if not self.grid_mode:
+            return
+        columns = max(1, self.thumb_canvas.winfo_width() // THUMB_CELL_W)
+        if reset or columns != self.grid_columns:
+            self.thumb_canvas.delete("all")
+            self.grid_cells.clear()
+        self.grid_columns = columns
+        lines = -(-len(self.file_table.viewport.rows) // columns)
+        self.thumb_canvas.configure(scrollregion=(0, 0, columns * THUMB_CELL_W, max(lines * THUMB_CELL_H, 1)))
+        self._grid_refresh()
+
+    def _on_grid_scroll(self, *args):
+        self.thumb_canvas.yview(*args)
+        self._grid_refresh()
+        return "break"
+
+    def _grid_span(self, screens=0):
+        # Indexes of the rows on screen, widened by whole screens each way.
+        rows = self.file_table.viewport.rows
+        height = max(self.thumb_canvas.winfo_height(), 1)
+        top = self.thumb_canvas.canvasy(0) - screens * height
+        bottom = self.thumb_canvas.canvasy(0) + (screens + 1) * height
+        first = max(0, int(top) // THUMB_CELL_H) * self.grid_columns
+        last = min(len(rows), (int(bottom) // THUMB_CELL_H + 1) * self.grid_columns)
+        return range(first, max(first, last))
+
+    def _grid_refresh(self):
+        # Draws only the cells on screen, then queues thumbnails: the visible
+        # ones first, then those up to THUMB_PREFETCH_SCREENS away, nearest
+        # first. Files seen before come from the disk cache without a read.
+        rows = self.file_table.viewport.rows
+        visible = self._grid_span()
+        for index in [index for index in self.grid_cells if index not in visible]:
+            self.thumb_canvas.delete(*self.grid_cells.pop(index)[1])
+        for index in visible:
+            if index not in self.grid_cells:
+                self._draw_grid_cell(index, rows[index])
+        middle = (visible.start + visible.stop) / 2
+        wanted = sorted(self._grid_span(THUMB_PREFETCH_SCREENS), key=lambda index: (index not in visible, abs(index - middle)))
+        keys = [self._thumb_key(rows[index]) for index in wanted]
+        self.thumb_loader.request([key for key in keys if key is not None and key not in self.grid_photos])
+
+    def _thumb_key(self, row):
+        if row.is_dir or os.path.splitext(row.name.lower())[1] not in IMAGE_EXTENSIONS:
+            return None
+        return (self.client.session, row.full_path, row.st_size, row.st_mtime)
+
+    def _draw_grid_cell(self, index, row):
+        x = index % self.grid_columns * THUMB_CELL_W
+        y = index // self.grid_columns * THUMB_CELL_H
+        centre = x + THUMB_CELL_W // 2
+        selected = row.full_path == self.file_table.viewport.selected_key
+        canvas = self.thumb_canvas
+        items = [canvas.create_rectangle(x + 4, y + 4, x + THUMB_CELL_W - 4, y + THUMB_CELL_H - 4, fill="#245f91" if selected else "#1d2935", outline="")]
+        photo = self.grid_photos.get(self._thumb_key(row))
+        if photo is not None:
+            items.append(canvas.create_image(centre, y + 10 + THUMB_SIZE // 2, image=photo))
+        else:
+            label = "DIR" if row.is_dir else (os.path.splitext(row.name)[1][1:].upper() or "FILE")
+            items.append(canvas.create_text(centre, y + 10 + THUMB_SIZE // 2, text=label, fill="#6f7d8c", font=(self.ui_font_family, 14, "bold")))
+        name = row.name if len(row.name) <= 22 else row.name[:20] + "..."
+        items.append(canvas.create_text(centre, y + THUMB_SIZE + 24, text=name, fill="#e6edf6", font=(self.ui_font_family, 10)))
+        self.grid_cells[index] = (row.full_path, items)
+
+    def _show_thumbnail(self, key, image):
+        if key[0] != self.client.session:
+            return
+        self.grid_photos[key] = None if image is None else ImageTk.PhotoImage(image)
+        self.grid_photos.move_to_end(key)
+        while len(self.grid_photos) > THUMB_PHOTOS:
+            self.grid_photos.popitem(last=False)
+        rows = self.file_table.viewport.rows
+        for index, (path, items) in list(self.grid_cells.items()):
+            if path == key[1] and image is not None:
+                self.thumb_canvas.delete(*items)
+                self._draw_grid_cell(index, rows[index])
+
+    def _grid_index_at(self, event):
+        column = int(self.thumb_canvas.canvasx(event.x)) // THUMB_CELL_W
+        index = int(self.thumb_canvas.canvasy(event.y)) // THUMB_CELL_H * self.grid_columns + column
+        if column >= self.grid_columns or index >= len(self.file_table.viewport.rows):
+            return None
+        return index
+
+    def _on_grid_click(self, event):
+        index = self._grid_index_at(event)
+        if index is None:
+            return
+        changed = self.file_table.viewport.select_index(index)
+        for cell in list(self.grid_cells):
+            self.thumb_canvas.delete(*self.grid_cells.pop(cell)[1])
+        self._grid_refresh()
+        if changed:
+            self._on_file_select()
+
+    def _on_grid_open(self, event):
+        index = self._grid_index_at(event)
+        if index is None:
+            return
+        row = self.file_table.viewport.rows[index]
+        if row.is_dir:
+            self._navigate(row.full_path)
+
     # Preview
-    def _on_file_select(self, _event):
+    def _on_file_select(self, _row=None):
         row = self._selected_row()
         if not row or row.is_dir:
             return
@@ -706,56 +1211,167 @@ class NovaSFTPExplorer(ctk.CTk):
         token = self.preview_token
         self.preview_file_path = row.full_path
         self.preview_file_size = row.st_size
+        self.preview_version = None
         self.preview_offset = 0
-        threading.Thread(target=self._preview_worker, args=(token, row, 0), daemon=True).start()
+        self.preview_end = 0
+        self.preview_line = None
+        self._cancel_line_index()
+        args = (token, row, 0, None, self.tail_var.get())
+        threading.Thread(target=self._preview_worker, args=args, daemon=True).start()
 
-    def _preview_worker(self, token: int, row: RemoteEntry, offset: int):
+    def _preview_worker(self, token: int, row: RemoteEntry, offset: int, version=None, follow=False, line=None, backward=False):
         path = row.full_path
         ext = os.path.splitext(path.lower())[1]
         metadata = self._build_metadata(row)
         try:
+            # One stat per opened preview (paging reuses its version); every
+            # read below is served from the block cache when this version of
+            # the file was read before.
+            version = version or self.client.file_version(path)
             if should_preview_as_image(ext, row.st_size, IMAGE_PREVIEW_LIMIT):
-                self._preview_image(token, path, metadata)
+                self._preview_image(token, path, metadata, version)
                 return
 
-            sample = self.client.read_head(path, 4096)
-            if should_preview_as_text(ext, sample):
-                self._preview_text(token, row, metadata, offset)
+            def read(start, size):
+                return self.client.read_range(path, start, size, version)
+
+            if ext in IMAGE_EXTENSIONS and self._preview_tiled(token, path, metadata, version, read):
                 return
 
-            self._preview_hex(token, path, metadata)
+            if ext in TEXT_EXTENSIONS or sniff_text(read, version[1]):
+                if follow:
+                    self._preview_tail(token, path, metadata)
+                else:
+                    self._preview_text(token, row, metadata, offset, version, line, backward)
+                return
+
+            self._preview_hex(token, path, metadata, version)
         except Exception as exc:
-            self.after(0, lambda: self._set_status(f"Preview failed: {exc}"))
+            self.after(0, lambda message=str(exc): self._set_status(f"Preview failed: {message}"))
 
-    def _preview_text(self, token, row, metadata, offset):
-        data = self.client.read_range(row.full_path, offset, self.preview_page_size)
+    def _preview_text(self, token, row, metadata, offset, version, line=None, backward=False):
+        path = row.full_path
+        mtime, size = version
+        index = self.line_index if self.line_index_path == path else None
+        if index is None or (index.mtime, index.size) != version:
+            index = self.line_indexes.load(self.client.session, path, size, mtime)
+        if index and line is None and offset == 0 and not backward:
+            line = 0
+        page = self.preview_page_size
+
+        def read(start, length):
+            return self.client.read_range(path, start, length, version)
+
+        # Pages hold whole lines: by line number once the file is indexed,
+        # otherwise byte pages trimmed back to the last newline (or character)
+        # so no line or multi-byte character is split across Next/Prev.
+        if index and line is not None:
+            data, start, end = read_lines(read, index, line, TEXT_PAGE_LINES, page)
+        elif backward:
+            start = max(0, offset - page)
+            data, skipped = align_page(read(start, offset - start), trim_head=start > 0, trim_tail=False)
+            start += skipped
+            end = offset
+            line = None
+        else:
+            data = read(offset, page)
+            data, _ = align_page(data, trim_head=False, trim_tail=offset + len(data) < size)
+            start, end = offset, offset + len(data)
+            line = None
         decoded = decode_bytes(data)
-        end_offset = offset + len(data)
-        has_more = end_offset < row.st_size
+        has_more = end < size
         text = decoded.text
         if has_more:
             text += "\n\n[Page truncated. Use Next for more.]"
+        shown_lines = data.count(b"\n") + (0 if data.endswith(b"\n") or not data else 1)
+        # Read ahead both ways so Next and Prev are served from memory.
+        self.client.prefetch_range(path, end, page, version)
+        if start:
+            self.client.prefetch_range(path, max(0, start - page), min(page, start), version)
 
         def update():
             if token != self.preview_token:
                 return
-            self.preview_file_path = row.full_path
-            self.preview_file_size = row.st_size
-            self.preview_offset = offset
+            self.preview_file_path = path
+            self.preview_file_size = size
+            self.preview_version = version
+            self.preview_offset = start
+            self.preview_end = end
+            self.preview_line = line
+            self.line_index = index
+            self.line_index_path = path if index else None
             self.text_preview.delete("1.0", "end")
             self.text_preview.insert("1.0", text)
             self.meta_preview.delete("1.0", "end")
             self.meta_preview.insert("1.0", metadata + f"Encoding: {decoded.encoding}\n")
             self.preview_tabs.set("Text")
             self._update_text_paging_controls()
+            if line is not None:
+                self.page_label.configure(text=f"Lines {line + 1:,}-{line + max(shown_lines, 1):,} of {index.total_lines:,}")
             self._set_status("Text preview ready")
 
         self.after(0, update)
 
-    def _preview_image(self, token, path, metadata):
-        raw = self.client.read_head(path, IMAGE_PREVIEW_LIMIT)
-        image = Image.open(io.BytesIO(raw))
-        image.load()
+    def _preview_tail(self, token, path, metadata):
+        # Runs for as long as this preview is current: shows the end of the
+        # file, then polls for appends with the tail's adaptive interval.
+        tail = LogTail(self.client, path)
+        text = tail.start()
+
+        def show():
+            if token != self.preview_token:
+                return
+            self.preview_file_path = None
+            self.preview_file_size = 0
+            self.preview_offset = 0
+            self.text_preview.delete("1.0", "end")
+            self.meta_preview.delete("1.0", "end")
+            self.meta_preview.insert("1.0", metadata + f"Encoding: {tail.encoding}\n")
+            self.preview_tabs.set("Text")
+            self._update_text_paging_controls()
+            self.page_label.configure(text="Following")
+            self._append_tail(token, text, False)
+            self._set_status(f"Following {path}")
+
+        self.after(0, show)
+        while token == self.preview_token:
+            time.sleep(tail.interval)
+            if token != self.preview_token:
+                return
+            try:
+                text, reset = tail.poll()
+            except Exception as exc:
+                self.after(0, lambda message=str(exc): self._set_status(f"Stopped following {path}: {message}"))
+                return
+            if text or reset:
+                self.after(0, lambda text=text, reset=reset: self._append_tail(token, text, reset))
+
+    def _append_tail(self, token, text, reset):
+        if token != self.preview_token:
+            return
+        at_bottom = self.text_preview.yview()[1] >= 0.999
+        if reset:
+            self.text_preview.delete("1.0", "end")
+        self.text_preview.insert("end", text)
+        # Cap widget memory: keep the newest TAIL_MAX_LINES lines.
+        lines = int(self.text_preview.index("end-1c").split(".")[0])
+        if lines > TAIL_MAX_LINES:
+            self.text_preview.delete("1.0", f"{lines - TAIL_MAX_LINES + 1}.0")
+        if at_bottom or reset:
+            self.text_preview.see("end")
+
+    def _preview_image(self, token, path, metadata, version):
+        key = (self.client.session, path, version)
+        pyramid = self.image_pyramids.get(key)
+        if pyramid is None:
+            # Dimensions first, from the header, so the canvas can say what is
+            # coming while the rest downloads; then a reduced-size decode.
+            image_format, full_size = probe_image(lambda start, size: self.client.read_range(path, start, size, version), version[1])
+            self.after(0, lambda: token == self.preview_token and self.image_info_label.configure(text=f"{full_size[0]}x{full_size[1]} {image_format} | loading..."))
+            raw = self.client.read_head(path, IMAGE_PREVIEW_LIMIT, version)
+            image, full_size = decode_image(raw, draft_size(full_size))
+            pyramid = ImagePyramid(image, full_size)
+            self.image_pyramids.put(key, pyramid)
 
         def update():
             if token != self.preview_token:
@@ -763,9 +1379,50 @@ class NovaSFTPExplorer(ctk.CTk):
             self.preview_file_path = None
             self.preview_file_size = 0
             self.preview_offset = 0
-            self.image_original = image
+            self._close_tiled()
+            self.image_pyramid = pyramid
+            self.image_key = key
+            self.image_full_pending = None
             self.image_fit_mode = True
             self.image_zoom = 1.0
+            self._render_image_canvas(quality=True)
+            self.meta_preview.delete("1.0", "end")
+            self.meta_preview.insert("1.0", metadata)
+            self.preview_tabs.set("Image")
+            self._update_text_paging_controls()
+
+        self.after(0, update)
+
+    def _preview_tiled(self, token, path, metadata, version, read):
+        # Images over IMAGE_PREVIEW_LIMIT are never downloaded whole: TIFF
+        # strips/tiles and raw rows are range-read and decoded per screen
+        # tile. Returns False for formats that only decode front to back.
+        key = (self.client.session, path, version)
+        try:
+            tiled = self.tiled_image if self.tiled_key == key else open_tiled(read, version[1])
+        except (OSError, SyntaxError):
+            tiled = None
+        if tiled is None:
+            self.after(0, lambda: self._set_status("Image too large to preview and cannot be decoded in tiles; showing bytes."))
+            return False
+
+        def update():
+            if token != self.preview_token:
+                return
+            self.preview_file_path = None
+            self.preview_file_size = 0
+            self.preview_offset = 0
+            if tiled is not self.tiled_image:
+                self._close_tiled()
+                self.tiled_image = tiled
+                self.tiled_key = key
+                self.tiled_loader = TileLoader(
+                    lambda tile_key: tiled.render(*tile_key),
+                    lambda tile_key, image: self.after(0, lambda: self._show_tile(tiled, tile_key, image)),
+                )
+            self.image_pyramid = None
+            self.image_key = None
+            self.image_fit_mode = True
             self._render_image_canvas()
             self.meta_preview.delete("1.0", "end")
             self.meta_preview.insert("1.0", metadata)
@@ -773,25 +1430,49 @@ class NovaSFTPExplorer(ctk.CTk):
             self._update_text_paging_controls()
 
         self.after(0, update)
+        return True
 
-    def _preview_hex(self, token, path, metadata):
-        data = self.client.read_head(path, HEX_PREVIEW_LIMIT)
-        lines = []
-        for offset in range(0, len(data), 16):
-            chunk = data[offset : offset + 16]
-            hex_part = " ".join(f"{b:02x}" for b in chunk)
-            ascii_part = "".join(chr(b) if 32 <= b <= 126 else "." for b in chunk)
-            lines.append(f"{offset:08x}  {hex_part:<47}  {ascii_part}")
-        output = "\n".join(lines) + "\n\n[Binary preview limited to first 32 KB.]"
+    def _decode_full_image(self):
+        # Zoomed past the reduced decode: decode at full resolution in the
+        # background and swap it in; until then the reduced base is upscaled.
+        key = self.image_key
+        if key is None or self.image_full_pending == key:
+            return
+        self.image_full_pending = key
+        _session, path, version = key
+
+        def work():
+            try:
+                image, full_size = decode_image(self.client.read_head(path, IMAGE_PREVIEW_LIMIT, version))
+            except Exception as exc:
+                self.after(0, lambda message=str(exc): self._set_status(f"Full-size decode failed: {message}"))
+                return
+            pyramid = ImagePyramid(image, full_size)
+            self.image_pyramids.put(key, pyramid)
+
+            def swap():
+                if self.image_key == key:
+                    self.image_pyramid = pyramid
+                    self._render_image_canvas(quality=True)
+
+            self.after(0, swap)
 
+        threading.Thread(target=work, daemon=True).start()
+
+    def _preview_hex(self, token, path, metadata, version):
         def update():
             if token != self.preview_token:
                 return
             self.preview_file_path = None
             self.preview_file_size = 0
             self.preview_offset = 0
-            self.hex_preview.delete("1.0", "end")
-            self.hex_preview.insert("1.0", output)
+            self._cancel_hex_find()
+            self.hex_path = path
+            self.hex_version = version
+            self.hex_match = None
+            self.hex_viewport.set_rows(range(-(-version[1] // HEX_ROW_BYTES)))
+            self.hex_viewport.scroll_to(0)
+            self._hex_render()
             self.meta_preview.delete("1.0", "end")
             self.meta_preview.insert("1.0", metadata)
             self.preview_tabs.set("Hex")
@@ -799,6 +1480,146 @@ class NovaSFTPExplorer(ctk.CTk):
 
         self.after(0, update)
 
+    # Hex view
+    def _hex_render(self):
+        # Reads and formats only the rows on screen, on the renderer thread
+        # (a burst of scroll steps costs at most two reads, and revisited
+        # rows come from the block cache), then warms the next screens.
+        self.hex_token += 1
+        token = self.hex_token
+        self.hex_scroll.set(*self.hex_viewport.fractions())
+        if self.hex_path is None:
+            self._show_hex_rows(token, 0, [])
+            self.hex_info_label.configure(text="")
+            return
+        path, version = self.hex_path, self.hex_version
+        first, count = self.hex_viewport.top, self.hex_viewport.visible
+
+        def read(start, size):
+            return self.client.read_range(path, start, size, version)
+
+        def job():
+            rows = read_hex_rows(read, version[1], first, count)
+            self.client.prefetch_range(path, (first + count) * HEX_ROW_BYTES, count * HEX_ROW_BYTES * HEX_PREFETCH_SCREENS, version)
+            return rows
+
+        self.hex_renderer.submit(job, lambda rows: self.after(0, lambda: self._show_hex_rows(token, first, rows)))
+
+    def _show_hex_rows(self, token, first, rows):
+        if token != self.hex_token:
+            return
+        if rows is None:
+            self._set_status("Hex read failed.")
+            return
+        self.hex_preview.configure(state="normal")
+        self.hex_preview.delete("1.0", "end")
+        self.hex_preview.insert("1.0", "\n".join(rows))
+        if self.hex_match is not None and rows:
+            self._highlight_hex_match(first, len(rows))
+        self.hex_preview.configure(state="disabled")
+        if self.hex_path is not None:
+            size = self.hex_version[1]
+            self.hex_info_label.configure(text=f"{size:,} bytes | 0x{first * HEX_ROW_BYTES:x}-0x{min(size, (first + len(rows)) * HEX_ROW_BYTES):x}")
+
+    def _highlight_hex_match(self, first, count):
+        offset, length = self.hex_match
+        width = offset_width(self.hex_version[1])
+        ascii_column = width + 2 + HEX_ROW_BYTES * 3 + 1
+        start = max(offset, first * HEX_ROW_BYTES)
+        end = min(offset + length, (first + count) * HEX_ROW_BYTES)
+        for position in range(start, end):
+            line = position // HEX_ROW_BYTES - first + 1
+            column = position % HEX_ROW_BYTES
+            self.hex_preview.tag_add("match", f"{line}.{width + 2 + column * 3}", f"{line}.{width + 4 + column * 3}")
+            self.hex_preview.tag_add("match", f"{line}.{ascii_column + column}", f"{line}.{ascii_column + column + 1}")
+
+    def _on_hex_scroll(self, *args):
+        if args[0] == "moveto":
+            changed = self.hex_viewport.moveto(args[1])
+        else:
+            amount, unit = int(args[1]), args[2]
+            changed = self.hex_viewport.scroll_by(amount * (self.hex_viewport.visible if unit.startswith("page") else 1))
+        if changed:
+            self._hex_render()
+        return "break"
+
+    def _on_hex_resize(self, event):
+        visible = max(1, (event.height - 8) // self.hex_font.metrics("linespace"))
+        if visible != self.hex_viewport.visible:
+            self.hex_viewport.set_visible(visible)
+            self._hex_render()
+
+    def _hex_show_range(self, offset, length):
+        self.hex_match = (offset, length)
+        row = offset // HEX_ROW_BYTES
+        viewport = self.hex_viewport
+        if not viewport.top <= row < viewport.top + viewport.visible:
+            viewport.scroll_to(row - viewport.visible // 3)
+        self._hex_render()
+
+    def _hex_goto_offset(self):
+        if self.hex_path is None:
+            return
+        try:
+            offset = parse_offset(self.hex_offset_entry.get())
+        except ValueError:
+            self._set_status("Offset must be a number, e.g. 4096 or 0x1000.")
+            return
+        self._hex_show_range(max(0, min(offset, self.hex_version[1] - 1)), 1)
+
+    def _toggle_hex_find(self):
+        if self.hex_find_cancel is not None:
+            self.hex_find_cancel.set()
+            return
+        if self.hex_path is None:
+            return
+        try:
+            pattern = parse_pattern(self.hex_find_entry.get())
+        except ValueError as exc:
+            self._set_status(f"Invalid pattern: {exc}")
+            return
+        # Find next: after the highlighted match, else from the top of the view.
+        start = self.hex_match[0] + 1 if self.hex_match is not None else self.hex_viewport.top * HEX_ROW_BYTES
+        cancel = threading.Event()
+        self.hex_find_cancel = cancel
+        self.btn_hex_find.configure(text="Cancel")
+        self._set_status(f"Searching from 0x{start:x}...")
+        args = (self.hex_path, self.hex_version, pattern, start, cancel)
+        threading.Thread(target=self._hex_find_worker, args=args, daemon=True).start()
+
+    def _hex_find_worker(self, path, version, pattern, start, cancel):
+        # Streams the rest of the file on a bulk channel, outside the block
+        # cache, so a search through gigabytes does not evict the pages on
+        # screen.
+        try:
+            chunks = self.client.stream_file(path, HEX_SEARCH_CHUNK, start, version[1])
+            try:
+                hit = find_bytes(chunks, pattern, start, cancel)
+            finally:
+                chunks.close()
+        except Exception as exc:
+            self.after(0, lambda message=str(exc): self._on_hex_find_done(path, cancel, pattern, start, None, message))
+            return
+        self.after(0, lambda: self._on_hex_find_done(path, cancel, pattern, start, hit))
+
+    def _on_hex_find_done(self, path, cancel, pattern, start, hit, error=None):
+        if self.hex_find_cancel is cancel:
+            self.hex_find_cancel = None
+            self.btn_hex_find.configure(text="Find")
+        if error is not None:
+            self._set_status(f"Search failed: {error}")
+        elif cancel.is_set() or path != self.hex_path:
+            self._set_status("Search cancelled.")
+        elif hit is None:
+            self._set_status(f"{pattern.hex(' ')} not found after 0x{start:x}.")
+        else:
+            self._hex_show_range(hit, len(pattern))
+            self._set_status(f"Found at 0x{hit:x}.")
+
+    def _cancel_hex_find(self):
+        if self.hex_find_cancel is not None:
+            self.hex_find_cancel.set()
+
     def _build_metadata(self, row: RemoteEntry):
         return (
             f"Path: {row.full_path}\n"
@@ -819,7 +1640,7 @@ class NovaSFTPExplorer(ctk.CTk):
             self._render_image_canvas()
 
     def _on_image_mousewheel(self, event):
-        if self.image_original is None:
+        if self.image_pyramid is None and self.tiled_image is None:
             return "break"
         delta = 0
         if hasattr(event, "delta") and event.delta:
@@ -839,26 +1660,40 @@ class NovaSFTPExplorer(ctk.CTk):
 
     def _on_image_pan_move(self, event):
         self.image_canvas.scan_dragto(event.x, event.y, gain=1)
+        if self.tiled_image is not None:
+            self._tiled_refresh()
+
+    def _on_image_scroll(self, view, *args):
+        view(*args)
+        if self.tiled_image is not None:
+            self._tiled_refresh()
 
     def _on_image_zoom_selected(self, value):
-        if self.image_original is None:
+        if self.image_pyramid is None and self.tiled_image is None:
             return
         try:
             pct = int(value.rstrip("%"))
         except ValueError:
             return
+        if self.tiled_image is not None:
+            # Tiles exist only at power-of-two scales: the nearest one.
+            self._set_tiled_level(max(0, round(math.log2(100 / max(pct, 1)))))
+            return
         self.image_fit_mode = False
         self.image_zoom = max(0.05, min(8.0, pct / 100.0))
         self._render_image_canvas()
 
     def _image_fit_to_window(self):
-        if self.image_original is None:
+        if self.image_pyramid is None and self.tiled_image is None:
             return
         self.image_fit_mode = True
         self._render_image_canvas()
 
     def _image_actual_size(self):
-        if self.image_original is None:
+        if self.image_pyramid is None and self.tiled_image is None:
+            return
+        if self.tiled_image is not None:
+            self._set_tiled_level(0)
             return
         self.image_fit_mode = False
         self.image_zoom = 1.0
@@ -866,15 +1701,28 @@ class NovaSFTPExplorer(ctk.CTk):
         self._render_image_canvas()
 
     def _image_zoom_by(self, factor):
-        if self.image_original is None:
+        if self.image_pyramid is None and self.tiled_image is None:
+            return
+        if self.tiled_image is not None:
+            self._set_tiled_level(self.tiled_level + (1 if factor < 1 else -1))
             return
         self.image_fit_mode = False
         self.image_zoom = max(0.05, min(8.0, self.image_zoom * factor))
         self._render_image_canvas()
 
-    def _render_image_canvas(self):
+    def _render_image_canvas(self, quality=False):
+        # Resizing runs on the renderer thread. Interactive renders use the
+        # fast filter and schedule a LANCZOS pass once input pauses for
+        # IMAGE_IDLE_MS; only the newest render is ever shown.
         self.image_canvas.delete("placeholder")
-        if self.image_original is None:
+        if self.image_idle_id is not None:
+            self.after_cancel(self.image_idle_id)
+            self.image_idle_id = None
+        self.image_render_token += 1
+        if self.tiled_image is not None:
+            self._render_tiled()
+            return
+        if self.image_pyramid is None:
             self.image_canvas.delete("all")
             self.image_canvas_item = None
             self.image_canvas.create_text(20, 20, anchor="nw", text="Select an image file to preview", fill="#c9d2df", tags=("placeholder",))
@@ -882,7 +1730,8 @@ class NovaSFTPExplorer(ctk.CTk):
             self.image_canvas.configure(scrollregion=(0, 0, 1, 1))
             return
 
-        original_w, original_h = self.image_original.size
+        pyramid = self.image_pyramid
+        original_w, original_h = pyramid.full_size
         canvas_w = max(self.image_canvas.winfo_width(), 1)
         canvas_h = max(self.image_canvas.winfo_height(), 1)
 
@@ -892,9 +1741,26 @@ class NovaSFTPExplorer(ctk.CTk):
 
         draw_w = max(1, int(original_w * self.image_zoom))
         draw_h = max(1, int(original_h * self.image_zoom))
-        rendered = self.image_original.resize((draw_w, draw_h), Image.Resampling.LANCZOS)
-        self.image_tk = ImageTk.PhotoImage(rendered)
+        if not pyramid.complete and (draw_w > pyramid.base.width or draw_h > pyramid.base.height):
+            self._decode_full_image()
+        token = self.image_render_token
+        layout = (draw_w, draw_h, canvas_w, canvas_h)
+        self.image_renderer.submit(
+            lambda: pyramid.render((draw_w, draw_h), quality),
+            lambda rendered: self.after(0, lambda: self._show_rendered_image(token, rendered, layout)),
+        )
+        if not quality:
+            self.image_idle_id = self.after(IMAGE_IDLE_MS, lambda: self._render_image_canvas(quality=True))
 
+        zoom_pct = int(self.image_zoom * 100)
+        mode = "Fit" if self.image_fit_mode else "Manual"
+        self.image_info_label.configure(text=f"{original_w}x{original_h} | {zoom_pct}% | {mode}")
+
+    def _show_rendered_image(self, token, rendered, layout):
+        if token != self.image_render_token or rendered is None:
+            return
+        draw_w, draw_h, canvas_w, canvas_h = layout
+        self.image_tk = ImageTk.PhotoImage(rendered)
         x = max((canvas_w - draw_w) // 2, 0)
         y = max((canvas_h - draw_h) // 2, 0)
         if self.image_canvas_item is None:
@@ -902,35 +1768,266 @@ class NovaSFTPExplorer(ctk.CTk):
         else:
             self.image_canvas.itemconfigure(self.image_canvas_item, image=self.image_tk)
             self.image_canvas.coords(self.image_canvas_item, x, y)
-
         self.image_canvas.configure(scrollregion=(0, 0, max(draw_w, canvas_w), max(draw_h, canvas_h)))
-        zoom_pct = int(self.image_zoom * 100)
+
+    def _set_tiled_level(self, level):
+        # Zooms about the centre of the view.
+        tiled = self.tiled_image
+        level = max(0, min(tiled.max_level, level))
+        if level == self.tiled_level and not self.image_fit_mode:
+            return
+        width, height = tiled.level_size(self.tiled_level)
+        origin_x, origin_y = self.tiled_origin
+        centre_x = (self.image_canvas.canvasx(self.image_canvas.winfo_width() / 2) - origin_x) / width
+        centre_y = (self.image_canvas.canvasy(self.image_canvas.winfo_height() / 2) - origin_y) / height
+        self.image_fit_mode = False
+        self.tiled_level = level
+        self._render_tiled((centre_x, centre_y))
+
+    def _render_tiled(self, centre=None):
+        tiled = self.tiled_image
+        canvas_w = max(self.image_canvas.winfo_width(), 1)
+        canvas_h = max(self.image_canvas.winfo_height(), 1)
+        if self.image_fit_mode:
+            self.tiled_level = tiled.fit_level(canvas_w, canvas_h)
+        width, height = tiled.level_size(self.tiled_level)
+        self.image_canvas.delete("all")
+        self.image_canvas_item = None
+        self.image_tk = None
+        self.tiled_items.clear()
+        self.tiled_origin = (max((canvas_w - width) // 2, 0), max((canvas_h - height) // 2, 0))
+        region_w, region_h = max(width, canvas_w), max(height, canvas_h)
+        self.image_canvas.configure(scrollregion=(0, 0, region_w, region_h))
+        if centre is not None:
+            self.image_canvas.xview_moveto(max(0.0, (centre[0] * width - canvas_w / 2) / region_w))
+            self.image_canvas.yview_moveto(max(0.0, (centre[1] * height - canvas_h / 2) / region_h))
+        self._tiled_refresh()
+        zoom = f"{100 / (1 << self.tiled_level):g}%"
+        self.image_zoom_var.set(zoom)
         mode = "Fit" if self.image_fit_mode else "Manual"
-        self.image_info_label.configure(text=f"{original_w}x{original_h} | {zoom_pct}% | {mode}")
+        self.image_info_label.configure(text=f"{tiled.size[0]}x{tiled.size[1]} {tiled.format} | tiled | {zoom} | {mode}")
+
+    def _tiled_refresh(self):
+        # Shows the tiles under the viewport, queues the missing ones nearest
+        # the centre first with a one-tile ring around the view prefetched,
+        # and drops canvas items that scrolled well out of view.
+        tiled = self.tiled_image
+        origin_x, origin_y = self.tiled_origin
+        left = self.image_canvas.canvasx(0) - origin_x
+        top = self.image_canvas.canvasy(0) - origin_y
+        right = left + self.image_canvas.winfo_width()
+        bottom = top + self.image_canvas.winfo_height()
+        wanted = [(self.tiled_level, tx, ty) for tx, ty in tiled.tiles_in(self.tiled_level, max(left, 0), max(top, 0), max(right, 0), max(bottom, 0), ring=1)]
+        keep = set(wanted)
+        for key in [key for key in self.tiled_items if key not in keep]:
+            self.image_canvas.delete(self.tiled_items.pop(key)[0])
+        missing = []
+        for key in wanted:
+            if key in self.tiled_items:
+                continue
+            image = tiled.tiles.get(key)
+            if image is not None:
+                self._show_tile(tiled, key, image)
+            else:
+                missing.append(key)
+        self.tiled_loader.request(missing)
+
+    def _show_tile(self, tiled, key, image):
+        if tiled is not self.tiled_image or key[0] != self.tiled_level or key in self.tiled_items:
+            return
+        if image is None:
+            self._set_status("Tile decode failed.")
+            return
+        photo = ImageTk.PhotoImage(image)
+        origin_x, origin_y = self.tiled_origin
+        item = self.image_canvas.create_image(origin_x + key[1] * TILE_SIZE, origin_y + key[2] * TILE_SIZE, anchor="nw", image=photo)
+        self.tiled_items[key] = (item, photo)
+
+    def _close_tiled(self):
+        if self.tiled_loader is not None:
+            self.tiled_loader.close()
+        self.tiled_loader = None
+        self.tiled_image = None
+        self.tiled_key = None
+        self.tiled_level = 0
+        self.tiled_items.clear()
+
+    # Content search
+    def _toggle_search(self):
+        if self.search is not None:
+            self.search.cancel()
+            return
+        query = self.content_search_entry.get()
+        if not query or not self.client.connected:
+            return
+        paths = [row.full_path for row in self.visible_rows if not row.is_dir]
+        if not paths:
+            self._set_status("No files in the listing to search")
+            return
+        self.search_token += 1
+        token = self.search_token
+        self.search_table.delete(*self.search_table.get_children())
+        self.search_hits = {}
+        try:
+            self.search = ContentSearch(self.client, query, ignore_case=not self.search_case_var.get())
+        except Exception as exc:
+            messagebox.showerror("Search", f"Invalid search: {exc}")
+            return
+        self.btn_search.configure(text="Cancel")
+        self.preview_tabs.set("Search")
+        self._set_status(f"Searching {len(paths)} files for {query!r}...")
+        threading.Thread(target=self._search_worker, args=(token, self.search, paths), daemon=True).start()
 
-    def preview_prev_page(self):
-        if not self.preview_file_path or self.preview_offset <= 0:
+    def _search_worker(self, token, search, paths):
+        def on_hits(hits):
+            self.after(0, lambda: self._add_search_hits(token, hits))
+
+        def progress(done, total):
+            self.after(0, lambda: token == self.search_token and self._set_status(f"Searching... {done}/{total} files"))
+
+        try:
+            hits = search.run(paths, on_hits=on_hits, progress=progress)
+        except Exception as exc:
+            self.after(0, lambda message=str(exc): self._finish_search(token, f"Search failed: {message}"))
+            return
+        where = "on the server (grep)" if search.method == "grep" else "by streaming"
+        status = f"{len(hits)} matches in {len({hit.path for hit in hits})} files, searched {where}"
+        if search.cancelled:
+            status = f"Search cancelled after {len(hits)} matches"
+        if search.errors:
+            status += f"; {len(search.errors)} files could not be read"
+        self.after(0, lambda: self._finish_search(token, status))
+
+    def _add_search_hits(self, token, hits):
+        if token != self.search_token:
+            return
+        for hit in hits:
+            iid = self.search_table.insert("", "end", values=(posixpath.basename(hit.path), hit.line, hit.text))
+            self.search_hits[iid] = hit
+
+    def _finish_search(self, token, status):
+        if token != self.search_token:
+            return
+        self.search = None
+        self.btn_search.configure(text="Search")
+        self._set_status(status)
+
+    def _open_search_hit(self, _event=None):
+        selection = self.search_table.selection()
+        hit = self.search_hits.get(selection[0]) if selection else None
+        if hit is None:
             return
+        row = self._row_by_path(hit.path)
+        if row is None:
+            self._set_status(f"{hit.path} is no longer in the listing")
+            return
+        # Opens the text preview with the page starting at the matching line:
+        # by line number when the file is indexed, else at its byte offset.
+        self.preview_token += 1
+        self.preview_file_path = row.full_path
+        self.preview_file_size = row.st_size
+        self.preview_version = None
+        self.preview_line = None
+        self._cancel_line_index()
+        args = (self.preview_token, row, hit.offset, None, False, hit.line - 1)
+        threading.Thread(target=self._preview_worker, args=args, daemon=True).start()
+
+    def _open_text_page(self, offset, line=None, backward=False):
         row = self._row_by_path(self.preview_file_path)
         if not row:
             return
-        offset = max(0, self.preview_offset - self.preview_page_size)
         self.preview_token += 1
-        threading.Thread(target=self._preview_worker, args=(self.preview_token, row, offset), daemon=True).start()
+        args = (self.preview_token, row, offset, self.preview_version, False, line, backward)
+        threading.Thread(target=self._preview_worker, args=args, daemon=True).start()
+
+    def preview_prev_page(self):
+        if not self.preview_file_path or self.preview_offset <= 0:
+            return
+        if self.preview_line is not None:
+            self._open_text_page(0, line=max(0, self.preview_line - TEXT_PAGE_LINES))
+        else:
+            self._open_text_page(self.preview_offset, backward=True)
 
     def preview_next_page(self):
-        if not self.preview_file_path:
+        if not self.preview_file_path or self.preview_end >= self.preview_file_size:
             return
-        row = self._row_by_path(self.preview_file_path)
-        if not row:
+        if self.preview_line is not None:
+            self._open_text_page(self.preview_end, line=self.preview_line + TEXT_PAGE_LINES)
+        else:
+            self._open_text_page(self.preview_end)
+
+    def _goto_line(self):
+        index = self.line_index if self.line_index_path == self.preview_file_path else None
+        if not self.preview_file_path or index is None:
+            self._set_status("Index the file's lines to jump to a line")
+            return
+        try:
+            number = int(self.line_entry.get().replace(",", "").strip())
+        except ValueError:
+            self._set_status("Enter a line number")
             return
-        next_offset = self.preview_offset + self.preview_page_size
-        if next_offset >= self.preview_file_size:
+        line = max(0, min(number, index.total_lines) - 1)
+        self._open_text_page(0, line=line)
+
+    def _toggle_line_index(self):
+        if self.index_cancel is not None:
+            self._cancel_line_index()
             return
-        self.preview_token += 1
-        threading.Thread(target=self._preview_worker, args=(self.preview_token, row, next_offset), daemon=True).start()
+        if not self.preview_file_path or not self.preview_version:
+            return
+        cancel = threading.Event()
+        self.index_cancel = cancel
+        self.btn_index_lines.configure(text="Cancel")
+        args = (self.preview_file_path, self.preview_version, cancel)
+        threading.Thread(target=self._line_index_worker, args=args, daemon=True).start()
+
+    def _cancel_line_index(self):
+        if self.index_cancel is not None:
+            self.index_cancel.set()
+        self.index_cancel = None
+        self.btn_index_lines.configure(text="Index lines")
+
+    def _line_index_worker(self, path, version, cancel):
+        mtime, size = version
+        shown = [-1]
+
+        def progress(fraction):
+            percent = int(fraction * 100)
+            if percent != shown[0]:
+                shown[0] = percent
+                self.after(0, lambda: self._set_status(f"Indexing lines of {path}: {percent}%"))
+
+        chunks = self.client.stream_file(path, LINE_INDEX_CHUNK, end=size)
+        try:
+            index = build_line_index(chunks, size, mtime, cancel=cancel, progress=progress)
+        except Exception as exc:
+            self.after(0, lambda message=str(exc): self._on_line_index_done(path, version, cancel, None, f"Line indexing failed: {message}"))
+            return
+        finally:
+            chunks.close()
+        if index is None:
+            self.after(0, lambda: self._on_line_index_done(path, version, cancel, None, "Line indexing cancelled"))
+            return
+        try:
+            self.line_indexes.save(self.client.session, path, index)
+        except OSError:
+            pass
+        self.after(0, lambda: self._on_line_index_done(path, version, cancel, index, f"Indexed {index.total_lines:,} lines"))
+
+    def _on_line_index_done(self, path, version, cancel, index, status):
+        if self.index_cancel is cancel:
+            self.index_cancel = None
+            self.btn_index_lines.configure(text="Index lines")
+        if index is not None and path == self.preview_file_path and version == self.preview_version:
+            self.line_index = index
+            self.line_index_path = path
+            self._update_text_paging_controls()
+        self._set_status(status)
 
     def _update_text_paging_controls(self):
+        indexed = self.preview_file_path is not None and self.line_index_path == self.preview_file_path
+        self.btn_goto_line.configure(state="normal" if indexed else "disabled")
+        self.btn_index_lines.configure(state="normal" if self.preview_file_path and (not indexed or self.index_cancel) else "disabled")
         if not self.preview_file_path or self.preview_file_size <= 0:
             self.btn_prev_page.configure(state="disabled")
             self.btn_next_page.configure(state="disabled")
@@ -940,17 +2037,28 @@ class NovaSFTPExplorer(ctk.CTk):
         total = ((self.preview_file_size - 1) // self.preview_page_size) + 1
         self.page_label.configure(text=f"Page {page}/{total}")
         self.btn_prev_page.configure(state="normal" if self.preview_offset > 0 else "disabled")
-        self.btn_next_page.configure(state="normal" if (self.preview_offset + self.preview_page_size) < self.preview_file_size else "disabled")
+        self.btn_next_page.configure(state="normal" if self.preview_end < self.preview_file_size else "disabled")
 
     def _reset_preview(self):
         self.preview_token += 1
         self.preview_file_path = None
         self.preview_file_size = 0
+        self.preview_version = None
         self.preview_offset = 0
+        self.preview_end = 0
+        self.preview_line = None
+        self._cancel_line_index()
         self.text_preview.delete("1.0", "end")
-        self.hex_preview.delete("1.0", "end")
+        self._cancel_hex_find()
+        self.hex_path = None
+        self.hex_match = None
+        self.hex_viewport.set_rows(range(0))
+        self._hex_render()
         self.meta_preview.delete("1.0", "end")
-        self.image_original = None
+        self._close_tiled()
+        self.image_pyramid = None
+        self.image_key = None
+        self.image_render_token += 1
         self.image_tk = None
         self.image_zoom = 1.0
         self.image_fit_mode = True
@@ -962,23 +2070,95 @@ class NovaSFTPExplorer(ctk.CTk):
         self._update_text_paging_controls()
 
     # Transfers
-    def _new_transfer_row(self, direction: str, file_label: str):
-        self.transfer_counter += 1
-        transfer_id = f"t{self.transfer_counter}"
-        self.transfer_rows[transfer_id] = {"direction": direction, "file": file_label, "progress": "0%", "status": "Queued"}
-        self.transfer_table.insert("", "end", iid=transfer_id, values=(direction, file_label, "0%", "Queued"))
+    def _new_transfer_row(self, job):
+        values = (job.direction, job.label, "0%", "", "", job.status)
+        self.transfer_rows[job.job_id] = dict(zip(("direction", "file", "progress", "rate", "eta", "status"), values), shown=values)
+        self.transfer_table.insert("", "end", iid=job.job_id, values=values)
         self.preview_tabs.set("Transfers")
-        return transfer_id
+        return job.job_id
 
-    def _update_transfer_row(self, transfer_id, progress=None, status=None):
+    def _update_transfer_row(self, transfer_id, visible_only=False, **changes):
         row = self.transfer_rows.get(transfer_id)
         if not row:
             return
-        if progress is not None:
-            row["progress"] = progress
-        if status is not None:
-            row["status"] = status
-        self.transfer_table.item(transfer_id, values=(row["direction"], row["file"], row["progress"], row["status"]))
+        row.update(changes)
+        values = (row["direction"], row["file"], row["progress"], row["rate"], row["eta"], row["status"])
+        # Unchanged rows are never rewritten; with visible_only, rows scrolled
+        # out of view (or on a hidden tab) wait until a frame finds them shown.
+        if values != row["shown"] and (not visible_only or self.transfer_table.bbox(transfer_id)):
+            self.transfer_table.item(transfer_id, values=values)
+            row["shown"] = values
+
+    @staticmethod
+    def _transfer_status(job, detail):
+        status = f"Error: {job.error}" if job.status == STATUS_ERROR else job.status
+        return f"{status} ({detail})" if detail else status
+
+    def _on_transfer_update(self, job):
+        # Scheduler callbacks arrive on worker threads, on state changes only;
+        # byte counts are polled by _poll_transfer_progress.
+        # Only a cancel from the Cancel button drops the checkpoint; close and
+        # disconnect interrupt instead.
+        if self.closing:
+            return
+        if job.status == STATUS_CANCELLED and job.job_id in self.transfer_discards:
+            self.transfer_discards.discard(job.job_id)
+            if job.job_id in self.transfer_checkpoints:
+                self.transfer_journal.discard(*self.transfer_checkpoints[job.job_id])
+        changes = {"progress": f"{job.percent}%", "status": self._transfer_status(job, job.detail)}
+        if job.status != STATUS_RUNNING:
+            changes.update(rate="", eta="")
+
+        def update():
+            self._update_transfer_row(job.job_id, **changes)
+            if job.status == STATUS_RUNNING and self.transfer_poll_id is None:
+                self.transfer_poll_id = self.after(TRANSFER_FRAME_MS, self._poll_transfer_progress)
+
+        self.after(0, update)
+
+    def _poll_transfer_progress(self):
+        # One batch of row updates per frame however many blocks arrived;
+        # stops when nothing is running and restarts on the next job start.
+        self.transfer_poll_id = None
+        progress = self.transfer_scheduler.progress.poll()
+        for transfer_id, (transferred, total, detail, rate, eta) in progress.items():
+            job = self.transfer_scheduler.get(transfer_id)
+            if job is None or job.status != STATUS_RUNNING:
+                continue
+            self._update_transfer_row(
+                transfer_id,
+                visible_only=True,
+                progress=f"{int(transferred * 100 / total) if total else 0}%",
+                rate=f"{human_size(int(rate))}/s" if rate else "",
+                eta=format_eta(eta),
+                status=self._transfer_status(job, detail),
+            )
+        if progress or any(job.status == STATUS_RUNNING for job in self.transfer_scheduler.jobs()):
+            self.transfer_poll_id = self.after(TRANSFER_FRAME_MS, self._poll_transfer_progress)
+
+    def _selected_transfer_ids(self):
+        return [iid for iid in self.transfer_table.selection() if iid in self.transfer_rows]
+
+    def pause_selected_transfers(self):
+        for transfer_id in self._selected_transfer_ids():
+            self.transfer_scheduler.pause(transfer_id)
+
+    def resume_selected_transfers(self):
+        for transfer_id in self._selected_transfer_ids():
+            self.transfer_scheduler.resume(transfer_id)
+
+    def cancel_selected_transfers(self):
+        for transfer_id in self._selected_transfer_ids():
+            self.transfer_discards.add(transfer_id)
+            self.transfer_scheduler.cancel(transfer_id)
+
+    def retry_selected_transfers(self):
+        for transfer_id in self._selected_transfer_ids():
+            self.transfer_scheduler.retry(transfer_id)
+
+    def prioritize_selected_transfers(self):
+        for transfer_id in reversed(self._selected_transfer_ids()):
+            self.transfer_scheduler.move_to_front(transfer_id)
 
     def start_upload(self):
         if not self.client.connected:
@@ -987,46 +2167,132 @@ class NovaSFTPExplorer(ctk.CTk):
         if not local_path:
             return
         remote_path = SFTPClient.join_remote(self.cwd, os.path.basename(local_path))
-        transfer_id = self._new_transfer_row("Upload", os.path.basename(local_path))
-        threading.Thread(target=self._upload_worker, args=(transfer_id, local_path, remote_path), daemon=True).start()
-
-    def _upload_worker(self, transfer_id, local_path, remote_path):
-        def cb(transferred, total):
-            pct = f"{int((transferred / total) * 100) if total else 0}%"
-            self.after(0, lambda p=pct: self._update_transfer_row(transfer_id, progress=p, status="Running"))
+        self._submit_file_transfer("Upload", remote_path, local_path)
+
+    def _submit_file_transfer(self, direction, remote_path, local_path, status=STATUS_QUEUED):
+        # Single-file transfers are journaled so a failed or interrupted row can
+        # be retried from its last checkpoint, even after a restart.
+        checkpoint_args = (self.client.session, direction, remote_path, local_path)
+        worker = self._upload_worker if direction == "Upload" else self._download_worker
+        label = os.path.basename(local_path if direction == "Upload" else remote_path)
+        job = self.transfer_scheduler.submit(
+            direction,
+            label,
+            lambda callback: worker(remote_path, local_path, callback, checkpoint_args),
+            status=status,
+        )
+        self.transfer_checkpoints[job.job_id] = checkpoint_args
+        self._new_transfer_row(job)
+        return job
+
+    def _restore_interrupted_transfers(self):
+        active = set(self.transfer_checkpoints.values())
+        for entry in self.transfer_journal.pending(self.client.session):
+            args = (entry["session"], entry["direction"], entry["remote_path"], entry["local_path"])
+            if args in active or entry["direction"] not in ("Upload", "Download"):
+                continue
+            job = self._submit_file_transfer(entry["direction"], entry["remote_path"], entry["local_path"], status=STATUS_INTERRUPTED)
+            size = entry.get("size") or 0
+            done = sum(end - start for start, end in entry.get("ranges", []))
+            self._update_transfer_row(job.job_id, progress=f"{int(done * 100 / size) if size > 0 else 0}%")
+
+    def _upload_worker(self, remote_path, local_path, callback, checkpoint_args):
+        checkpoint = self.transfer_journal.open(*checkpoint_args)
+        # put() drops only the cached listing of the target folder.
+        self.client.put(local_path, remote_path, callback=callback, checkpoint=checkpoint)
+        self.after(0, lambda: self._refresh_if_showing(posixpath.dirname(remote_path)))
+
+    def start_upload_folder(self):
+        if not self.client.connected:
+            return
+        local_dir = filedialog.askdirectory(title="Select folder to upload")
+        if not local_dir:
+            return
+        name = os.path.basename(os.path.normpath(local_dir))
+        remote_dir = SFTPClient.join_remote(self.cwd, name)
+        job = self.transfer_scheduler.submit(
+            "Upload",
+            f"{name}/",
+            lambda callback: self._upload_tree_worker(local_dir, remote_dir, callback),
+        )
+        self._new_transfer_row(job)
 
-        try:
-            self.after(0, lambda: self._update_transfer_row(transfer_id, status="Running"))
-            self.client.put(local_path, remote_path, callback=cb)
-            self.after(0, lambda: self._update_transfer_row(transfer_id, progress="100%", status="Done"))
-            self.after(0, self.refresh_listing)
-        except Exception as exc:
-            self.after(0, lambda: self._update_transfer_row(transfer_id, status=f"Error: {exc}"))
+    def _upload_tree_worker(self, local_dir, remote_dir, callback):
+        self.client.put_tree(local_dir, remote_dir, callback=callback)
+        self.after(0, lambda: self._refresh_if_showing(posixpath.dirname(remote_dir)))
 
     def start_download(self):
         if not self.client.connected:
             return
         row = self._selected_row()
-        if not row or row.is_dir:
-            messagebox.showwarning("Select file", "Select a remote file to download.")
+        if not row:
+            messagebox.showwarning("Select file", "Select a remote file or folder to download.")
+            return
+        if row.is_dir:
+            self._start_tree_download(row)
             return
         local_path = filedialog.asksaveasfilename(initialfile=row.name, title="Save remote file as")
         if not local_path:
             return
-        transfer_id = self._new_transfer_row("Download", row.name)
-        threading.Thread(target=self._download_worker, args=(transfer_id, row.full_path, local_path), daemon=True).start()
+        self._submit_file_transfer("Download", row.full_path, local_path)
 
-    def _download_worker(self, transfer_id, remote_path, local_path):
-        def cb(transferred, total):
-            pct = f"{int((transferred / total) * 100) if total else 0}%"
-            self.after(0, lambda p=pct: self._update_transfer_row(transfer_id, progress=p, status="Running"))
+    def _download_worker(self, remote_path, local_path, callback, checkpoint_args):
+        checkpoint = self.transfer_journal.open(*checkpoint_args)
+        self.client.get(remote_path, local_path, callback=callback, checkpoint=checkpoint)
+
+    def _start_tree_download(self, row):
+        parent = filedialog.askdirectory(title=f"Download {row.name} into")
+        if not parent:
+            return
+        local_dir = os.path.join(parent, row.name)
+        remote_dir = row.full_path
+        job = self.transfer_scheduler.submit(
+            "Download",
+            f"{row.name}/",
+            lambda callback: self.client.get_tree(remote_dir, local_dir, callback=callback),
+        )
+        self._new_transfer_row(job)
 
+    def start_sync(self):
+        if not self.client.connected:
+            return
+        row = self._selected_row()
+        if not row or not row.is_dir:
+            messagebox.showwarning("Select folder", "Select a remote folder to sync.")
+            return
+        parent = filedialog.askdirectory(title=f"Sync {row.name} into")
+        if not parent:
+            return
+        local_dir = os.path.join(parent, row.name)
+        self._set_status(f"Comparing {row.full_path} with {local_dir}...")
+        threading.Thread(target=self._sync_plan_worker, args=(row.full_path, local_dir), daemon=True).start()
+
+    def _sync_plan_worker(self, remote_dir, local_dir):
+        engine = SyncDownloader(self.client)
         try:
-            self.after(0, lambda: self._update_transfer_row(transfer_id, status="Running"))
-            self.client.get(remote_path, local_path, callback=cb)
-            self.after(0, lambda: self._update_transfer_row(transfer_id, progress="100%", status="Done"))
+            plan = engine.plan(remote_dir, local_dir)
         except Exception as exc:
-            self.after(0, lambda: self._update_transfer_row(transfer_id, status=f"Error: {exc}"))
+            message = str(exc)
+            self.after(0, lambda: messagebox.showerror("Sync Error", message))
+            self.after(0, lambda: self._set_status(f"Sync failed: {message}"))
+            return
+        self.after(0, lambda: self._confirm_sync(engine, plan))
+
+    def _confirm_sync(self, engine, plan):
+        # The plan is a dry run; nothing is transferred until it is confirmed.
+        name = os.path.basename(os.path.normpath(plan.local_root))
+        self._set_status(f"Sync plan ready for {plan.remote_root}")
+        if not plan.pending:
+            messagebox.showinfo("Sync", f"{name} is up to date.\n\n{plan.summary()}")
+            return
+        if not messagebox.askyesno("Sync", f"Sync {plan.remote_root} into {plan.local_root}?\n\n{plan.summary()}"):
+            return
+        job = self.transfer_scheduler.submit(
+            "Download",
+            f"{name}/ (sync)",
+            lambda callback: engine.execute(plan, callback=callback),
+        )
+        self._new_transfer_row(job)
 
     def _restore_splitter_position(self):
         saved = self.ui_prefs.get("splitter_x")
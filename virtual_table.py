@@ -0,0 +1,235 @@
+from tkinter import ttk
+
+TABLE_OVERSCAN = 6
+TABLE_WHEEL_ROWS = 3
+
+
+class TableViewport:
+    # The Tk-free half of the virtual table: which slice of the row model is
+    # on screen and which row is selected. Selection is kept by key (the remote
+    # path), so it survives re-filtering, re-sorting and scrolling.
+    def __init__(self, key, overscan: int = TABLE_OVERSCAN):
+        self.key = key
+        self.overscan = overscan
+        self.rows = []
+        self.top = 0
+        self.visible = 1
+        self.selected_key = None
+        self._selected_index = None
+
+    @property
+    def max_top(self) -> int:
+        return max(0, len(self.rows) - self.visible)
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self._selected_index = None
+        if self.selected_key is not None and self.selected_index() is None:
+            self.selected_key = None
+        self.top = min(self.top, self.max_top)
+
+    def set_visible(self, count: int):
+        self.visible = max(1, count)
+        self.top = min(self.top, self.max_top)
+
+    def scroll_to(self, top: int) -> bool:
+        top = max(0, min(int(top), self.max_top))
+        changed = top != self.top
+        self.top = top
+        return changed
+
+    def scroll_by(self, delta: int) -> bool:
+        return self.scroll_to(self.top + delta)
+
+    def moveto(self, fraction: float) -> bool:
+        return self.scroll_to(round(float(fraction) * len(self.rows)))
+
+    def fractions(self) -> tuple[float, float]:
+        if not self.rows:
+            return 0.0, 1.0
+        total = len(self.rows)
+        return self.top / total, min(1.0, (self.top + self.visible) / total)
+
+    def window(self) -> range:
+        # Rows to materialize: the viewport plus overscan below it.
+        return range(self.top, min(len(self.rows), self.top + self.visible + self.overscan))
+
+    def selected_index(self) -> int | None:
+        if self.selected_key is None:
+            return None
+        cached = self._selected_index
+        if cached is not None and cached < len(self.rows) and self.key(self.rows[cached]) == self.selected_key:
+            return cached
+        for index, row in enumerate(self.rows):
+            if self.key(row) == self.selected_key:
+                self._selected_index = index
+                return index
+        return None
+
+    def selected_row(self):
+        index = self.selected_index()
+        return None if index is None else self.rows[index]
+
+    def select_index(self, index: int) -> bool:
+        # Returns True when the selection moved to a different row.
+        if not self.rows:
+            return False
+        index = max(0, min(index, len(self.rows) - 1))
+        key = self.key(self.rows[index])
+        changed = key != self.selected_key
+        self.selected_key = key
+        self._selected_index = index
+        self.ensure_visible(index)
+        return changed
+
+    def ensure_visible(self, index: int):
+        if index < self.top:
+            self.scroll_to(index)
+        elif index >= self.top + self.visible:
+            self.scroll_to(index - self.visible + 1)
+
+
+class VirtualTable:
+    # A ttk.Treeview that only ever holds a small pool of items: the rows in
+    # the viewport plus overscan. Scrolling rewrites the values of the pooled
+    # items instead of inserting and deleting, so showing or filtering 100k
+    # rows costs the same Tk work as showing 40. Treeview's own scrolling is
+    # pinned to the top; the scrollbar and wheel drive the viewport instead.
+    def __init__(self, master, columns, values, key, on_select=None, overscan: int = TABLE_OVERSCAN, **tree_options):
+        self.values = values
+        self.on_select = on_select
+        self.viewport = TableViewport(key, overscan)
+        self.tree = ttk.Treeview(master, columns=columns, show="headings", selectmode="browse", **tree_options)
+        self.scrollbar = ttk.Scrollbar(master, orient="vertical", command=self.yview)
+        self._items = []
+        self._shown = []
+        self._row_height = 0
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda _event: self._scroll(-TABLE_WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda _event: self._scroll(TABLE_WHEEL_ROWS))
+        for sequence, delta in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"), ("<Home>", "home"), ("<End>", "end")):
+            self.tree.bind(sequence, lambda _event, d=delta: self._on_key(d))
+
+    # Public API
+    def set_rows(self, rows):
+        self.viewport.set_rows(rows)
+        self.refresh()
+
+    def selected_row(self):
+        return self.viewport.selected_row()
+
+    def scroll_to(self, index: int):
+        if self.viewport.scroll_to(index):
+            self.refresh()
+
+    def row_at(self, y: int):
+        item = self.tree.identify_row(y)
+        if not item:
+            return None
+        index = self.viewport.top + self._items.index(item)
+        return index if index < len(self.viewport.rows) else None
+
+    def select_at(self, y: int):
+        index = self.row_at(y)
+        if index is not None:
+            self._select(index)
+        return self.selected_row()
+
+    def bind(self, sequence, func):
+        return self.tree.bind(sequence, func, add="+")
+
+    def grid(self, **kwargs):
+        self.tree.grid(**kwargs)
+
+    def yview(self, *args):
+        if not args:
+            return self.viewport.fractions()
+        if args[0] == "moveto":
+            changed = self.viewport.moveto(args[1])
+        else:
+            amount, unit = int(args[1]), args[2]
+            changed = self.viewport.scroll_by(amount * (self.viewport.visible if unit.startswith("page") else 1))
+        if changed:
+            self.refresh()
+        return None
+
+    def refresh(self):
+        window = self.viewport.window()
+        while len(self._items) < len(window):
+            self._items.append(self.tree.insert("", "end", values=()))
+            self._shown.append(None)
+        while len(self._items) > len(window):
+            self.tree.delete(self._items.pop())
+            self._shown.pop()
+        selected = self.viewport.selected_index()
+        selected_item = ()
+        for slot, index in enumerate(window):
+            values = self.values(self.viewport.rows[index])
+            if self._shown[slot] != values:
+                self.tree.item(self._items[slot], values=values)
+                self._shown[slot] = values
+            if index == selected:
+                selected_item = (self._items[slot],)
+        if tuple(self.tree.selection()) != selected_item:
+            self.tree.selection_set(selected_item)
+        if selected_item:
+            self.tree.focus(selected_item[0])
+        self.tree.yview_moveto(0)
+        self.scrollbar.set(*self.viewport.fractions())
+
+    # Internals
+    def _select(self, index):
+        changed = self.viewport.select_index(index)
+        self.refresh()
+        if changed and self.on_select:
+            self.on_select(self.selected_row())
+
+    def _scroll(self, delta):
+        if self.viewport.scroll_by(delta):
+            self.refresh()
+        return "break"
+
+    def _on_wheel(self, event):
+        steps = -event.delta // 120 if abs(event.delta) >= 120 else (-1 if event.delta > 0 else 1)
+        return self._scroll(steps * TABLE_WHEEL_ROWS)
+
+    def _on_key(self, delta):
+        rows = self.viewport.rows
+        if not rows:
+            return "break"
+        current = self.viewport.selected_index()
+        if delta == "home":
+            index = 0
+        elif delta == "end":
+            index = len(rows) - 1
+        elif current is None:
+            index = self.viewport.top
+        elif delta in ("page", "-page"):
+            index = current + (self.viewport.visible if delta == "page" else -self.viewport.visible)
+        else:
+            index = current + delta
+        self._select(index)
+        return "break"
+
+    def _on_tree_select(self, _event):
+        # Fires for clicks and for our own selection_set calls; only a click on
+        # a row showing a different path counts as a new selection.
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self._items:
+            return
+        index = self.viewport.top + self._items.index(selection[0])
+        if index < len(self.viewport.rows) and self.viewport.key(self.viewport.rows[index]) != self.viewport.selected_key:
+            self._select(index)
+
+    def _on_configure(self, event):
+        if not self._row_height:
+            self._row_height = int(ttk.Style().lookup(self.tree.cget("style") or "Treeview", "rowheight") or 20)
+        header = self._row_height
+        if self._items:
+            bbox = self.tree.bbox(self._items[0])
+            header = bbox[1] if bbox else header
+        self.viewport.set_visible(max(1, (event.height - header) // self._row_height))
+        self.refresh()